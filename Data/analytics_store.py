@@ -0,0 +1,455 @@
+"""
+Analytics Store
+Precomputes the card sort findings into an indexed SQLite file so the
+website (or anything else) can look them up instead of re-running the
+analysis: card frequencies, the full card co-occurrence matrix, each card's
+top neighbors, the canonical group names with their spellings, and how often
+each card was filed under each group name. A small query API and a local
+JSON HTTP server answer lookups straight from the indexes.
+"""
+
+import argparse
+import json
+import sqlite3
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+from cooccurrence import build_cooccurrence, element_neighbors
+from group_names import NAME_CACHE_FILE, canonicalize_group_names
+from lazy_imports import lazy_module
+from profiling import add_counts, add_profile_arguments, profile_session, profiled
+from workbook_cache import workbook_key
+
+np = lazy_module('numpy')
+sparse = lazy_module('scipy.sparse')
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+EXCEL_FILE = SCRIPT_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
+STORE_FILE = SCRIPT_DIR / "analytics.sqlite"
+
+# Bump when the table layout changes so old stores are rebuilt
+STORE_VERSION = 1
+# Neighbors precomputed per card
+TOP_NEIGHBORS = 10
+DEFAULT_LIMIT = 5
+DEFAULT_PORT = 8409
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE cards (id INTEGER PRIMARY KEY, name TEXT NOT NULL COLLATE NOCASE, frequency INTEGER NOT NULL);
+CREATE TABLE cooccurrence (
+    card_id INTEGER NOT NULL, other_id INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (card_id, other_id)
+) WITHOUT ROWID;
+CREATE TABLE neighbors (
+    card_id INTEGER NOT NULL, rank INTEGER NOT NULL, other_id INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (card_id, rank)
+) WITHOUT ROWID;
+CREATE TABLE labels (id INTEGER PRIMARY KEY, name TEXT NOT NULL, count INTEGER NOT NULL);
+CREATE TABLE label_spellings (spelling TEXT PRIMARY KEY COLLATE NOCASE, label_id INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE label_cards (
+    label_id INTEGER NOT NULL, card_id INTEGER NOT NULL, count INTEGER NOT NULL,
+    PRIMARY KEY (label_id, card_id)
+) WITHOUT ROWID;
+CREATE INDEX cards_by_name ON cards (name);
+CREATE INDEX cooccurrence_by_count ON cooccurrence (card_id, count DESC, other_id);
+CREATE INDEX label_cards_by_count ON label_cards (label_id, count DESC, card_id);
+"""
+
+def check_limit(limit):
+    """
+    Make sure a query limit is a positive integer (SQLite reads a negative
+    LIMIT as no limit at all).
+    Returns the limit. Raises ValueError otherwise.
+    """
+    if isinstance(limit, bool) or not isinstance(limit, int) or limit < 1:
+        raise ValueError(f"limit must be a positive integer, not {limit!r}")
+    return limit
+
+def positive_int(text):
+    """Parse a limit from the command line or a query string (see check_limit)."""
+    try:
+        limit = int(text)
+    except ValueError:
+        raise ValueError(f"limit must be a positive integer, not {text!r}") from None
+    return check_limit(limit)
+
+def label_mapping(names):
+    """
+    Map every raw group name to its canonical label.
+    Returns a dict of raw spelling -> display name (placeholders are left out).
+    """
+    mapping = {}
+    for display, variants in names['variants'].items():
+        mapping[display] = display
+        for variant in variants:
+            mapping[variant] = display
+    return mapping
+
+def label_card_counts(model, mapping, labels):
+    """
+    Count how many times each card was placed in a group with each label.
+    Returns a sparse label x card COO matrix.
+    """
+    label_index = {label: position for position, label in enumerate(labels)}
+    # Label of each raw name in the model's vocabulary, or -1 if it has none
+    name_labels = np.array(
+        [label_index.get(mapping.get(name), -1) for name in model.names],
+        dtype=np.int64
+    )
+    card_labels = np.repeat(name_labels[model.group_name_ids], np.diff(model.group_offsets))
+    keep = card_labels >= 0
+    ones = np.ones(int(keep.sum()), dtype=np.int64)
+    counts = sparse.coo_matrix((ones, (card_labels[keep], model.card_ids[keep])),
+                               shape=(len(labels), len(model.cards)))
+    counts.sum_duplicates()
+    return counts
+
+@profiled
+def build_store(model, store_file=STORE_FILE, source_key=None, canonical_names=True,
+                name_cache=NAME_CACHE_FILE, top_neighbors=TOP_NEIGHBORS):
+    """
+    Write the analytics store for a CardSortModel.
+    The file is built next to store_file and moved into place when complete,
+    so readers never see a half-written store.
+    Returns a dict with the number of cards, pairs and labels written.
+    """
+    engine = build_cooccurrence(model)
+    group_name_counts = model.group_name_counts()
+    if canonical_names:
+        names = canonicalize_group_names(group_name_counts, name_cache)
+    else:
+        names = {'group_name_counts': group_name_counts,
+                 'variants': {name: [] for name in group_name_counts}}
+    labels = [label for label, _ in names['group_name_counts'].most_common()]
+    mapping = label_mapping(names)
+
+    cooccurrence = sparse.coo_matrix(engine['cooccurrence'])
+    off_diagonal = (cooccurrence.row != cooccurrence.col) & (cooccurrence.data > 0)
+    neighbors = element_neighbors(engine, top_n=top_neighbors)
+    card_index = engine['element_index']
+    label_cards = label_card_counts(model, mapping, labels)
+
+    store_file = Path(store_file)
+    store_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = store_file.with_name(store_file.name + '.tmp')
+    tmp_file.unlink(missing_ok=True)
+    connection = sqlite3.connect(tmp_file)
+    try:
+        connection.executescript(SCHEMA)
+        meta = {
+            'version': STORE_VERSION,
+            'built': datetime.now().isoformat(timespec='seconds'),
+            'participants': len(model),
+            'canonical_names': canonical_names,
+            'source': source_key
+        }
+        connection.executemany("INSERT INTO meta VALUES (?, ?)",
+                               [(key, json.dumps(value)) for key, value in meta.items()])
+        connection.executemany("INSERT INTO cards VALUES (?, ?, ?)",
+                               zip(range(len(engine['elements'])), engine['elements'],
+                                   engine['frequency'].tolist()))
+        connection.executemany("INSERT INTO cooccurrence VALUES (?, ?, ?)",
+                               zip(cooccurrence.row[off_diagonal].tolist(), cooccurrence.col[off_diagonal].tolist(),
+                                   cooccurrence.data[off_diagonal].tolist()))
+        connection.executemany("INSERT INTO neighbors VALUES (?, ?, ?, ?)", (
+            (card_index[card], rank, card_index[other], count)
+            for card, top in neighbors.items()
+            for rank, (other, count) in enumerate(top, 1)
+        ))
+        connection.executemany("INSERT INTO labels VALUES (?, ?, ?)",
+                               ((position, label, names['group_name_counts'][label])
+                                for position, label in enumerate(labels)))
+        label_ids = {label: position for position, label in enumerate(labels)}
+        # Display names take precedence over a variant spelled the same way
+        connection.executemany("INSERT OR IGNORE INTO label_spellings VALUES (?, ?)",
+                               [(label, label_ids[label]) for label in labels] +
+                               [(spelling, label_ids[label]) for spelling, label in mapping.items()])
+        connection.executemany("INSERT INTO label_cards VALUES (?, ?, ?)",
+                               zip(label_cards.row.tolist(), label_cards.col.tolist(), label_cards.data.tolist()))
+        connection.commit()
+    finally:
+        connection.close()
+    tmp_file.replace(store_file)
+
+    num_pairs = int(off_diagonal.sum()) // 2
+    add_counts(cards=len(engine['elements']), pairs=num_pairs, labels=len(labels))
+    return {'cards': len(engine['elements']), 'pairs': num_pairs, 'labels': len(labels)}
+
+def store_is_current(store_file, source_key, canonical_names=True):
+    """Whether a store exists and was built from this export with the same settings."""
+    store_file = Path(store_file)
+    if not store_file.exists():
+        return False
+    try:
+        with AnalyticsStore(store_file) as store:
+            meta = store.meta()
+    except sqlite3.Error:
+        return False
+    return (meta.get('version') == STORE_VERSION and meta.get('source') == source_key
+            and meta.get('canonical_names') == canonical_names)
+
+class AnalyticsStore:
+    """
+    Read-only query API over an analytics store.
+    Every lookup is answered from an index, so it takes milliseconds no
+    matter how many participants the store was built from. Card and label
+    names are matched case-insensitively, and labels by any merged spelling.
+    """
+
+    def __init__(self, store_file=STORE_FILE):
+        store_file = Path(store_file)
+        if not store_file.exists():
+            raise FileNotFoundError(f"Analytics store not found at {store_file}")
+        # check_same_thread=False so the HTTP server's threads can share it
+        self.connection = sqlite3.connect(f"{store_file.resolve().as_uri()}?mode=ro", uri=True,
+                                          check_same_thread=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Close the database connection."""
+        self.connection.close()
+
+    def meta(self):
+        """Return the build metadata (version, build time, participants, source)."""
+        return {key: json.loads(value) for key, value in self.connection.execute("SELECT key, value FROM meta")}
+
+    def card_id(self, card):
+        """Return a card's ID, or None if the card is unknown."""
+        row = self.connection.execute("SELECT id FROM cards WHERE name = ?", (card,)).fetchone()
+        return row[0] if row else None
+
+    def label_id(self, label):
+        """Return the canonical label ID for any spelling, or None if unknown."""
+        row = self.connection.execute("SELECT label_id FROM label_spellings WHERE spelling = ?",
+                                      (label,)).fetchone()
+        return row[0] if row else None
+
+    def cards(self):
+        """
+        List every card with its frequency, most frequent first.
+        Returns a list of dicts with 'card' and 'frequency'.
+        """
+        rows = self.connection.execute("SELECT name, frequency FROM cards ORDER BY frequency DESC, id")
+        return [{'card': name, 'frequency': frequency} for name, frequency in rows]
+
+    def labels(self, limit=None):
+        """
+        List the canonical group names, most used first (all of them if
+        limit is None).
+        Returns a list of dicts with 'label', 'count' and 'spellings'.
+        """
+        query = "SELECT id, name, count FROM labels ORDER BY count DESC, id"
+        if limit is None:
+            rows = self.connection.execute(query).fetchall()
+        else:
+            rows = self.connection.execute(query + " LIMIT ?", (check_limit(limit),)).fetchall()
+        return [
+            {'label': name, 'count': count, 'spellings': [
+                spelling for (spelling,) in self.connection.execute(
+                    "SELECT spelling FROM label_spellings WHERE label_id = ? AND spelling != ?", (label_id, name))
+            ]}
+            for label_id, name, count in rows
+        ]
+
+    def top_neighbors(self, card, limit=DEFAULT_LIMIT):
+        """
+        Find the cards most often grouped with a card.
+        Limits up to TOP_NEIGHBORS come from the precomputed neighbors table;
+        larger ones walk the co-occurrence index.
+        Returns a list of dicts with 'card' and 'count' (None if the card is unknown).
+        """
+        check_limit(limit)
+        card_id = self.card_id(card)
+        if card_id is None:
+            return None
+        if limit <= TOP_NEIGHBORS:
+            query = ("SELECT cards.name, neighbors.count FROM neighbors JOIN cards ON cards.id = neighbors.other_id "
+                     "WHERE neighbors.card_id = ? ORDER BY neighbors.rank LIMIT ?")
+        else:
+            query = ("SELECT cards.name, cooccurrence.count FROM cooccurrence "
+                     "JOIN cards ON cards.id = cooccurrence.other_id WHERE cooccurrence.card_id = ? "
+                     "ORDER BY cooccurrence.count DESC, cooccurrence.other_id LIMIT ?")
+        return [{'card': name, 'count': count} for name, count in self.connection.execute(query, (card_id, limit))]
+
+    def pair_count(self, card, other):
+        """Return how many times two cards were grouped together (None if either is unknown)."""
+        card_id, other_id = self.card_id(card), self.card_id(other)
+        if card_id is None or other_id is None:
+            return None
+        row = self.connection.execute("SELECT count FROM cooccurrence WHERE card_id = ? AND other_id = ?",
+                                      (card_id, other_id)).fetchone()
+        return row[0] if row else 0
+
+    def cards_for_label(self, label, limit=DEFAULT_LIMIT):
+        """
+        Find the cards most often placed in groups with a given name.
+        Returns a dict with the canonical 'label' and its 'cards' (list of
+        dicts with 'card' and 'count'), or None if the label is unknown.
+        """
+        check_limit(limit)
+        label_id = self.label_id(label)
+        if label_id is None:
+            return None
+        name = self.connection.execute("SELECT name FROM labels WHERE id = ?", (label_id,)).fetchone()[0]
+        rows = self.connection.execute(
+            "SELECT cards.name, label_cards.count FROM label_cards JOIN cards ON cards.id = label_cards.card_id "
+            "WHERE label_cards.label_id = ? ORDER BY label_cards.count DESC, label_cards.card_id LIMIT ?",
+            (label_id, limit)
+        )
+        return {'label': name, 'cards': [{'card': card, 'count': count} for card, count in rows]}
+
+class StoreRequestHandler(BaseHTTPRequestHandler):
+    """
+    JSON endpoints over an AnalyticsStore (a local stand-in for a backend):
+        /api/meta, /api/cards, /api/labels?limit=N,
+        /api/cards/<card>/neighbors?limit=N, /api/labels/<label>/cards?limit=N
+    """
+
+    store = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        query = parse_qs(url.query)
+        try:
+            limit = positive_int(query['limit'][0]) if 'limit' in query else None
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+
+        if parts == ['api', 'meta']:
+            result = self.store.meta()
+        elif parts == ['api', 'cards']:
+            result = self.store.cards()
+        elif parts == ['api', 'labels']:
+            result = self.store.labels(limit)
+        elif len(parts) == 4 and parts[:2] == ['api', 'cards'] and parts[3] == 'neighbors':
+            result = self.store.top_neighbors(parts[2], DEFAULT_LIMIT if limit is None else limit)
+        elif len(parts) == 4 and parts[:2] == ['api', 'labels'] and parts[3] == 'cards':
+            result = self.store.cards_for_label(parts[2], DEFAULT_LIMIT if limit is None else limit)
+        else:
+            self.send_json(404, {'error': f"Unknown endpoint: {url.path}"})
+            return
+
+        if result is None:
+            self.send_json(404, {'error': f"Not found: {parts[2]}"})
+        else:
+            self.send_json(200, result)
+
+    def send_json(self, status, body):
+        """Send a JSON response (with CORS open, so the Vite dev server can call it)."""
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(payload)
+
+def serve(store_file=STORE_FILE, port=DEFAULT_PORT):
+    """Serve the store's JSON endpoints on localhost until interrupted."""
+    store = AnalyticsStore(store_file)
+    handler = type('Handler', (StoreRequestHandler,), {'store': store})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    print(f"Serving {store_file.name} at http://127.0.0.1:{port}/api/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.close()
+
+def print_results(title, rows):
+    """Print query results as a numbered list."""
+    print(f"\n{title}")
+    for rank, row in enumerate(rows, 1):
+        print(f"  {rank}. {row['card']}: {row['count']}")
+
+def parse_args(argv=None):
+    """Parse command line options for the analytics store."""
+    parser = argparse.ArgumentParser(description="Build and query the precomputed card sort analytics store.")
+    parser.add_argument('--excel-file', type=Path, default=EXCEL_FILE,
+                        help="Survey export to build from")
+    parser.add_argument('--store-file', type=Path, default=STORE_FILE,
+                        help=f"SQLite store to build or query (default: {STORE_FILE.name})")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rebuild the store even if the export hasn't changed")
+    parser.add_argument('--raw-names', action='store_true',
+                        help="Store group names exactly as typed instead of merging spelling variants")
+    # Defined here rather than with validation.add_validation_arguments so queries never load validation
+    parser.add_argument('--validate', action='store_true',
+                        help="Leave out survey previews, duplicate submissions and degenerate sorts "
+                             "(see validation.py)")
+    parser.add_argument('--neighbors', metavar='CARD',
+                        help="Print the cards most often grouped with CARD")
+    parser.add_argument('--label', metavar='LABEL',
+                        help="Print the cards most often placed in groups named LABEL")
+    parser.add_argument('--limit', type=positive_int, default=DEFAULT_LIMIT,
+                        help=f"Number of query results (default: {DEFAULT_LIMIT})")
+    parser.add_argument('--serve', type=int, nargs='?', const=DEFAULT_PORT, default=None, metavar='PORT',
+                        help=f"Serve the store over HTTP on localhost (default port: {DEFAULT_PORT})")
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function to build the analytics store and answer queries from it."""
+    args = parse_args(argv)
+    with profile_session(args.profile, args.cprofile):
+        try:
+            querying = args.neighbors or args.label or args.serve is not None
+            if not querying or args.rebuild:
+                source_key = workbook_key(args.excel_file)
+                if args.validate:
+                    source_key['validated'] = True
+                if not args.rebuild and store_is_current(args.store_file, source_key, not args.raw_names):
+                    print(f"Analytics store is up to date: {args.store_file}")
+                else:
+                    print(f"Reading Excel file: {args.excel_file}")
+                    # Imported here so queries and up-to-date checks never load the analysis modules
+                    from pipeline import load_participant_model
+                    from survey_schema import read_survey_columns
+                    from validation import load_keep_mask
+                    df, _ = read_survey_columns(args.excel_file, card_sort=True)
+                    keep = load_keep_mask(args.excel_file) if args.validate else None
+                    model = load_participant_model(df, keep=keep)
+                    print(f"Processed {len(model)} participants")
+                    counts = build_store(model, args.store_file, source_key, canonical_names=not args.raw_names)
+                    print(f"Stored {counts['cards']} cards, {counts['pairs']} pairs and {counts['labels']} labels")
+                    print(f"Analytics store written to: {args.store_file}")
+
+            if args.neighbors or args.label:
+                with AnalyticsStore(args.store_file) as store:
+                    if args.neighbors:
+                        neighbors = store.top_neighbors(args.neighbors, args.limit)
+                        if neighbors is None:
+                            print(f"Unknown card: {args.neighbors}")
+                        else:
+                            print_results(f"Cards most often grouped with {args.neighbors}:", neighbors)
+                    if args.label:
+                        result = store.cards_for_label(args.label, args.limit)
+                        if result is None:
+                            print(f"Unknown group name: {args.label}")
+                        else:
+                            print_results(f"Cards most often placed under {result['label']}:", result['cards'])
+            if args.serve is not None:
+                serve(args.store_file, args.serve)
+
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+        except Exception as e:
+            print(f"Error processing file: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == "__main__":
+    main()
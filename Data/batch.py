@@ -0,0 +1,366 @@
+"""
+Batch Analysis
+Analyzes several survey exports (one per section or term, called waves here)
+in one run. Each export is loaded, parsed and analyzed in its own worker
+process, so the batch takes about as long as its slowest wave (plus the
+merged analysis). Writes the summary and
+groupings reports for every wave and for all waves merged, plus a
+wave-to-wave comparison of group name ranks and top card pairs.
+"""
+
+import argparse
+import glob
+import io
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from pathlib import Path
+
+from card_model import CardSortModel
+from card_sort_parser import get_group_columns, fit_group_columns, extract_card_model
+from cooccurrence import build_cooccurrence, pair_counts_from_matrix
+from groupings_analyzer import (
+    analyze_groupings,
+    write_groupings,
+    groupings_tables
+)
+from lazy_imports import lazy_module
+from main import (
+    COLUMNS_TO_ANALYZE,
+    analyze_columns,
+    count_items,
+    write_summary,
+    summary_tables
+)
+from profiling import add_profile_arguments, profile_session, profiled
+from reports import REPORT_DIR, REPORT_FORMATS, TEXT_FORMAT, print_written, write_tables, write_text
+from survey_schema import read_survey_columns
+from validation import add_validation_arguments, first_row, load_keep_mask, select_participants, select_rows
+
+pd = lazy_module('pandas')
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+BATCH_DIR = REPORT_DIR / "batch"
+DEFAULT_PATTERN = "*.xlsx"
+MERGED_NAME = "merged"
+DIFF_FILE_NAME = "WaveDiff.txt"
+
+# Rows shown per wave pair in the comparison (top N of either wave)
+DIFF_TOP_NAMES = 15
+DIFF_TOP_PAIRS = 30
+
+def find_exports(pattern=DEFAULT_PATTERN, order='name'):
+    """
+    Find the survey exports matching a glob pattern (relative patterns are
+    resolved against the script directory). Excel lock files (~$...) are skipped.
+    Returns the list of paths, sorted by name or by modification time.
+    """
+    if not Path(pattern).is_absolute():
+        pattern = str(SCRIPT_DIR / pattern)
+    files = [Path(path) for path in glob.glob(pattern) if not Path(path).name.startswith('~$')]
+    if order == 'mtime':
+        return sorted(files, key=lambda path: (path.stat().st_mtime, path.name))
+    return sorted(files)
+
+def wave_names(export_files):
+    """Name each wave after its file, adding the folder name when two files share a name."""
+    stems = Counter(path.stem for path in export_files)
+    return [path.stem if stems[path.stem] == 1 else f"{path.parent.name}_{path.stem}" for path in export_files]
+
+def analyze_card_sort(model, canonical_names=True):
+    """
+    Run the groupings analysis for one model.
+    Returns the analyze_groupings results, plus 'pair_ranks' (every pair in
+    descending count order) and 'num_participants'.
+    """
+    engine = build_cooccurrence(model)
+    results = analyze_groupings(model.group_name_counts(), engine, canonical_names)
+    results['pair_ranks'] = pair_counts_from_matrix(engine)
+    results['num_participants'] = len(model)
+    return results
+
+def analyze_wave(export_file, validate=False, canonical_names=True):
+    """
+    Worker: load one export (through the workbook cache), parse its
+    free-text answers and card sort and run the groupings analysis on it,
+    leaving out the responses validation flags in it if validate is True.
+    The console output is captured rather than interleaved with the other
+    workers'.
+    Returns a dict with 'file', 'rows', 'summary', 'groupings' (see
+    analyze_card_sort), 'model' (for the merged analysis) and 'log'.
+    """
+    log = io.StringIO()
+    with redirect_stdout(log):
+        df, schema = read_survey_columns(export_file, [column for column, _ in COLUMNS_TO_ANALYZE], card_sort=True)
+        keep = load_keep_mask(export_file) if validate else None
+        summary = analyze_columns(select_rows(df, keep), COLUMNS_TO_ANALYZE)
+        model = extract_card_model(df, *fit_group_columns(df, *get_group_columns(schema)), first_row(keep))
+        model = select_participants(model, keep)
+        groupings = analyze_card_sort(model, canonical_names)
+    return {'file': str(export_file), 'rows': len(df), 'summary': summary, 'groupings': groupings,
+            'model': model, 'log': log.getvalue()}
+
+@profiled
+def load_waves(export_files, workers=1, validate=False, canonical_names=True):
+    """
+    Analyze every export, in a process pool if workers > 1. A wave that
+    fails to load is reported and left out instead of stopping the batch.
+    Returns the list of wave dicts (see analyze_wave) with their 'name', in order.
+    """
+    names = wave_names(export_files)
+    waves = []
+    if workers > 1 and len(export_files) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(export_files))) as executor:
+            futures = [executor.submit(analyze_wave, export_file, validate, canonical_names)
+                       for export_file in export_files]
+            outcomes = []
+            for future in futures:
+                try:
+                    outcomes.append(future.result())
+                except Exception as e:
+                    outcomes.append(e)
+    else:
+        outcomes = []
+        for export_file in export_files:
+            try:
+                outcomes.append(analyze_wave(export_file, validate, canonical_names))
+            except Exception as e:
+                outcomes.append(e)
+
+    for name, export_file, outcome in zip(names, export_files, outcomes):
+        if isinstance(outcome, Exception):
+            print(f"Warning: Skipping {export_file.name}: {outcome}")
+            continue
+        outcome['name'] = name
+        print(f"  {name}: {outcome['rows']} rows, {len(outcome['model'])} participants")
+        for line in outcome['log'].splitlines():
+            if line.lstrip().lower().startswith('warning'):
+                print(f"    {line.strip()}")
+        waves.append(outcome)
+    return waves
+
+def merge_summaries(summaries):
+    """
+    Merge the per-wave summary results: items are concatenated in wave order
+    and recounted, so ties rank by first appearance as in a single export.
+    Returns a results dict like main.analyze_columns.
+    """
+    merged = {}
+    for _, question_text in COLUMNS_TO_ANALYZE:
+        waves = [summary[question_text] for summary in summaries if question_text in summary]
+        all_items = [item for data in waves for item in data['all_items']]
+        columns = list(dict.fromkeys(data['column'] for data in waves))
+        merged[question_text] = {
+            'all_items': all_items,
+            'top_10': count_items(pd.Series(all_items, dtype=object), 10),
+            'column': '/'.join(columns)
+        }
+    return merged
+
+def name_spellings(groupings):
+    """Map every spelling of a group name to its display name in the given results."""
+    spellings = {}
+    for display in groupings['group_name_counts']:
+        spellings[display] = display
+        for variant in groupings.get('group_name_variants', {}).get(display, []):
+            spellings[variant] = display
+    return spellings
+
+def ranked(counts, key=lambda item: item):
+    """Returns a dict of key(item) -> (rank, count) for a Counter, most common first."""
+    return {key(item): (rank, count) for rank, (item, count) in enumerate(counts.most_common(), 1)}
+
+def diff_rows(before, after, top_n):
+    """
+    Compare two rankings (key -> (rank, count)) over the keys in the top
+    top_n of either one, ordered by the later rank and then the earlier.
+    Returns a list of (key, before (rank, count) or None, after (rank, count) or None).
+    """
+    keys = [key for key, (rank, _) in before.items() if rank <= top_n]
+    shown = set(keys)
+    keys += [key for key, (rank, _) in after.items() if rank <= top_n and key not in shown]
+    missing = float('inf')
+    keys.sort(key=lambda key: (after.get(key, (missing,))[0], before.get(key, (missing,))[0]))
+    return [(key, before.get(key), after.get(key)) for key in keys]
+
+def compare_waves(before, after, spellings, top_names=DIFF_TOP_NAMES, top_pairs=DIFF_TOP_PAIRS):
+    """
+    Compare the groupings of two waves. Group names are matched through the
+    merged results' spellings, so a name is the same row in every wave even
+    when its most common spelling differs between waves.
+    Returns a dict with 'before', 'after' (wave names and participant counts),
+    'names' and 'pairs' (see diff_rows).
+    """
+    def merged_name(name):
+        return spellings.get(name, name)
+
+    return {
+        'before': (before['name'], before['groupings']['num_participants']),
+        'after': (after['name'], after['groupings']['num_participants']),
+        'names': diff_rows(ranked(before['groupings']['group_name_counts'], merged_name),
+                           ranked(after['groupings']['group_name_counts'], merged_name), top_names),
+        'pairs': diff_rows(ranked(before['groupings']['pair_ranks']),
+                           ranked(after['groupings']['pair_ranks']), top_pairs)
+    }
+
+def share(entry, num_participants):
+    """Format a count per 100 of the wave's participants ('-' if absent)."""
+    if entry is None or not num_participants:
+        return '-'
+    return f"{100 * entry[1] / num_participants:.1f}"
+
+def rank_change(before, after):
+    """Places moved up (+) or down (-) between two waves, 'new' or 'gone'."""
+    if before is None:
+        return 'new'
+    if after is None:
+        return 'gone'
+    return f"{before[0] - after[0]:+d}" if before[0] != after[0] else '0'
+
+def diff_lines(diffs):
+    """Yield the lines of the wave-to-wave comparison report."""
+    yield "=" * 80 + "\n"
+    yield "WAVE-TO-WAVE COMPARISON\n"
+    yield "=" * 80 + "\n\n"
+    if not diffs:
+        yield "  (Need at least two waves to compare)\n"
+        return
+
+    for diff in diffs:
+        (before_name, before_total), (after_name, after_total) = diff['before'], diff['after']
+        yield "-" * 80 + "\n"
+        yield f"{before_name} ({before_total} participants) -> {after_name} ({after_total} participants)\n"
+        yield "-" * 80 + "\n\n"
+
+        yield f"Group name ranks (top {DIFF_TOP_NAMES} in either wave, /100 = uses per 100 participants):\n"
+        yield f"  {'Before':>6}  {'After':>6}  {'Change':>6}  {'Bef/100':>8}  {'Aft/100':>8}  Group name\n"
+        for name, before, after in diff['names']:
+            yield (f"  {before[0] if before else '-':>6}  {after[0] if after else '-':>6}  "
+                   f"{rank_change(before, after):>6}  {share(before, before_total):>8}  "
+                   f"{share(after, after_total):>8}  {name}\n")
+
+        yield f"\nTop pair ranks (top {DIFF_TOP_PAIRS} in either wave, /100 = times grouped per 100 participants):\n"
+        yield f"  {'Before':>6}  {'After':>6}  {'Change':>6}  {'Bef/100':>8}  {'Aft/100':>8}  Pair\n"
+        for pair, before, after in diff['pairs']:
+            yield (f"  {before[0] if before else '-':>6}  {after[0] if after else '-':>6}  "
+                   f"{rank_change(before, after):>6}  {share(before, before_total):>8}  "
+                   f"{share(after, after_total):>8}  {pair[0]} + {pair[1]}\n")
+        yield "\n"
+
+def diff_tables(diffs):
+    """
+    Build the structured version of the wave comparison.
+    Returns a dict of table name -> (columns, rows) for reports.write_tables.
+    """
+    def fields(before, after):
+        return {
+            'rank_before': before[0] if before else None,
+            'rank_after': after[0] if after else None,
+            'count_before': before[1] if before else 0,
+            'count_after': after[1] if after else 0
+        }
+
+    names, pairs = [], []
+    for diff in diffs:
+        waves = {
+            'wave_before': diff['before'][0], 'participants_before': diff['before'][1],
+            'wave_after': diff['after'][0], 'participants_after': diff['after'][1]
+        }
+        for name, before, after in diff['names']:
+            names.append({**waves, 'group_name': name, **fields(before, after)})
+        for pair, before, after in diff['pairs']:
+            pairs.append({**waves, 'card_a': pair[0], 'card_b': pair[1], **fields(before, after)})
+
+    wave_columns = ['wave_before', 'participants_before', 'wave_after', 'participants_after']
+    rank_columns = ['rank_before', 'rank_after', 'count_before', 'count_after']
+    return {
+        'wave_diff_names': (wave_columns + ['group_name'] + rank_columns, names),
+        'wave_diff_pairs': (wave_columns + ['card_a', 'card_b'] + rank_columns, pairs)
+    }
+
+def write_wave_reports(name, summary, groupings, output_dir, formats):
+    """Write one wave's (or the merged) summary and groupings reports to output_dir / name."""
+    wave_dir = Path(output_dir) / name
+    wave_dir.mkdir(parents=True, exist_ok=True)
+    if TEXT_FORMAT in formats:
+        write_summary(summary, wave_dir / "Summary.txt")
+        write_groupings(groupings, wave_dir / "Groupings.txt")
+        print(f"Reports written to: {wave_dir}")
+    tables = {**summary_tables(summary), **groupings_tables(groupings)}
+    print_written(write_tables(tables, formats, wave_dir))
+
+@profiled
+def run_batch(export_files, output_dir=BATCH_DIR, workers=1, canonical_names=True, formats=(TEXT_FORMAT,),
+              validate=False):
+    """
+    Analyze every export, merge them and compare consecutive waves. With
+    validate, each wave leaves out the responses validation flags in it.
+    Each wave's group names are canonicalized on their own; the comparison
+    folds them into the merged run's spellings (see name_spellings).
+    Returns a dict with 'waves', 'merged' (summary and groupings) and 'diffs'.
+    """
+    print(f"Analyzing {len(export_files)} export(s) with {max(1, min(workers, len(export_files)))} worker(s)...")
+    waves = load_waves(export_files, workers, validate, canonical_names)
+    if not waves:
+        raise FileNotFoundError("no survey export could be analyzed")
+
+    print("\nAnalyzing all waves merged...")
+    merged = {
+        'summary': merge_summaries([wave['summary'] for wave in waves]),
+        'groupings': analyze_card_sort(CardSortModel.concat([wave['model'] for wave in waves]), canonical_names)
+    }
+    write_wave_reports(MERGED_NAME, merged['summary'], merged['groupings'], output_dir, formats)
+
+    for wave in waves:
+        write_wave_reports(wave['name'], wave['summary'], wave['groupings'], output_dir, formats)
+
+    spellings = name_spellings(merged['groupings'])
+    diffs = [compare_waves(before, after, spellings) for before, after in zip(waves, waves[1:])]
+    if TEXT_FORMAT in formats:
+        diff_file = Path(output_dir) / DIFF_FILE_NAME
+        write_text(diff_lines(diffs), diff_file)
+        print(f"\nWave comparison written to: {diff_file}")
+    print_written(write_tables(diff_tables(diffs), formats, output_dir))
+
+    return {'waves': waves, 'merged': merged, 'diffs': diffs}
+
+def parse_args(argv=None):
+    """Parse command line options for the batch run."""
+    parser = argparse.ArgumentParser(description="Analyze several survey exports concurrently and compare them.")
+    parser.add_argument('pattern', nargs='?', default=DEFAULT_PATTERN,
+                        help=f"Glob of exports to analyze, relative to {SCRIPT_DIR.name}/ "
+                             f"(default: {DEFAULT_PATTERN})")
+    parser.add_argument('--order', choices=('name', 'mtime'), default='name',
+                        help="Order of the waves for the comparison (default: name)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="Worker processes, one export each (default: CPU count)")
+    parser.add_argument('--output-dir', type=Path, default=BATCH_DIR,
+                        help="Directory for the per-wave, merged and comparison reports "
+                             f"(default: {BATCH_DIR.relative_to(SCRIPT_DIR)}/)")
+    parser.add_argument('--raw-names', action='store_true',
+                        help="Count group names exactly as typed instead of merging spelling variants")
+    parser.add_argument('--format', nargs='+', choices=REPORT_FORMATS, default=[TEXT_FORMAT], dest='formats',
+                        help="Report formats to write (default: text)")
+    add_validation_arguments(parser)
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function to run the batch analysis."""
+    args = parse_args(argv)
+    with profile_session(args.profile, args.cprofile):
+        try:
+            export_files = find_exports(args.pattern, args.order)
+            if not export_files:
+                print(f"Error: No survey exports match {args.pattern}")
+                return
+            run_batch(export_files, args.output_dir, args.workers, not args.raw_names, args.formats, args.validate)
+        except Exception as e:
+            print(f"Error processing files: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == "__main__":
+    main()
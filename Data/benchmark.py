@@ -0,0 +1,432 @@
+"""
+Benchmarks
+Times each analysis stage (load, extract, parse, count, report write) on the
+real export or a synthetic one, records peak memory and compares the run
+against a saved JSON baseline. Also times the per-cell and bulk card sort
+extraction paths against each other, and the startup (python -X importtime)
+of the command line scripts.
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from card_sort_parser import (
+    EXCEL_FILE,
+    FIRST_RESPONSE_ROW,
+    KNOWN_CARDS,
+    get_group_columns,
+    fit_group_columns,
+    process_participant,
+    extract_participants,
+    extract_card_model,
+    write_card_sort
+)
+from cooccurrence import build_cooccurrence
+from groupings_analyzer import analyze_group_names, analyze_groupings, write_groupings
+from lazy_imports import lazy_module
+from main import COLUMNS_TO_ANALYZE, analyze_columns, write_summary
+from survey_schema import schema_from_frame
+from synthetic_survey import MAX_GROUPS, write_survey
+from workbook_cache import read_survey
+
+pd = lazy_module('pandas')
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+
+# Stages in the order they run
+BENCHMARK_STAGES = ('load', 'extract', 'parse', 'count', 'write')
+# Slowdown (as a fraction) tolerated before a stage is flagged against the baseline
+DEFAULT_TOLERANCE = 0.2
+
+# Commands timed by --startup; {store} is a prebuilt analytics store and {card} a card name
+STARTUP_COMMANDS = (
+    ('main --help', ['main.py', '--help']),
+    ('card_sort_parser --help', ['card_sort_parser.py', '--help']),
+    ('groupings_analyzer --help', ['groupings_analyzer.py', '--help']),
+    ('pipeline --help', ['pipeline.py', '--help']),
+    ('incremental --help', ['incremental.py', '--help']),
+    ('batch --help', ['batch.py', '--help']),
+    ('analytics_store up to date', ['analytics_store.py', '--store-file', '{store}']),
+    ('analytics_store --neighbors', ['analytics_store.py', '--store-file', '{store}', '--neighbors', '{card}']),
+)
+# Libraries a fast startup should not import
+HEAVY_MODULES = ('pandas', 'numpy', 'scipy', 'openpyxl')
+# Lazily imported libraries loaded before the stages are timed, as the
+# scripts' imports used to do at startup
+STAGE_LIBRARIES = ('numpy', 'pandas', 'scipy.sparse')
+
+def scale_rows(df, factor, first_row=FIRST_RESPONSE_ROW):
+    """
+    Repeat the response rows of the export `factor` times.
+    The header rows before first_row are kept once at the top.
+    """
+    if factor <= 1:
+        return df
+    responses = df.iloc[first_row:]
+    return pd.concat([df.iloc[:first_row]] + [responses] * factor, ignore_index=True)
+
+def time_call(func, repeat=3):
+    """
+    Call func `repeat` times.
+    Returns tuple of (best_seconds, last_result)
+    """
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+def extract_with_iloc(df, group_start, group_end, name_start, name_end, first_row=FIRST_RESPONSE_ROW):
+    """Reference extraction: process_participant for every row, as main() used to do."""
+    participants_data = []
+    for row_index in range(first_row, len(df)):
+        groups = process_participant(row_index, df, group_start, group_end, name_start, name_end)
+        if groups:
+            participants_data.append({
+                'participant_number': row_index + 1,
+                'groups': groups
+            })
+    return participants_data
+
+def benchmark_extraction(df, repeat=3):
+    """
+    Time the per-cell iloc path against extract_participants on the same data.
+    Returns a dict with both timings, the speedup and whether the results match.
+    """
+    group_start, group_end, name_start, name_end = get_group_columns(schema_from_frame(df))
+    group_end = min(group_end, len(df.columns) - 1)
+    name_end = min(name_end, len(df.columns) - 1)
+    ranges = (group_start, group_end, name_start, name_end)
+
+    iloc_seconds, expected = time_call(lambda: extract_with_iloc(df, *ranges), repeat)
+    bulk_seconds, actual = time_call(lambda: extract_participants(df, *ranges), repeat)
+
+    return {
+        'rows': len(df),
+        'participants': len(actual),
+        'iloc_seconds': iloc_seconds,
+        'bulk_seconds': bulk_seconds,
+        'speedup': iloc_seconds / bulk_seconds if bulk_seconds else float('inf'),
+        'match': expected == actual,
+    }
+
+def load_export(export_file):
+    """Load an export the way the scripts do (pd.read_excel, or pd.read_csv for CSVs)."""
+    if Path(export_file).suffix.lower() == '.csv':
+        return pd.read_csv(export_file)
+    return pd.read_excel(export_file)
+
+def stage_functions(export_file, output_dir):
+    """
+    Build the benchmarked stages. Each stage takes the previous stages'
+    results dict and returns its own result; report files go to output_dir.
+    Returns a list of (stage name, function) tuples in BENCHMARK_STAGES order.
+    """
+    output_dir = Path(output_dir)
+
+    def extract(state):
+        ranges = fit_group_columns(state['load'], *get_group_columns(schema_from_frame(state['load'])))
+        return extract_card_model(state['load'], *ranges)
+
+    def count(state):
+        participants_data = state['extract']
+        return analyze_groupings(analyze_group_names(participants_data), build_cooccurrence(participants_data))
+
+    def write(state):
+        write_summary(state['parse'], output_dir / "Summary.txt")
+        write_card_sort(state['extract'], output_dir / "CardSort.txt")
+        write_groupings(state['count'], output_dir / "Groupings.txt")
+
+    return [
+        ('load', lambda state: load_export(export_file)),
+        ('extract', extract),
+        ('parse', lambda state: analyze_columns(state['load'], COLUMNS_TO_ANALYZE)),
+        ('count', count),
+        ('write', write)
+    ]
+
+def run_stages(stages, measure_memory=False):
+    """
+    Run the stages once, in order, with their console output suppressed.
+    Returns tuple of (seconds per stage, peak traced bytes per stage or None).
+    """
+    state, seconds, peaks = {}, {}, {}
+    for name, func in stages:
+        if measure_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            state[name] = func(state)
+        seconds[name] = time.perf_counter() - start
+        if measure_memory:
+            peaks[name] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return seconds, (peaks if measure_memory else None)
+
+def max_rss_bytes():
+    """Peak resident set size of this process in bytes."""
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+def benchmark_stages(export_file, repeat=3):
+    """
+    Time every stage on the export and measure its peak memory.
+    Timings are the best of `repeat` runs. Memory is traced in a separate run,
+    since tracemalloc slows the code it traces.
+    Returns a dict with the per-stage seconds and peak bytes plus run details.
+    """
+    for library in STAGE_LIBRARIES:
+        importlib.import_module(library)
+    with tempfile.TemporaryDirectory() as output_dir:
+        stages = stage_functions(export_file, output_dir)
+        best = {}
+        for _ in range(repeat):
+            seconds, _ = run_stages(stages)
+            for name, value in seconds.items():
+                best[name] = min(best.get(name, float('inf')), value)
+        _, peaks = run_stages(stages, measure_memory=True)
+
+    return {
+        'export': str(export_file),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'repeat': repeat,
+        'stages': {
+            name: {'seconds': best[name], 'peak_bytes': peaks[name]}
+            for name in BENCHMARK_STAGES
+        },
+        'total_seconds': sum(best.values()),
+        'max_rss_bytes': max_rss_bytes()
+    }
+
+def compare_to_baseline(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare a benchmark result with a saved baseline.
+    Returns a list of (stage, baseline seconds, current seconds, ratio, regressed)
+    tuples for the stages present in both.
+    """
+    comparison = []
+    for name in BENCHMARK_STAGES:
+        if name not in baseline.get('stages', {}) or name not in result['stages']:
+            continue
+        before = baseline['stages'][name]['seconds']
+        after = result['stages'][name]['seconds']
+        ratio = after / before if before else float('inf')
+        comparison.append((name, before, after, ratio, ratio > 1 + tolerance))
+    return comparison
+
+def print_stage_results(result):
+    """Print the per-stage timings and memory."""
+    print(f"\n{'Stage':<10} {'Seconds':>10} {'Peak MB':>10}")
+    for name in BENCHMARK_STAGES:
+        stage = result['stages'][name]
+        print(f"{name:<10} {stage['seconds']:>10.4f} {stage['peak_bytes'] / 2**20:>10.1f}")
+    print(f"{'total':<10} {result['total_seconds']:>10.4f}")
+    print(f"Max RSS: {result['max_rss_bytes'] / 2**20:.1f} MB")
+
+def print_comparison(comparison, tolerance=DEFAULT_TOLERANCE, label='Stage', width=10):
+    """Print a baseline comparison, flagging stages slower than the tolerance."""
+    print(f"\n{label:<{width}} {'Baseline':>10} {'Current':>10} {'Ratio':>8}")
+    for name, before, after, ratio, regressed in comparison:
+        flag = f"  REGRESSION (>{tolerance:.0%} slower)" if regressed else ""
+        print(f"{name:<{width}} {before:>10.4f} {after:>10.4f} {ratio:>7.2f}x{flag}")
+
+def parse_importtime(stderr):
+    """
+    Read the `python -X importtime` report from a process's stderr.
+    Returns tuple of (total import seconds, set of top-level packages imported).
+    """
+    total_us = 0
+    packages = set()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        if not self_us.strip().isdigit():
+            continue  # the column header
+        total_us += int(self_us)
+        packages.add(name.strip().split('.')[0])
+    return total_us / 1e6, packages
+
+def time_startup(argv, repeat=3):
+    """
+    Run a script `repeat` times under python -X importtime.
+    Returns a dict with the best wall clock 'seconds', the 'import_seconds'
+    of that run and the HEAVY_MODULES it imported.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, '-X', 'importtime', *argv], cwd=SCRIPT_DIR,
+                                   capture_output=True, text=True)
+        seconds = time.perf_counter() - start
+        if completed.returncode != 0:
+            raise RuntimeError(f"{' '.join(argv)} failed: {completed.stderr.strip().splitlines()[-1]}")
+        if best is None or seconds < best['seconds']:
+            import_seconds, packages = parse_importtime(completed.stderr)
+            best = {
+                'seconds': seconds,
+                'import_seconds': import_seconds,
+                'heavy_modules': [module for module in HEAVY_MODULES if module in packages]
+            }
+    return best
+
+def benchmark_startup(repeat=3):
+    """
+    Time the startup of every STARTUP_COMMANDS entry. The analytics store
+    commands run against a store built once beforehand, so they measure the
+    up-to-date check and a query rather than the build.
+    Returns a dict with each command's results plus run details.
+    """
+    with tempfile.TemporaryDirectory() as store_dir:
+        store_file = str(Path(store_dir) / "analytics.sqlite")
+        subprocess.run([sys.executable, 'analytics_store.py', '--store-file', store_file], cwd=SCRIPT_DIR,
+                       capture_output=True, check=True)
+        commands = {
+            label: time_startup([arg.format(store=store_file, card=KNOWN_CARDS[0]) for arg in argv], repeat)
+            for label, argv in STARTUP_COMMANDS
+        }
+    return {'python': platform.python_version(), 'repeat': repeat, 'startup': commands}
+
+def compare_startup_to_baseline(result, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Like compare_to_baseline, for the commands of a startup benchmark."""
+    comparison = []
+    for label, timing in result['startup'].items():
+        if label not in baseline.get('startup', {}):
+            continue
+        before, after = baseline['startup'][label]['seconds'], timing['seconds']
+        ratio = after / before if before else float('inf')
+        comparison.append((label, before, after, ratio, ratio > 1 + tolerance))
+    return comparison
+
+def print_startup_results(result):
+    """Print the startup timings and any heavy libraries each command imported."""
+    width = max(len(label) for label in result['startup'])
+    print(f"\n{'Command':<{width}} {'Seconds':>10} {'Imports':>10}  Heavy imports")
+    for label, timing in result['startup'].items():
+        heavy = ', '.join(timing['heavy_modules']) or '-'
+        print(f"{label:<{width}} {timing['seconds']:>10.4f} {timing['import_seconds']:>10.4f}  {heavy}")
+
+def parse_args(argv=None):
+    """Parse command line options for the benchmarks."""
+    parser = argparse.ArgumentParser(description="Benchmark the survey analysis stages.")
+    parser.add_argument('--export', type=Path, default=None,
+                        help="Benchmark an existing export instead of generating one")
+    parser.add_argument('--real', action='store_true',
+                        help="Benchmark the real survey export")
+    parser.add_argument('--respondents', type=int, default=1000,
+                        help="Synthetic responses to generate (default: 1000)")
+    parser.add_argument('--cards', type=int, default=len(KNOWN_CARDS),
+                        help=f"Synthetic card vocabulary size (default: {len(KNOWN_CARDS)})")
+    parser.add_argument('--groups', type=int, default=MAX_GROUPS,
+                        help=f"Synthetic maximum groups per respondent (default: {MAX_GROUPS})")
+    parser.add_argument('--text-length', type=int, default=3,
+                        help="Synthetic maximum items per free-text answer (default: 3)")
+    parser.add_argument('--format', choices=('xlsx', 'csv'), default='xlsx',
+                        help="Synthetic export format (default: xlsx)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Synthetic data seed (default: 0)")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="Timing repetitions; the best run is reported (default: 3)")
+    parser.add_argument('--output', type=Path, default=None,
+                        help="Save the results as a JSON baseline")
+    parser.add_argument('--baseline', type=Path, default=None,
+                        help="Compare the results with a saved JSON baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"Slowdown fraction flagged as a regression (default: {DEFAULT_TOLERANCE})")
+    parser.add_argument('--extraction', action='store_true',
+                        help="Only compare per-cell and bulk extraction on the real export")
+    parser.add_argument('--scale', type=int, default=1,
+                        help="With --extraction, repeat the response rows this many times (default: 1)")
+    parser.add_argument('--startup', action='store_true',
+                        help="Only time the startup and imports (python -X importtime) of the scripts")
+    return parser.parse_args(argv)
+
+def run_extraction_benchmark(scale, repeat):
+    """Compare per-cell and bulk extraction on the (optionally scaled) real export."""
+    df = scale_rows(read_survey(EXCEL_FILE), scale)
+    print(f"Benchmarking extraction on {len(df)} rows...")
+    result = benchmark_extraction(df, repeat)
+
+    print(f"  Participants:      {result['participants']}")
+    print(f"  Per-cell iloc:     {result['iloc_seconds']:.4f}s")
+    print(f"  Bulk extraction:   {result['bulk_seconds']:.4f}s")
+    print(f"  Speedup:           {result['speedup']:.1f}x")
+    print(f"  Results match:     {'yes' if result['match'] else 'NO'}")
+
+def main(argv=None):
+    """Run the stage benchmarks (or the extraction comparison)."""
+    args = parse_args(argv)
+
+    if args.extraction:
+        run_extraction_benchmark(args.scale, args.repeat)
+        return
+
+    if args.startup:
+        print("Timing script startup...")
+        result = benchmark_startup(args.repeat)
+        print_startup_results(result)
+        if args.baseline is not None:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+            width = max(len(label) for label in result['startup'])
+            print_comparison(compare_startup_to_baseline(result, baseline, args.tolerance), args.tolerance,
+                             'Command', width)
+        if args.output is not None:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(result, f, indent=2)
+            print(f"\nBaseline written to: {args.output}")
+        return
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        if args.export is not None:
+            export_file = args.export
+        elif args.real:
+            export_file = EXCEL_FILE
+        else:
+            export_file = Path(data_dir) / f"synthetic_survey.{args.format}"
+            print(f"Generating {args.respondents} synthetic responses ({args.cards} cards, "
+                  f"up to {args.groups} groups)...")
+            write_survey(export_file, args.respondents, args.cards, args.groups, args.text_length, args.seed)
+
+        print(f"Benchmarking stages on: {export_file}")
+        result = benchmark_stages(export_file, args.repeat)
+
+    if args.export is None and not args.real:
+        result['synthetic'] = {
+            'respondents': args.respondents,
+            'cards': args.cards,
+            'groups': args.groups,
+            'text_length': args.text_length,
+            'format': args.format,
+            'seed': args.seed
+        }
+    print_stage_results(result)
+
+    if args.baseline is not None:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        print_comparison(compare_to_baseline(result, baseline, args.tolerance), args.tolerance)
+
+    if args.output is not None:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"\nBaseline written to: {args.output}")
+
+if __name__ == "__main__":
+    main()
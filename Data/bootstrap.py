@@ -0,0 +1,299 @@
+"""
+Bootstrap Resampling
+Resamples participants with replacement to put confidence intervals on the
+top card pair counts and stability scores on the suggested card clusters.
+Each participant's pair counts are stored once in a participant x pair
+incidence matrix, so a replicate is just a multinomial weight vector over
+participants and a batch of replicates is one sparse-dense product. Batches
+are spread over a process pool, each seeded from its own SeedSequence child,
+so the results only depend on the seed (not on the number of workers).
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from clustering import cluster_cards, clusters_from_labels, membership_matrix
+from cooccurrence import pair_arrays
+from lazy_imports import lazy_module
+from profiling import add_counts, profiled
+from reports import write_text
+
+np = lazy_module('numpy')
+sparse = lazy_module('scipy.sparse')
+hierarchy = lazy_module('scipy.cluster.hierarchy')
+
+DEFAULT_REPLICATES = 2000
+DEFAULT_CONFIDENCE = 0.95
+DEFAULT_SEED = 409
+# Pairs given intervals (the top pairs of the groupings report)
+TOP_PAIRS = 30
+# Replicates drawn per task; fixed so the random streams don't depend on the worker count
+REPLICATES_PER_BATCH = 50
+
+# Inputs shared by every batch, set once per worker process
+_inputs = None
+
+def participant_pair_matrix(engine, membership, first_ids, second_ids):
+    """
+    Count how many times each participant placed each pair of cards in the
+    same group, using the same rules as pair_arrays (a card repeated m times
+    within a group pairs with itself C(m, 2) times).
+    Returns a sparse participant x pair CSR matrix.
+    """
+    columns = engine['incidence'].tocsc()
+    first, second = columns[:, first_ids], columns[:, second_ids]
+    together = first.multiply(second)
+    self_pairs = first_ids == second_ids
+    if self_pairs.any():
+        # m * m - m = 2 * C(m, 2) for a card paired with itself
+        together = together - first.multiply(self_pairs.astype(np.int64))
+        together = together.multiply(np.where(self_pairs, 0.5, 1.0)).astype(np.int64)
+    return (membership @ sparse.csr_matrix(together)).tocsr()
+
+def clustering_inputs(engine, membership, method):
+    """
+    Precompute what each replicate needs to rebuild the card similarity
+    matrix of clustering.similarity_matrix under participant weights, and
+    the reference clustering at the suggested cut.
+    Returns a dict, or None if there are fewer than three cards to cluster.
+    """
+    elements = engine['elements']
+    if len(elements) < 3:
+        return None
+    reference = cluster_cards(engine, method=method)
+    height, num_clusters = reference['suggested_cut']
+    labels = hierarchy.fcluster(reference['linkage'], t=num_clusters, criterion='maxclust')
+
+    binary = sparse.csr_matrix((engine['incidence'] > 0).astype(np.int32))
+    placed = sparse.csc_matrix(((membership @ binary) > 0).astype(np.int32))
+    # Card pairs in condensed (scipy distance vector) order: per participant,
+    # whether both cards were sorted and how often they shared a group
+    first_ids, second_ids = np.triu_indices(len(elements), k=1)
+    columns = binary.tocsc()
+    together = membership @ sparse.csr_matrix(columns[:, first_ids].multiply(columns[:, second_ids]))
+    both_sorted = placed[:, first_ids].multiply(placed[:, second_ids])
+    return {
+        'method': method,
+        'height': height,
+        'num_clusters': num_clusters,
+        'labels': labels,
+        'leaf_order': reference['leaf_order'],
+        'together': sparse.csr_matrix(together, dtype=np.float64),
+        'both_sorted': sparse.csr_matrix(both_sorted, dtype=np.float64)
+    }
+
+def cluster_match(reference_labels, labels):
+    """
+    Match each reference cluster to the replicate cluster it overlaps most
+    (by Jaccard similarity).
+    Returns tuple of (jaccard per reference cluster, whether each card landed
+    in its reference cluster's match).
+    """
+    reference = reference_labels[None, :] == np.unique(reference_labels)[:, None]
+    replicate = labels[None, :] == np.unique(labels)[:, None]
+    overlap = reference.astype(np.int32) @ replicate.T.astype(np.int32)
+    union = reference.sum(axis=1)[:, None] + replicate.sum(axis=1)[None, :] - overlap
+    jaccard = overlap / union
+    best = np.argmax(jaccard, axis=1)
+    stays = replicate[best[np.searchsorted(np.unique(reference_labels), reference_labels)],
+                      np.arange(len(labels))]
+    return jaccard.max(axis=1), stays
+
+def set_inputs(inputs):
+    """Worker initializer: keep the shared inputs for the batches."""
+    global _inputs
+    _inputs = inputs
+
+def run_batch(seed, size):
+    """
+    Worker: draw `size` replicates from a SeedSequence.
+    Each replicate weights every participant by how many times it was drawn,
+    so the replicate pair counts are weights @ pair matrix.
+    Returns tuple of (pair counts, cluster Jaccard scores, card stays) with one
+    row per replicate (the cluster arrays are None without clustering inputs).
+    """
+    inputs = _inputs
+    num_participants = inputs['pairs'].shape[0]
+    rng = np.random.default_rng(seed)
+    weights = rng.multinomial(num_participants, np.full(num_participants, 1.0 / num_participants),
+                              size=size).astype(np.float64)
+    pair_counts = (inputs['pairs'].T @ weights.T).T
+
+    clusters = inputs['clusters']
+    if clusters is None:
+        return pair_counts, None, None
+    # Condensed similarity vectors of every replicate, as in clustering.similarity_matrix
+    both_sorted = (clusters['both_sorted'].T @ weights.T).T
+    together = np.minimum((clusters['together'].T @ weights.T).T, both_sorted)
+    similarity = np.divide(together, both_sorted, out=np.zeros_like(together), where=both_sorted > 0)
+    jaccards, stays = [], []
+    for replicate_similarity in similarity:
+        tree = hierarchy.linkage(1.0 - replicate_similarity, method=clusters['method'])
+        labels = hierarchy.fcluster(tree, t=clusters['num_clusters'], criterion='maxclust')
+        jaccard, stay = cluster_match(clusters['labels'], labels)
+        jaccards.append(jaccard)
+        stays.append(stay)
+    return pair_counts, np.array(jaccards), np.array(stays)
+
+def interval(samples, confidence):
+    """Percentile interval of replicate samples (one column per statistic)."""
+    tail = (1.0 - confidence) / 2 * 100
+    return np.percentile(samples, tail, axis=0), np.percentile(samples, 100 - tail, axis=0)
+
+@profiled
+def bootstrap_groupings(engine, num_participants, replicates=DEFAULT_REPLICATES, confidence=DEFAULT_CONFIDENCE,
+                        seed=DEFAULT_SEED, workers=1, method='average', top_pairs=TOP_PAIRS, cluster=True):
+    """
+    Bootstrap participants to estimate how stable the groupings are.
+    Pair counts get percentile intervals (and rates per participant); with
+    cluster=True, each replicate is re-clustered into the same number of
+    clusters as the suggested cut, and every reference cluster is scored by
+    its best Jaccard match while every card is scored by how often it stays
+    in its cluster's match.
+    Returns a dict with 'replicates', 'confidence', 'seed',
+    'num_participants', 'pairs' (list of dicts) and 'clustering' (dict, or
+    None when clustering was skipped).
+    """
+    if 'incidence' not in engine:
+        raise ValueError("Bootstrapping needs the incidence matrix (not available when streaming)")
+    membership = membership_matrix(engine['group_participant'], num_participants)
+    num_participants = membership.shape[0]
+    elements = engine['elements']
+
+    first_ids, second_ids, counts = pair_arrays(engine, top_pairs)
+    inputs = {
+        'pairs': participant_pair_matrix(engine, membership, first_ids, second_ids).astype(np.float64),
+        'clusters': clustering_inputs(engine, membership, method) if cluster else None
+    }
+
+    num_batches = -(-replicates // REPLICATES_PER_BATCH)
+    seeds = np.random.SeedSequence(seed).spawn(num_batches)
+    sizes = [min(REPLICATES_PER_BATCH, replicates - batch * REPLICATES_PER_BATCH) for batch in range(num_batches)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=set_inputs, initargs=(inputs,)) as executor:
+            batches = list(executor.map(run_batch, seeds, sizes))
+    else:
+        set_inputs(inputs)
+        try:
+            batches = [run_batch(batch_seed, size) for batch_seed, size in zip(seeds, sizes)]
+        finally:
+            set_inputs(None)
+    add_counts(replicates=replicates, participants=num_participants, pairs=len(counts))
+
+    pair_samples = np.concatenate([batch[0] for batch in batches])
+    low, high = interval(pair_samples, confidence)
+    pairs = [
+        {
+            'pair': tuple(sorted((elements[i], elements[j]))),
+            'count': count,
+            'rate': count / num_participants,
+            'low': float(low_count),
+            'high': float(high_count)
+        }
+        for i, j, count, low_count, high_count in zip(
+            first_ids.tolist(), second_ids.tolist(), counts.tolist(), low.tolist(), high.tolist()
+        )
+    ]
+
+    clustering = None
+    clusters = inputs['clusters']
+    if clusters is not None:
+        jaccard_samples = np.concatenate([batch[1] for batch in batches])
+        stay_rates = np.concatenate([batch[2] for batch in batches]).mean(axis=0)
+        jaccard_mean = jaccard_samples.mean(axis=0)
+        jaccard_low, jaccard_high = interval(jaccard_samples, confidence)
+        labels = clusters['labels']
+        # Jaccard columns follow the sorted labels; clusters are listed in leaf order
+        unique_labels = np.unique(labels)
+        cluster_entries = []
+        for members in clusters_from_labels(elements, labels, clusters['leaf_order']):
+            position = int(np.searchsorted(unique_labels, labels[engine['element_index'][members[0]]]))
+            cluster_entries.append({
+                'members': members,
+                'stability': float(jaccard_mean[position]),
+                'low': float(jaccard_low[position]),
+                'high': float(jaccard_high[position])
+            })
+        clustering = {
+            'method': clusters['method'],
+            'height': clusters['height'],
+            'num_clusters': clusters['num_clusters'],
+            'clusters': cluster_entries,
+            'membership': dict(zip(elements, stay_rates.tolist()))
+        }
+
+    return {
+        'replicates': replicates,
+        'confidence': confidence,
+        'seed': seed,
+        'num_participants': num_participants,
+        'pairs': pairs,
+        'clustering': clustering
+    }
+
+def bootstrap_lines(results):
+    """Yield the lines of the bootstrap text report."""
+    percent = f"{results['confidence']:.0%}"
+    yield "=" * 80 + "\n"
+    yield "CARD SORT BOOTSTRAP\n"
+    yield (f"({results['replicates']} replicates of {results['num_participants']} participants, "
+           f"{percent} percentile intervals, seed {results['seed']})\n")
+    yield "=" * 80 + "\n\n"
+
+    # 1. Pair counts
+    yield "-" * 80 + "\n"
+    yield "1. TOP ELEMENT PAIRS\n"
+    yield "(Count [interval], then times per participant)\n"
+    yield "-" * 80 + "\n\n"
+    if results['pairs']:
+        for rank, entry in enumerate(results['pairs'], 1):
+            pair = entry['pair']
+            yield (f"  {rank}. {pair[0]} + {pair[1]}: {entry['count']} [{entry['low']:.1f}-{entry['high']:.1f}], "
+                   f"{entry['rate']:.2f} per participant\n")
+    else:
+        yield "  (No pairs found)\n"
+    yield "\n\n"
+
+    # 2. Cluster stability
+    yield "-" * 80 + "\n"
+    yield "2. CLUSTER STABILITY\n"
+    yield "(Mean best Jaccard match across replicates [interval]; per card, share of replicates it stayed)\n"
+    yield "-" * 80 + "\n\n"
+    clustering = results['clustering']
+    if clustering:
+        yield (f"  {clustering['num_clusters']} clusters at distance {clustering['height']:.3f} "
+               f"({clustering['method']} linkage)\n\n")
+        for number, cluster in enumerate(clustering['clusters'], 1):
+            yield (f"  Cluster {number}: stability {cluster['stability']:.2f} "
+                   f"[{cluster['low']:.2f}-{cluster['high']:.2f}]\n")
+            for element in cluster['members']:
+                yield f"    - {element} ({clustering['membership'][element]:.0%})\n"
+            yield "\n"
+    else:
+        yield "  (Clustering skipped)\n"
+
+@profiled
+def write_bootstrap_report(results, output_file):
+    """Write the bootstrap intervals and cluster stability to a text file."""
+    write_text(bootstrap_lines(results), output_file)
+
+def bootstrap_tables(results):
+    """
+    Build the structured version of the bootstrap results.
+    Returns a dict of table name -> (columns, rows) for reports.write_tables.
+    """
+    pairs = [
+        {'rank': rank, 'card_a': entry['pair'][0], 'card_b': entry['pair'][1], 'count': entry['count'],
+         'rate': entry['rate'], 'low': entry['low'], 'high': entry['high']}
+        for rank, entry in enumerate(results['pairs'], 1)
+    ]
+    tables = {'bootstrap_pairs': (['rank', 'card_a', 'card_b', 'count', 'rate', 'low', 'high'], pairs)}
+    clustering = results['clustering']
+    if clustering:
+        cards = [
+            {'cluster': number, 'stability': cluster['stability'], 'low': cluster['low'],
+             'high': cluster['high'], 'card': element, 'membership': clustering['membership'][element]}
+            for number, cluster in enumerate(clustering['clusters'], 1)
+            for element in cluster['members']
+        ]
+        tables['bootstrap_clusters'] = (['cluster', 'stability', 'low', 'high', 'card', 'membership'], cards)
+    return tables
@@ -0,0 +1,197 @@
+"""
+Card Sort Model
+Compact, array-backed representation of the card sort responses. Card names
+and group names are interned once into vocabularies, and participants,
+groups and cards are stored as CSR-style offset/ID arrays:
+
+    participant p owns groups  participant_offsets[p] : participant_offsets[p + 1]
+    group g holds card IDs     card_ids[group_offsets[g] : group_offsets[g + 1]]
+
+Iterating the model still yields the participant dicts the report writers
+and legacy analyses expect, built on the fly.
+"""
+
+from collections import Counter
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+# Name given to groups the participant left unnamed
+UNNAMED_GROUP = '___'
+
+def offsets_from_counts(counts):
+    """Turn per-row counts into a CSR offsets array (length len(counts) + 1)."""
+    offsets = np.zeros(len(counts) + 1, dtype=np.int32)
+    np.cumsum(counts, out=offsets[1:])
+    return offsets
+
+def range_positions(offsets, positions):
+    """
+    Concatenate the CSR ranges offsets[p] : offsets[p + 1] of the given positions.
+    Returns tuple of (indices, counts), counts being each range's length.
+    """
+    starts = offsets[positions]
+    counts = offsets[positions + 1] - starts
+    shifts = np.repeat(starts - offsets_from_counts(counts)[:-1], counts)
+    return shifts + np.arange(len(shifts), dtype=np.int32), counts
+
+def reintern(ids, vocabulary):
+    """
+    Renumber IDs by first appearance, dropping vocabulary entries no ID uses.
+    Returns tuple of (ids, vocabulary).
+    """
+    used, first, inverse = np.unique(ids, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty(len(used), dtype=np.int32)
+    rank[order] = np.arange(len(used), dtype=np.int32)
+    return rank[inverse], [vocabulary[i] for i in used[order].tolist()]
+
+class CardSortModel:
+    """
+    Participants, their groups and the cards in each group, as int32 arrays
+    over a card vocabulary and a group name vocabulary.
+    """
+
+    __slots__ = (
+        'cards', 'card_index', 'names',
+        'participant_numbers', 'participant_offsets',
+        'group_numbers', 'group_name_ids', 'group_offsets', 'card_ids'
+    )
+
+    def __init__(self, cards, names, participant_numbers, participant_offsets,
+                 group_numbers, group_name_ids, group_offsets, card_ids):
+        self.cards = list(cards)
+        self.card_index = {card: i for i, card in enumerate(self.cards)}
+        self.names = list(names)
+        self.participant_numbers = np.asarray(participant_numbers, dtype=np.int32)
+        self.participant_offsets = np.asarray(participant_offsets, dtype=np.int32)
+        self.group_numbers = np.asarray(group_numbers, dtype=np.int32)
+        self.group_name_ids = np.asarray(group_name_ids, dtype=np.int32)
+        self.group_offsets = np.asarray(group_offsets, dtype=np.int32)
+        self.card_ids = np.asarray(card_ids, dtype=np.int32)
+
+    @classmethod
+    def empty(cls):
+        """A model with no participants."""
+        zero = np.zeros(1, dtype=np.int32)
+        return cls([], [], [], zero, [], [], zero, [])
+
+    @classmethod
+    def from_participants(cls, participants_data):
+        """Build the model from a list of participant dicts (card_sort_parser format)."""
+        card_index, name_index = {}, {}
+        participant_numbers, groups_per_participant = [], []
+        group_numbers, group_name_ids, cards_per_group, card_ids = [], [], [], []
+        for participant in participants_data:
+            participant_numbers.append(participant['participant_number'])
+            groups_per_participant.append(len(participant['groups']))
+            for group in participant['groups']:
+                group_numbers.append(group['number'])
+                group_name_ids.append(name_index.setdefault(group['name'], len(name_index)))
+                cards_per_group.append(len(group['elements']))
+                card_ids.extend(card_index.setdefault(element, len(card_index)) for element in group['elements'])
+        return cls(
+            list(card_index), list(name_index),
+            participant_numbers, offsets_from_counts(groups_per_participant),
+            group_numbers, group_name_ids, offsets_from_counts(cards_per_group), card_ids
+        )
+
+    @classmethod
+    def concat(cls, models):
+        """
+        Join models (e.g. per-shard results) in order, re-interning the
+        vocabularies so IDs keep first-appearance order across the whole run.
+        """
+        models = [model for model in models if len(model)]
+        if not models:
+            return cls.empty()
+        card_index, name_index = {}, {}
+        card_maps, name_maps = [], []
+        for model in models:
+            card_maps.append(np.array([card_index.setdefault(c, len(card_index)) for c in model.cards],
+                                      dtype=np.int32))
+            name_maps.append(np.array([name_index.setdefault(n, len(name_index)) for n in model.names],
+                                      dtype=np.int32))
+        return cls(
+            list(card_index), list(name_index),
+            np.concatenate([model.participant_numbers for model in models]),
+            offsets_from_counts(np.concatenate([np.diff(model.participant_offsets) for model in models])),
+            np.concatenate([model.group_numbers for model in models]),
+            np.concatenate([name_map[model.group_name_ids] for model, name_map in zip(models, name_maps)]),
+            offsets_from_counts(np.concatenate([np.diff(model.group_offsets) for model in models])),
+            np.concatenate([card_map[model.card_ids] for model, card_map in zip(models, card_maps)])
+        )
+
+    def select(self, keep):
+        """
+        Build a model of only the participants where keep (one flag per
+        participant) is True, with the vocabularies re-interned so it matches
+        a model extracted from those participants alone.
+        """
+        positions = np.flatnonzero(keep)
+        groups, groups_per_participant = range_positions(self.participant_offsets, positions)
+        cards, cards_per_group = range_positions(self.group_offsets, groups)
+        card_ids, card_vocabulary = reintern(self.card_ids[cards], self.cards)
+        name_ids, name_vocabulary = reintern(self.group_name_ids[groups], self.names)
+        return CardSortModel(
+            card_vocabulary, name_vocabulary,
+            self.participant_numbers[positions], offsets_from_counts(groups_per_participant),
+            self.group_numbers[groups], name_ids, offsets_from_counts(cards_per_group), card_ids
+        )
+
+    def __len__(self):
+        """Number of participants."""
+        return len(self.participant_numbers)
+
+    @property
+    def num_groups(self):
+        """Number of groups across all participants."""
+        return len(self.group_numbers)
+
+    def group_participants(self):
+        """Position of each group's participant (one entry per group)."""
+        return np.repeat(np.arange(len(self), dtype=np.int32), np.diff(self.participant_offsets))
+
+    def participant(self, position):
+        """Build the participant dict at a position."""
+        groups = []
+        for group in range(self.participant_offsets[position], self.participant_offsets[position + 1]):
+            ids = self.card_ids[self.group_offsets[group]:self.group_offsets[group + 1]]
+            groups.append({
+                'number': int(self.group_numbers[group]),
+                'name': self.names[self.group_name_ids[group]],
+                'elements': [self.cards[card_id] for card_id in ids.tolist()]
+            })
+        return {
+            'participant_number': int(self.participant_numbers[position]),
+            'groups': groups
+        }
+
+    def __iter__(self):
+        """Yield the participant dicts, in order."""
+        for position in range(len(self)):
+            yield self.participant(position)
+
+    def to_participants(self):
+        """Return the participants as the list of dicts extract_participants builds."""
+        return list(self)
+
+    def group_name_counts(self):
+        """
+        Count each group name (excluding unnamed and blank groups), like
+        groupings_analyzer.analyze_group_names.
+        Returns a Counter in first-appearance order.
+        """
+        counts = np.bincount(self.group_name_ids, minlength=len(self.names))
+        return Counter({
+            name: int(count) for name, count in zip(self.names, counts.tolist())
+            if count and name != UNNAMED_GROUP and name.strip()
+        })
+
+    def nbytes(self):
+        """Approximate memory held by the arrays (the vocabularies are counted once)."""
+        arrays = (self.participant_numbers, self.participant_offsets, self.group_numbers,
+                  self.group_name_ids, self.group_offsets, self.card_ids)
+        vocabulary = sum(len(text.encode('utf-8')) for text in self.cards + self.names)
+        return sum(array.nbytes for array in arrays) + vocabulary
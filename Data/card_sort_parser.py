@@ -1,32 +1,110 @@
 """
 Card Sort Data Parser
-Processes card sort results from Excel file columns AL-YB (groups) and YC-YQ (group names).
+Processes card sort results from the export's card sort group columns (Q30_k_GROUP,
+AL onward) and group name columns (Q31_k, YC-YQ), located from the header by survey_schema.
 """
 
-import pandas as pd
+import argparse
+import re
 from pathlib import Path
 
+from card_model import UNNAMED_GROUP, CardSortModel, offsets_from_counts
+from lazy_imports import lazy_module
+from profiling import add_counts, add_profile_arguments, profile_session, profiled
+from reports import CHUNK_LINES, TEXT_FORMAT, add_format_arguments, print_written, write_tables, write_text
+from survey_schema import (
+    card_sort_columns,
+    column_letter,
+    column_letter_to_index,  # Re-exported; it used to live in this module
+    load_schema,
+    read_survey_columns
+)
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent
 EXCEL_FILE = SCRIPT_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
 OUTPUT_FILE = SCRIPT_DIR / "CardSort.txt"
 
-def column_letter_to_index(column_letter):
+# First data row in the export (rows 0-2 are the question text and previews)
+FIRST_RESPONSE_ROW = 3
+
+# Full card vocabulary of the card sort. Some names contain commas, so cells
+# are split with a tokenizer that recognizes these names instead of a plain split.
+KNOWN_CARDS = [
+    "2025–2026 Campus Housing Agreement",
+    "Bill Payment Suite",
+    "CeCredentials",
+    "Course Evaluations and Instructor Evaluations – Student Input",
+    "Course Evaluations and Instructor Evaluations – View Results",
+    "Course Schedule and Course Catalog",
+    "Degree Works",
+    "Degrees, Majors, Minors, and Certificates Declared",
+    "E-Questionnaire Main Page",
+    "EthicsPoint Website",
+    "Financial Aid",
+    "Graduate Student Time Boundaries",
+    "Graduation",
+    "Holds",
+    "Language Placement Test Website",
+    "National Student Clearinghouse",
+    "Navigate",
+    "Office of the Registrar Website",
+    "Parent/Guardian and Emergency Contact Information",
+    "Pass/Fail – Designate a Course as Pass/Fail",
+    "Pass/Fail – View and/or Convert Pass/Fail Grades",
+    "Personal Information",
+    "Plan Ahead",
+    "Prepare for Registration",
+    "Register, Add, or Drop Classes",
+    "Registration Priority Group",
+    "Registration Timeline",
+    "Release or Withhold Directory Information",
+    "Request an Official Enrollment Verification or Degree Verification",
+    "Request an Official Transcript (Academic)",
+    "Rice Alert",
+    "Student Health Insurance Website",
+    "Student Profile",
+    "Student Schedule",
+    "Update Name Pronunciation (NameCoach)",
+    "View Enrollment Verification Status or Degree Verification Status",
+    "View Grades",
+    "View Transcript Request Status",
+    "View an Unofficial Academic Transcript",
+    "Wellbeing and Counseling Center Website"
+]
+
+def build_card_tokenizer(cards):
     """
-    Convert Excel column letter(s) to zero-based index.
-    Examples: A -> 0, Z -> 25, AA -> 26, AL -> 37
-    Uses Excel's column numbering: A=1, B=2, ..., Z=26, AA=27, etc.
+    Compile a tokenizer that splits a cell into elements in one left-to-right pass.
+    At each element boundary (start of the cell or after a comma) the known card
+    names are tried first, longest first, and only count if they run up to the
+    next comma or the end of the cell; anything else is read up to the next comma.
+    Group 1 of each match is one (unstripped) element.
     """
-    column_letter = column_letter.upper()
-    result = 0
-    for char in column_letter:
-        result = result * 26 + (ord(char) - ord('A') + 1)
-    return result - 1  # Convert to zero-based (Excel uses 1-based)
+    cards = sorted(set(cards), key=len, reverse=True)
+    if not cards:
+        return re.compile(r'(?:^|,)([^,]*)')
+    alternatives = '|'.join(re.escape(card) for card in cards)
+    return re.compile(r'(?:^|,)\s*((?:' + alternatives + r')(?=\s*(?:,|$))|[^,]*)')
+
+# Built once and shared by every parser (including groupings_analyzer via this module)
+CARD_TOKENIZER = build_card_tokenizer(KNOWN_CARDS)
+
+def tokenize_cards(text, tokenizer=CARD_TOKENIZER):
+    """
+    Split a cell's text into card names with the card tokenizer.
+    Returns a list of stripped, non-empty elements.
+    """
+    elements = (elem.strip() for elem in tokenizer.findall(text))
+    return [elem for elem in elements if elem]
 
 def parse_group_elements(text):
     """
     Parse a text response that may contain multiple elements separated by commas.
-    Handles special element names that contain commas.
+    Handles card names that contain commas (see KNOWN_CARDS).
     Returns a list of cleaned elements.
     """
     if pd.isna(text) or text == '':
@@ -38,48 +116,20 @@ def parse_group_elements(text):
     if not text:
         return []
     
-    # Special element names that contain commas - protect these before splitting
-    special_names = [
-        "Degrees, Majors, Minors, and Certificates Declared",
-        "Register, Add, or Drop Classes"
-    ]
-    
-    # Replace special names with placeholders before splitting
-    placeholders = {}
-    for i, special_name in enumerate(special_names):
-        if special_name in text:
-            placeholder = f"__SPECIAL_NAME_{i}__"
-            text = text.replace(special_name, placeholder)
-            placeholders[placeholder] = special_name
-    
-    # Split by comma and clean each element
-    elements = [elem.strip() for elem in text.split(',')]
-    
-    # Restore special names from placeholders
-    restored_elements = []
-    for elem in elements:
-        if elem in placeholders:
-            restored_elements.append(placeholders[elem])
-        else:
-            restored_elements.append(elem)
-    
-    # Filter out empty strings
-    elements = [elem for elem in restored_elements if elem and len(elem) > 0]
-    
-    return elements
+    return tokenize_cards(text)
 
-def get_group_columns():
+def get_group_columns(schema=None):
     """
-    Get the column indices for group columns (AL-YB) and name columns (YC-YQ).
+    Get the column indices for the group columns and the matching name columns,
+    resolved from a survey schema (by default the cached schema of EXCEL_FILE).
+    The two ranges are guaranteed to have the same length.
     Returns tuple of (group_start, group_end, name_start, name_end)
     """
-    group_start = column_letter_to_index('AL')
-    group_end = column_letter_to_index('YB')
-    name_start = column_letter_to_index('YC')
-    name_end = column_letter_to_index('YQ')
-    
-    return group_start, group_end, name_start, name_end
+    if schema is None:
+        schema = load_schema(EXCEL_FILE)
+    return card_sort_columns(schema)
 
+@profiled(memory=False)
 def process_participant(row_index, df, group_start, group_end, name_start, name_end):
     """
     Process a single participant's card sort data.
@@ -125,74 +175,380 @@ def process_participant(row_index, df, group_start, group_end, name_start, name_
     
     return groups
 
-def main():
-    """Main function to process card sort data and generate output file."""
-    print(f"Reading Excel file: {EXCEL_FILE}")
+@profiled(memory=False)
+def process_row(row, group_start, group_end, name_start, name_end):
+    """
+    Process one participant's card sort data from a sequence of row values
+    (e.g. a row streamed from the workbook) instead of a DataFrame.
+    Returns a list of groups, like process_participant.
+    """
+    groups = []
+    group_number = 1
+    num_columns = min(group_end - group_start, name_end - name_start) + 1
+
+    for offset in range(max(num_columns, 0)):
+        group_col_index = group_start + offset
+        name_col_index = name_start + offset
+        group_elements_text = row[group_col_index] if group_col_index < len(row) else None
+        group_name = row[name_col_index] if name_col_index < len(row) else None
+
+        elements = parse_group_elements(group_elements_text)
+
+        if pd.isna(group_name) or str(group_name).strip() == '':
+            group_name = '___'
+        else:
+            group_name = str(group_name).strip()
+
+        # Skip completely blank groups, but include groups with just a name
+        if elements or group_name != '___':
+            groups.append({
+                'number': group_number,
+                'name': group_name,
+                'elements': elements
+            })
+            group_number += 1
+
+    return groups
+
+def tokenize_group_cells(cells):
+    """
+    Tokenize a flat array of group cells in bulk with pandas string operations.
+    Returns tuple of (positions, values): one entry per element, in cell
+    order, where positions[i] is the index of the cell values[i] came from.
+    """
+    cells = pd.Series(cells, dtype=object)
+
+    # Missing and empty cells have no elements
+    present = ~(cells.isna() | (cells == ''))
+    if not present.any():
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=object)
+    text = cells[present].map(str).str.strip()
+
+    # Tokenize every cell into card names, one element per row
+    elements = text.str.findall(CARD_TOKENIZER).explode().str.strip()
+    elements = elements[elements.notna() & (elements != '')]
+
+    # explode keeps the original cell position as the index, in order
+    return elements.index.to_numpy(dtype=np.int64), elements.to_numpy(dtype=object)
+
+def parse_group_cells(cells):
+    """
+    Parse a flat array of group cells in bulk with pandas string operations.
+    Equivalent to calling parse_group_elements on every cell.
+    Returns a list with one list of elements per cell.
+    """
+    parsed = [[] for _ in range(len(cells))]
+    positions, values = tokenize_group_cells(cells)
+    starts = np.flatnonzero(np.r_[True, positions[1:] != positions[:-1]]) if len(positions) else []
+    ends = list(starts[1:]) + [len(positions)]
+    for start, end in zip(starts, ends):
+        parsed[positions[start]] = list(values[start:end])
+
+    return parsed
+
+def slice_group_blocks(df, group_start, group_end, name_start, name_end, first_row=FIRST_RESPONSE_ROW):
+    """
+    Slice the group and name column blocks from first_row on as NumPy object arrays.
+    Group and name columns are walked in lockstep, so both blocks get the width
+    of the shorter range.
+    Returns tuple of (group_block, name_block), or (None, None) if there is nothing to read.
+    """
+    num_columns = min(group_end - group_start, name_end - name_start) + 1
+    if num_columns <= 0 or first_row >= len(df):
+        return None, None
+
+    group_block = df.iloc[first_row:, group_start:group_start + num_columns].to_numpy(dtype=object)
+    name_block = df.iloc[first_row:, name_start:name_start + num_columns].to_numpy(dtype=object)
+    return group_block, name_block
+
+def clean_group_names(cells):
+    """
+    Clean a flat array of group name cells at once.
+    Returns an object array of stripped names, with '___' for missing names.
+    """
+    names = pd.Series(cells, dtype=object)
+    missing = names.isna().to_numpy()
+    names = names.map(str).str.strip().to_numpy(dtype=object)
+    names[missing | (names == '')] = UNNAMED_GROUP
+    return names
+
+def participants_from_blocks(group_block, name_block, first_row=FIRST_RESPONSE_ROW):
+    """
+    Build the participants list from group and name blocks (one row per
+    participant, one column per group), where block row 0 is DataFrame row first_row.
+    Returns the participants list (participant_number and groups for each
+    participant with at least one group).
+    """
+    num_rows, num_columns = group_block.shape
+
+    # Parse all group cells at once (row-major, so cell i is row i // num_columns)
+    elements = parse_group_cells(group_block.ravel())
+    names = clean_group_names(name_block.ravel())
+
+    participants_data = []
+    for row in range(num_rows):
+        groups = []
+        group_number = 1
+        for cell in range(row * num_columns, (row + 1) * num_columns):
+            group_name = names[cell]
+            # Skip completely blank groups, but include groups with just a name
+            if elements[cell] or group_name != '___':
+                groups.append({
+                    'number': group_number,
+                    'name': group_name,
+                    'elements': elements[cell]
+                })
+                group_number += 1
+        if groups:  # Only add participants who have at least one group
+            participants_data.append({
+                'participant_number': first_row + row + 1,
+                'groups': groups
+            })
+
+    return participants_data
+
+def model_from_blocks(group_block, name_block, first_row=FIRST_RESPONSE_ROW):
+    """
+    Build a CardSortModel straight from the group and name blocks, without
+    creating a dict per participant or a list per group.
+    Holds the same participants, groups and elements as participants_from_blocks.
+    """
+    num_rows, num_columns = group_block.shape
+    if num_rows == 0 or num_columns == 0:
+        return CardSortModel.empty()
+
+    positions, values = tokenize_group_cells(group_block.ravel())
+    names = clean_group_names(name_block.ravel())
+
+    # Keep groups with elements or a name (blank groups are skipped)
+    cards_per_cell = np.bincount(positions, minlength=names.size)
+    kept = (cards_per_cell > 0) | (names != UNNAMED_GROUP)
+    kept_by_row = kept.reshape(num_rows, num_columns)
+    groups_per_row = kept_by_row.sum(axis=1)
+    rows = np.flatnonzero(groups_per_row)
+
+    # Groups are renumbered 1..n within each participant
+    group_numbers = np.cumsum(kept_by_row, axis=1)[kept_by_row]
+    # Interned in first-appearance order, like cooccurrence.intern_elements
+    card_ids, cards = pd.factorize(values)
+    name_ids, name_vocabulary = pd.factorize(names[kept])
+
+    return CardSortModel(
+        cards.tolist(), name_vocabulary.tolist(),
+        first_row + rows + 1, offsets_from_counts(groups_per_row[rows]),
+        group_numbers, name_ids, offsets_from_counts(cards_per_cell[kept]), card_ids
+    )
+
+@profiled
+def extract_participants(df, group_start, group_end, name_start, name_end, first_row=FIRST_RESPONSE_ROW):
+    """
+    Bulk version of calling process_participant for every row from first_row on.
+    Slices the group and name column blocks once as NumPy object arrays and parses
+    all group cells together instead of reading one cell at a time with iloc.
+    Returns the participants list (participant_number and groups for each
+    participant with at least one group).
+    """
+    group_block, name_block = slice_group_blocks(df, group_start, group_end, name_start, name_end, first_row)
+    if group_block is None:
+        return []
+    participants_data = participants_from_blocks(group_block, name_block, first_row)
+    add_counts(rows=len(group_block), cells=group_block.size + name_block.size,
+               participants=len(participants_data))
+    return participants_data
+
+@profiled
+def extract_card_model(df, group_start, group_end, name_start, name_end, first_row=FIRST_RESPONSE_ROW):
+    """
+    Compact version of extract_participants.
+    Returns a CardSortModel (see card_model) holding the same participants.
+    """
+    group_block, name_block = slice_group_blocks(df, group_start, group_end, name_start, name_end, first_row)
+    if group_block is None:
+        return CardSortModel.empty()
+    model = model_from_blocks(group_block, name_block, first_row)
+    add_counts(rows=len(group_block), cells=group_block.size + name_block.size,
+               participants=len(model), groups=model.num_groups, cards=len(model.card_ids))
+    return model
+
+def fit_group_columns(df, group_start, group_end, name_start, name_end):
+    """
+    Clamp the group and name column ranges to the columns present in df,
+    warning if the file has fewer columns than expected.
+    Returns tuple of (group_start, group_end, name_start, name_end)
+    """
+    max_needed = max(group_end, name_end)
+    if max_needed >= len(df.columns):
+        print(f"\nWARNING: Expected columns may be beyond available columns!")
+        print(f"  Need up to column index {max_needed}, but only have {len(df.columns)} columns")
+        print(f"  This might indicate the Excel file structure is different than expected.")
+        print(f"  Attempting to process with available columns...")
+        # Adjust ranges to fit available columns
+        group_end = min(group_end, len(df.columns) - 1)
+        name_end = min(name_end, len(df.columns) - 1)
+        print(f"  Adjusted group columns: {group_start} to {group_end}")
+        print(f"  Adjusted name columns: {name_start} to {name_end}")
     
-    try:
-        # Read the Excel file
-        df = pd.read_excel(EXCEL_FILE, header=0)
-        print(f"Successfully loaded {len(df)} rows and {len(df.columns)} columns")
-        
-        # Get column indices
-        group_start, group_end, name_start, name_end = get_group_columns()
-        
-        print(f"Group columns: {group_start} to {group_end} (AL to YB)")
-        print(f"Name columns: {name_start} to {name_end} (YC to YQ)")
-        print(f"Total columns in file: {len(df.columns)}")
-        
-        # Verify we have enough columns
-        max_needed = max(group_end, name_end)
-        if max_needed >= len(df.columns):
-            print(f"\nWARNING: Expected columns may be beyond available columns!")
-            print(f"  Need up to column index {max_needed}, but only have {len(df.columns)} columns")
-            print(f"  This might indicate the Excel file structure is different than expected.")
-            print(f"  Attempting to process with available columns...")
-            # Adjust ranges to fit available columns
-            group_end = min(group_end, len(df.columns) - 1)
-            name_end = min(name_end, len(df.columns) - 1)
-            print(f"  Adjusted group columns: {group_start} to {group_end}")
-            print(f"  Adjusted name columns: {name_start} to {name_end}")
-        
-        # Process each participant
-        participants_data = []
-        
-        for row_index in range(3, len(df)):
-            groups = process_participant(row_index, df, group_start, group_end, name_start, name_end)
-            if groups:  # Only add participants who have at least one group
-                participants_data.append({
-                    'participant_number': row_index + 1,
-                    'groups': groups
+    return group_start, group_end, name_start, name_end
+
+def participant_text(participant):
+    """Format one participant's groups in the CardSort.txt format."""
+    lines = [f"Participant {participant['participant_number']}:\n"]
+    
+    for group in participant['groups']:
+        lines.append(f"    - Group {group['number']}: {group['name']}\n")
+        # Groups with a name but no elements are still shown
+        lines.extend(f"        - {element}\n" for element in group['elements'])
+    
+    lines.append("\n")  # Blank line between participants
+    return ''.join(lines)
+
+def model_text(model, chunk_lines=CHUNK_LINES):
+    """
+    Yield the CardSort.txt text straight from a CardSortModel's arrays, in
+    chunks of about chunk_lines lines; the per-card lines are formatted once
+    per card, not per occurrence.
+    """
+    card_lines = [f"        - {card}\n" for card in model.cards]
+    group_offsets = model.group_offsets.tolist()
+    card_ids = model.card_ids.tolist()
+    group_numbers = model.group_numbers.tolist()
+    group_name_ids = model.group_name_ids.tolist()
+    participant_offsets = model.participant_offsets.tolist()
+    lines = []
+    for position, participant_number in enumerate(model.participant_numbers.tolist()):
+        lines.append(f"Participant {participant_number}:\n")
+        for group in range(participant_offsets[position], participant_offsets[position + 1]):
+            lines.append(f"    - Group {group_numbers[group]}: {model.names[group_name_ids[group]]}\n")
+            lines.extend([card_lines[card_id] for card_id in card_ids[group_offsets[group]:group_offsets[group + 1]]])
+        lines.append("\n")
+        if len(lines) >= chunk_lines:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+@profiled
+def write_card_sort(participants_data, output_file=OUTPUT_FILE):
+    """
+    Write every participant's groups to the card sort text file.
+    Returns the number of participants written.
+    """
+    if isinstance(participants_data, CardSortModel):
+        write_text(model_text(participants_data), output_file)
+        return len(participants_data)
+    return write_text((participant_text(participant) for participant in participants_data), output_file)
+
+def card_sort_tables(participants_data):
+    """
+    Build the structured version of the card sort: one row per card placed
+    in a group (groups with a name but no cards get one row with no card).
+    Returns a dict of table name -> (columns, rows) for reports.write_tables.
+    """
+    columns = ['participant_number', 'group_number', 'group_name', 'card']
+    rows = []
+    for participant in participants_data:
+        for group in participant['groups']:
+            for card in group['elements'] or [None]:
+                rows.append({
+                    'participant_number': participant['participant_number'],
+                    'group_number': group['number'],
+                    'group_name': group['name'],
+                    'card': card
                 })
+    return {'cardsort_groups': (columns, rows)}
+
+def parse_args(argv=None):
+    """Parse command line options for the card sort parser."""
+    parser = argparse.ArgumentParser(description="Dump card sort groups per participant.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream the workbook row by row instead of loading it into memory")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for parsing (default: 1, no pool)")
+    # Imported here because validation itself imports this module
+    from validation import add_validation_arguments
+    add_validation_arguments(parser)
+    add_format_arguments(parser)
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function to process card sort data and generate output file."""
+    args = parse_args(argv)
+    with profile_session(args.profile, args.cprofile):
+        print(f"Reading Excel file: {EXCEL_FILE}")
         
-        # Write results to file
-        print(f"\nWriting card sort results to: {OUTPUT_FILE}")
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            for participant in participants_data:
-                f.write(f"Participant {participant['participant_number']}:\n")
+        try:
+            # Imported here because validation itself imports this module
+            from validation import first_row, load_keep_mask, select_participants
+            keep = load_keep_mask(EXCEL_FILE) if args.validate else None
+            
+            if args.stream:
+                # Imported here because survey_stream itself imports this module
+                from survey_stream import iter_participants
                 
-                for group in participant['groups']:
-                    f.write(f"    - Group {group['number']}: {group['name']}\n")
-                    
-                    # Write elements
-                    if group['elements']:
-                        for element in group['elements']:
-                            f.write(f"        - {element}\n")
-                    else:
-                        # If no elements but group exists, still show it
-                        pass
+                group_start, group_end, name_start, name_end = get_group_columns()
+                print("Streaming rows from the workbook...")
+                if set(args.formats) - {TEXT_FORMAT}:
+                    print("WARNING: --stream only writes the text report; structured formats are skipped")
+                print(f"\nWriting card sort results to: {OUTPUT_FILE}")
+                participants = iter_participants(EXCEL_FILE, group_start, group_end, name_start, name_end,
+                                                 first_row(keep))
+                if keep is not None:
+                    participants = (participant for participant in participants
+                                    if keep[participant['participant_number'] - 1])
+                num_participants = write_card_sort(participants, OUTPUT_FILE)
                 
-                f.write("\n")  # Blank line between participants
-        
-        print(f"Successfully processed {len(participants_data)} participants")
-        print(f"Results written to: {OUTPUT_FILE}")
-        
-    except FileNotFoundError:
-        print(f"Error: Excel file not found at {EXCEL_FILE}")
-    except Exception as e:
-        print(f"Error processing file: {e}")
-        import traceback
-        traceback.print_exc()
+                print(f"Successfully processed {num_participants} participants")
+                print(f"Results written to: {OUTPUT_FILE}")
+                return
+            
+            # Read only the card sort columns (through the columnar cache)
+            df, schema = read_survey_columns(EXCEL_FILE, card_sort=True)
+            print(f"Successfully loaded {len(df)} rows and {len(df.columns)} columns")
+            
+            # Get column indices
+            group_start, group_end, name_start, name_end = get_group_columns(schema)
+            
+            print(f"Group columns: {group_start} to {group_end} "
+                  f"({column_letter(schema, group_start)} to {column_letter(schema, group_end)})")
+            print(f"Name columns: {name_start} to {name_end} "
+                  f"({column_letter(schema, name_start)} to {column_letter(schema, name_end)})")
+            print(f"Total columns read: {len(df.columns)}")
+            
+            # Verify we have enough columns
+            group_start, group_end, name_start, name_end = fit_group_columns(
+                df, group_start, group_end, name_start, name_end
+            )
+            
+            # Process every participant in one bulk pass into the compact model
+            if args.workers > 1:
+                # Imported here because parallel itself imports this module
+                from parallel import extract_card_model_parallel
+                print(f"Parsing with {args.workers} worker processes...")
+                participants_data = extract_card_model_parallel(
+                    df, group_start, group_end, name_start, name_end, args.workers, first_row(keep)
+                )
+            else:
+                participants_data = extract_card_model(df, group_start, group_end, name_start, name_end,
+                                                       first_row(keep))
+            participants_data = select_participants(participants_data, keep)
+            
+            # Write results to file
+            if TEXT_FORMAT in args.formats:
+                print(f"\nWriting card sort results to: {OUTPUT_FILE}")
+                write_card_sort(participants_data, OUTPUT_FILE)
+            print_written(write_tables(card_sort_tables(participants_data), args.formats, args.report_dir))
+            
+            print(f"Successfully processed {len(participants_data)} participants")
+            if TEXT_FORMAT in args.formats:
+                print(f"Results written to: {OUTPUT_FILE}")
+            
+        except FileNotFoundError:
+            print(f"Error: Excel file not found at {EXCEL_FILE}")
+        except Exception as e:
+            print(f"Error processing file: {e}")
+            import traceback
+            traceback.print_exc()
 
 if __name__ == "__main__":
     main()
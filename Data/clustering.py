@@ -0,0 +1,207 @@
+"""
+Card Sort Clustering
+Turns card co-occurrence into a normalized distance matrix and runs agglomerative
+(hierarchical) clustering to suggest navigation categories.
+"""
+
+import csv
+
+from lazy_imports import lazy_module
+from profiling import profiled
+
+np = lazy_module('numpy')
+sparse = lazy_module('scipy.sparse')
+hierarchy = lazy_module('scipy.cluster.hierarchy')
+spatial_distance = lazy_module('scipy.spatial.distance')
+
+# Linkage methods that are valid for an arbitrary (non-Euclidean) distance matrix
+LINKAGE_METHODS = ('average', 'complete', 'single', 'weighted')
+DEFAULT_CUT_HEIGHTS = (0.3, 0.5, 0.7, 0.9)
+
+def membership_matrix(group_participant, num_participants=None):
+    """
+    Build the participant x group membership matrix (1 where the group
+    belongs to the participant). Participants default to the highest one
+    that owns a group.
+    Returns a sparse CSR matrix.
+    """
+    if num_participants is None:
+        num_participants = int(group_participant.max()) + 1 if len(group_participant) else 0
+    return sparse.csr_matrix(
+        (np.ones(len(group_participant), dtype=np.int32),
+         (group_participant, np.arange(len(group_participant)))),
+        shape=(num_participants, len(group_participant))
+    )
+
+def participant_incidence(engine):
+    """
+    Collapse the group x card incidence matrix to participant x card.
+    Returns tuple of (placed, together) sparse matrices:
+    placed[p, i] is 1 if participant p sorted card i at all, and
+    together is the card x card count of participants who put both cards in
+    the same group.
+    """
+    incidence = engine['incidence']
+    membership = membership_matrix(engine['group_participant'])
+    binary = (incidence > 0).astype(np.int32)
+    placed = ((membership @ binary) > 0).astype(np.int32)
+    together = (binary.T @ binary).tocsr()
+    return placed, together
+
+def similarity_matrix(engine):
+    """
+    Build the normalized card x card similarity matrix.
+    Similarity is the share of participants who sorted both cards that put them
+    in the same group (1.0 on the diagonal, 0.0 if no participant sorted both).
+    Returns a dense float array.
+    """
+    placed, together = participant_incidence(engine)
+    both_sorted = (placed.T @ placed).toarray().astype(float)
+    together = together.toarray().astype(float)
+    # A card placed in two groups by one participant must not push the share past 1
+    together = np.minimum(together, both_sorted)
+
+    similarity = np.divide(together, both_sorted, out=np.zeros_like(together), where=both_sorted > 0)
+    np.fill_diagonal(similarity, 1.0)
+    return similarity
+
+def distance_vector(similarity):
+    """
+    Convert a similarity matrix to a condensed distance vector (1 - similarity),
+    as used by scipy's linkage.
+    """
+    distances = 1.0 - similarity
+    np.fill_diagonal(distances, 0.0)
+    return spatial_distance.squareform(distances, checks=False)
+
+def suggest_cut(tree):
+    """
+    Suggest a cut height at the largest gap between successive merge heights
+    of a linkage matrix.
+    Returns tuple of (cut_height, num_clusters).
+    """
+    merge_heights = tree[:, 2]
+    if len(merge_heights) < 2:
+        return 1.0, 1
+    gaps = np.diff(merge_heights)
+    largest = int(np.argmax(gaps))
+    cut_height = float(merge_heights[largest] + gaps[largest] / 2)
+    # Count the clusters fcluster actually forms at the cut, since tied merge
+    # heights make the merges above it an unreliable count
+    labels = hierarchy.fcluster(tree, t=cut_height, criterion='distance')
+    return cut_height, len(np.unique(labels))
+
+@profiled
+def cluster_cards(engine, method='average', cut_heights=DEFAULT_CUT_HEIGHTS):
+    """
+    Run agglomerative clustering over the card distance matrix.
+    Returns a dict with 'elements', 'method', 'similarity', 'linkage',
+    'leaf_order', 'suggested_cut' (height, num_clusters) and 'cuts', a list of
+    (height, cluster_labels) tuples including the suggested cut.
+    """
+    if method not in LINKAGE_METHODS:
+        raise ValueError(f"Unknown linkage method '{method}' (choose from {', '.join(LINKAGE_METHODS)})")
+
+    elements = engine['elements']
+    similarity = similarity_matrix(engine)
+    if len(elements) < 2:
+        labels = np.ones(len(elements), dtype=int)
+        return {
+            'elements': elements,
+            'method': method,
+            'similarity': similarity,
+            'linkage': np.empty((0, 4)),
+            'leaf_order': list(range(len(elements))),
+            'suggested_cut': (1.0, len(elements)),
+            'cuts': [(height, labels) for height in cut_heights]
+        }
+
+    tree = hierarchy.linkage(distance_vector(similarity), method=method)
+    leaf_order = hierarchy.dendrogram(tree, no_plot=True)['leaves']
+    suggested_cut = suggest_cut(tree)
+
+    heights = sorted(set(cut_heights) | {suggested_cut[0]})
+    cuts = [(height, hierarchy.fcluster(tree, t=height, criterion='distance')) for height in heights]
+
+    return {
+        'elements': elements,
+        'method': method,
+        'similarity': similarity,
+        'linkage': tree,
+        'leaf_order': leaf_order,
+        'suggested_cut': suggested_cut,
+        'cuts': cuts
+    }
+
+def clusters_from_labels(elements, labels, leaf_order):
+    """
+    Group element names by cluster label.
+    Clusters and their members are listed in dendrogram leaf order.
+    Returns a list of lists of element names.
+    """
+    clusters = {}
+    for element_id in leaf_order:
+        clusters.setdefault(labels[element_id], []).append(elements[element_id])
+    return list(clusters.values())
+
+def write_cluster_report(result, output_file):
+    """Write the dendrogram, suggested cut and cluster assignments to a text file."""
+    elements = result['elements']
+    leaf_order = result['leaf_order']
+    suggested_height, suggested_count = result['suggested_cut']
+
+    with open(output_file, 'w', encoding='utf-8') as f:
+        f.write("=" * 80 + "\n")
+        f.write("CARD SORT HIERARCHICAL CLUSTERING\n")
+        f.write(f"(Distance = 1 - share of participants who grouped both cards, {result['method']} linkage)\n")
+        f.write("=" * 80 + "\n\n")
+
+        # 1. Suggested category cut
+        f.write("-" * 80 + "\n")
+        f.write("1. SUGGESTED CATEGORY CUT\n")
+        f.write("-" * 80 + "\n\n")
+        f.write(f"  Cut at distance {suggested_height:.3f} -> {suggested_count} categories\n")
+        f.write("\n\n")
+
+        # 2. Cluster assignments at each cut height
+        f.write("-" * 80 + "\n")
+        f.write("2. CLUSTER ASSIGNMENTS BY CUT HEIGHT\n")
+        f.write("-" * 80 + "\n\n")
+        for height, labels in result['cuts']:
+            clusters = clusters_from_labels(elements, labels, leaf_order)
+            marker = " (suggested)" if height == suggested_height else ""
+            f.write(f"  Cut height {height:.3f}: {len(clusters)} cluster(s){marker}\n")
+            for number, members in enumerate(clusters, 1):
+                f.write(f"    - Cluster {number}:\n")
+                for element in members:
+                    f.write(f"        - {element}\n")
+            f.write("\n")
+        f.write("\n")
+
+        # 3. Dendrogram merge steps
+        f.write("-" * 80 + "\n")
+        f.write("3. DENDROGRAM\n")
+        f.write("(Leaves in dendrogram order, then each merge with its distance)\n")
+        f.write("-" * 80 + "\n\n")
+        for position, element_id in enumerate(leaf_order, 1):
+            f.write(f"  {position}. {elements[element_id]}\n")
+        f.write("\n")
+        # Cluster IDs >= number of elements refer to earlier merges
+        num_elements = len(elements)
+        for step, (left, right, distance, size) in enumerate(result['linkage'], 1):
+            names = []
+            for node in (int(left), int(right)):
+                names.append(elements[node] if node < num_elements else f"[merge {node - num_elements + 1}]")
+            f.write(f"  Merge {step}: {names[0]} + {names[1]} at {distance:.3f} ({int(size)} cards)\n")
+
+def write_distance_matrix(result, output_file):
+    """Write the card x card distance matrix as CSV, in dendrogram leaf order."""
+    elements = result['elements']
+    order = result['leaf_order']
+    distances = 1.0 - result['similarity']
+
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([''] + [elements[i] for i in order])
+        for i in order:
+            writer.writerow([elements[i]] + [f"{distances[i, j]:.4f}" for j in order])
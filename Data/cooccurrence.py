@@ -0,0 +1,188 @@
+"""
+Card Sort Co-occurrence Engine
+Builds a sparse group x card incidence matrix from the card sort participants and
+derives pair counts, element frequencies and element relationships from a single
+card x card co-occurrence matrix.
+"""
+
+from collections import Counter
+
+from card_model import CardSortModel
+from lazy_imports import lazy_module
+from profiling import add_counts, profiled
+from topk import top_k_indices
+
+np = lazy_module('numpy')
+sparse = lazy_module('scipy.sparse')
+
+def intern_elements(participants_data):
+    """
+    Assign an integer ID to every element, in order of first appearance.
+    Returns tuple of (elements, element_index) where elements[id] is the name
+    and element_index maps a name back to its ID.
+    """
+    element_index = {}
+    for participant in participants_data:
+        for group in participant['groups']:
+            for element in group['elements']:
+                if element not in element_index:
+                    element_index[element] = len(element_index)
+    elements = list(element_index)
+    return elements, element_index
+
+def build_incidence(participants_data, element_index):
+    """
+    Build the incidence matrix with one row per group and one column per element.
+    Entries count how many times the element was placed in the group.
+    Returns tuple of (incidence, group_participant) where group_participant[row]
+    is the position of the group's participant in participants_data.
+    """
+    indptr = [0]
+    indices = []
+    group_participant = []
+    for position, participant in enumerate(participants_data):
+        for group in participant['groups']:
+            indices.extend(element_index[element] for element in group['elements'])
+            indptr.append(len(indices))
+            group_participant.append(position)
+
+    indices = np.asarray(indices, dtype=np.int32)
+    data = np.ones(len(indices), dtype=np.int32)
+    shape = (len(group_participant), len(element_index))
+    incidence = sparse.csr_matrix((data, indices, np.asarray(indptr, dtype=np.int64)), shape=shape)
+    # Repeated elements within a group are summed into one entry
+    incidence.sum_duplicates()
+    return incidence, np.asarray(group_participant, dtype=np.int32)
+
+def model_incidence(model):
+    """
+    Build the group x card incidence matrix straight from a CardSortModel's
+    offset and card ID arrays (no per-element Python work).
+    Returns tuple of (incidence, group_participant), like build_incidence.
+    """
+    data = np.ones(len(model.card_ids), dtype=np.int32)
+    shape = (model.num_groups, len(model.cards))
+    incidence = sparse.csr_matrix((data, model.card_ids, model.group_offsets), shape=shape)
+    # Repeated elements within a group are summed into one entry
+    incidence.sum_duplicates()
+    return incidence, model.group_participants()
+
+@profiled
+def build_cooccurrence(participants_data):
+    """
+    Build the co-occurrence engine for a list of participants or a CardSortModel.
+    The card x card co-occurrence matrix is computed as one sparse product
+    (incidence^T @ incidence), so entry (i, j) is the number of times
+    elements i and j were placed in the same group.
+    Returns a dict with 'elements', 'element_index', 'incidence',
+    'group_participant', 'cooccurrence' and 'frequency'.
+    """
+    if isinstance(participants_data, CardSortModel):
+        elements, element_index = participants_data.cards, participants_data.card_index
+        incidence, group_participant = model_incidence(participants_data)
+    else:
+        elements, element_index = intern_elements(participants_data)
+        incidence, group_participant = build_incidence(participants_data, element_index)
+    cooccurrence = (incidence.T @ incidence).tocsr()
+    frequency = np.asarray(incidence.sum(axis=0)).ravel()
+    add_counts(groups=incidence.shape[0], elements=len(elements), nonzero_pairs=cooccurrence.nnz)
+
+    return {
+        'elements': elements,
+        'element_index': element_index,
+        'incidence': incidence,
+        'group_participant': group_participant,
+        'cooccurrence': cooccurrence,
+        'frequency': frequency
+    }
+
+def pair_arrays(engine, limit=None):
+    """
+    Get every element pair that appeared together, as parallel arrays.
+    Pairs of different elements come from the upper triangle of the
+    co-occurrence matrix; an element repeated within a group pairs with itself
+    C(m, 2) times, which is recovered from the diagonal. Only the top `limit`
+    pairs are selected (and sorted) if given.
+    Returns tuple of (first_ids, second_ids, counts), ordered by count
+    (descending) and then by element ID.
+    """
+    upper = sparse.triu(engine['cooccurrence'], k=1).tocoo()
+    first_ids, second_ids, counts = upper.row, upper.col, upper.data
+
+    self_counts = (engine['cooccurrence'].diagonal() - engine['frequency']) // 2
+    self_ids = np.flatnonzero(self_counts)
+    if len(self_ids):
+        first_ids = np.concatenate([first_ids, self_ids])
+        second_ids = np.concatenate([second_ids, self_ids])
+        counts = np.concatenate([counts, self_counts[self_ids]])
+
+    keep = counts > 0
+    first_ids, second_ids, counts = first_ids[keep], second_ids[keep], counts[keep]
+    order = top_k_indices(counts, limit, first_ids, second_ids)
+    return first_ids[order], second_ids[order], counts[order]
+
+def pair_counts_from_matrix(engine, limit=None):
+    """
+    Derive the pair counts from the co-occurrence matrix.
+    Pairs are keyed by the alphabetically sorted tuple of element names.
+    Only the top `limit` pairs are kept if given.
+    Returns a Counter in descending count order.
+    """
+    elements = engine['elements']
+    first_ids, second_ids, counts = pair_arrays(engine, limit)
+
+    pair_counts = Counter()
+    for i, j, count in zip(first_ids.tolist(), second_ids.tolist(), counts.tolist()):
+        pair = tuple(sorted((elements[i], elements[j])))
+        pair_counts[pair] = count
+    return pair_counts
+
+def count_pairs(engine):
+    """Return the number of distinct element pairs that appeared together."""
+    cooccurrence = engine['cooccurrence']
+    diagonal = cooccurrence.diagonal()
+    # The matrix is symmetric, so the off-diagonal nonzeros are each pair twice
+    off_diagonal = (np.count_nonzero(cooccurrence.data) - np.count_nonzero(diagonal)) // 2
+    self_counts = (diagonal - engine['frequency']) // 2
+    return int(off_diagonal + np.count_nonzero(self_counts))
+
+def element_frequency_from_matrix(engine, limit=None):
+    """
+    Derive how many times each element appears in any group, keeping only
+    the `limit` most frequent if given.
+    Returns a Counter in descending count order (ties in first-appearance
+    order, like Counter.most_common).
+    """
+    elements, frequency = engine['elements'], engine['frequency']
+    order = top_k_indices(frequency, limit).tolist()
+    return Counter({elements[element_id]: int(frequency[element_id]) for element_id in order})
+
+def element_neighbors(engine, top_n=5):
+    """
+    For each element, find the elements it was most often grouped with.
+    Reads each element's row of the co-occurrence matrix (ignoring the diagonal)
+    and keeps the top_n entries, ties broken by element ID.
+    Returns a dict mapping each element with at least one relationship to a
+    list of (other_element, count) tuples, ordered by the element's overall
+    frequency (descending).
+    """
+    elements = engine['elements']
+    cooccurrence = engine['cooccurrence']
+    frequency = engine['frequency']
+
+    neighbors = {}
+    # Stable sort keeps first-appearance order among equally frequent elements
+    for element_id in np.argsort(-frequency, kind='stable').tolist():
+        start, end = cooccurrence.indptr[element_id], cooccurrence.indptr[element_id + 1]
+        other_ids = cooccurrence.indices[start:end]
+        counts = cooccurrence.data[start:end]
+        keep = (other_ids != element_id) & (counts > 0)
+        other_ids, counts = other_ids[keep], counts[keep]
+        if len(other_ids) == 0:
+            continue
+        order = top_k_indices(counts, top_n, other_ids)
+        neighbors[elements[element_id]] = [
+            (elements[other_id], count)
+            for other_id, count in zip(other_ids[order].tolist(), counts[order].tolist())
+        ]
+    return neighbors
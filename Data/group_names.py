@@ -0,0 +1,267 @@
+"""
+Group Name Canonicalization
+Folds the free-form group names participants typed into canonical labels:
+case, punctuation and plurals are normalized, filler words like "Info" are
+dropped, placeholder names ("." / "x" / "none" / "5") are discarded, and
+near-duplicates ("Finacial", "Regristration") are matched through a character
+trigram index instead of comparing every pair of names. The merges are
+worked out from the names of the current run only, so the same names always
+get the same canonical names. The resulting label mapping is cached on disk,
+keyed by those names, so a later run over the same export skips the
+matching.
+"""
+
+import hashlib
+import json
+import re
+from collections import Counter, defaultdict
+from pathlib import Path
+
+from profiling import add_counts, profiled
+from workbook_cache import CACHE_DIR
+
+NAME_CACHE_FILE = CACHE_DIR / "group_names.json"
+
+# Bump when the normalization rules or the cache layout change so cached mappings are rebuilt
+CANONICAL_VERSION = 3
+# Label sets whose mappings are kept in the cache (batch runs add one per wave)
+MAX_CACHED_MAPPINGS = 32
+
+# Names that only mean "no name given"
+PLACEHOLDER_NAMES = frozenset(['none', 'na', 'n a', 'null', 'nil', 'blank', 'untitled', 'group', 'idk'])
+# Words that don't change what a group is about ("Personal Info" is "Personal")
+FILLER_WORDS = frozenset(['info', 'infor', 'information', 'informations', 'stuff', 'things',
+                          'related', 'and', 'the', 'of', 'for', 'my'])
+# Suffixes stripped after plurals, longest first ("financial" and "finance" -> "financ")
+SUFFIXES = ('ations', 'ation', 'ings', 'ing', 'ials', 'ial', 'e', 'y')
+MIN_STEM_LENGTH = 4
+
+# Fuzzy matching: minimum edit similarity, and the shortest key fuzzy matching is tried on
+SIMILARITY_THRESHOLD = 0.8
+MIN_FUZZY_LENGTH = 5
+# Trigrams shared by more keys than this are too common to narrow the search
+MAX_POSTING_LENGTH = 500
+
+def stem_word(word):
+    """Strip a plural and then one derivational suffix from a word."""
+    if len(word) > 3:
+        if word.endswith('sses'):
+            word = word[:-2]
+        elif word.endswith('ies'):
+            word = word[:-3] + 'y'
+        elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+            word = word[:-1]
+    for suffix in SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM_LENGTH:
+            return word[:-len(suffix)]
+    return word
+
+def normalize_label(label):
+    """
+    Reduce a group name to its comparison key, e.g. "Financial Info." -> "financ".
+    Returns '' for names with nothing but punctuation.
+    """
+    words = re.sub(r"[^a-z0-9]+", ' ', str(label).lower().replace("'", '')).split()
+    content = [word for word in words if word not in FILLER_WORDS]
+    return ' '.join(stem_word(word) for word in (content or words))
+
+def is_placeholder(key):
+    """Whether a normalized key is a placeholder rather than a real name."""
+    return len(key.replace(' ', '')) <= 1 or key.replace(' ', '').isdigit() or key in PLACEHOLDER_NAMES
+
+def trigrams(key):
+    """Character trigrams of a key, padded so short keys still have some."""
+    padded = f"#{key.replace(' ', '')}#"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def max_edits(length):
+    """Most edits a key of this length can be from another and still match."""
+    # The epsilon keeps 0.2 * 10 from truncating to 1
+    return int((1 - SIMILARITY_THRESHOLD) * length + 1e-9)
+
+def bounded_edit_distance(a, b, limit):
+    """
+    Levenshtein distance between a and b, or limit + 1 if it is larger.
+    Only the diagonal band of width 2 * limit + 1 is filled in, and the
+    search stops as soon as a whole row exceeds the limit.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        low, high = max(1, i - limit), min(len(b), i + limit)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= limit else over
+        char_a = a[i - 1]
+        for j in range(low, high + 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != b[j - 1]))
+        if min(current[low - 1:high + 1]) > limit:
+            return over
+        previous = current
+    return min(previous[-1], over)
+
+class KeyIndex:
+    """
+    Trigram inverted index over canonical keys.
+    Lookups only score keys sharing a trigram with the query (and of a
+    similar length), so matching n names costs far less than n^2 comparisons.
+    """
+
+    def __init__(self):
+        self.postings = defaultdict(list)
+        self.canonical = {}
+        self.num_grams = {}
+
+    def add(self, key, canonical):
+        """Index a key that belongs to the given canonical key."""
+        if key in self.canonical:
+            return
+        self.canonical[key] = canonical
+        grams = trigrams(key)
+        self.num_grams[key] = len(grams)
+        for gram in grams:
+            self.postings[gram].append(key)
+
+    def best_match(self, key):
+        """
+        Find the indexed key most similar to key.
+        Returns its canonical key, or None if nothing reaches SIMILARITY_THRESHOLD.
+        """
+        if key in self.canonical:
+            return self.canonical[key]
+        if len(key) < MIN_FUZZY_LENGTH:
+            return None
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            posting = self.postings.get(gram, ())
+            if len(posting) <= MAX_POSTING_LENGTH:
+                shared.update(posting)
+
+        # Each edit changes at most 3 trigrams, so keys within `limit` edits
+        # share at least (trigrams - 3 * limit) of them (the q-gram lemma).
+        # Candidates come most-shared first, so stop once even the longest
+        # possible match is ruled out.
+        min_shared = len(grams) - 3 * max_edits(int(len(key) / SIMILARITY_THRESHOLD))
+        best, best_score = None, SIMILARITY_THRESHOLD
+        for candidate, count in shared.most_common():
+            if count < min_shared:
+                break
+            if len(candidate) < MIN_FUZZY_LENGTH:
+                continue
+            limit = max_edits(max(len(key), len(candidate)))
+            if count < max(len(grams), self.num_grams[candidate]) - 3 * limit:
+                continue
+            distance = bounded_edit_distance(key, candidate, limit)
+            if distance > limit:
+                continue
+            score = 1.0 - distance / max(len(key), len(candidate))
+            if best is None or score > best_score or (score == best_score and candidate < best):
+                best, best_score = candidate, score
+        return self.canonical[best] if best is not None else None
+
+def labels_digest(labels):
+    """
+    Fingerprint a run's labels, in the order they are matched (the order
+    decides which spelling later names merge into).
+    Returns a SHA-256 hex digest.
+    """
+    return hashlib.sha256(json.dumps(labels, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def load_name_cache(cache_file=NAME_CACHE_FILE):
+    """
+    Load the cached label -> canonical key mappings, one per set of labels
+    (see labels_digest). Empty if missing or outdated.
+    Returns a dict of digest -> mapping, oldest first.
+    """
+    cache_file = Path(cache_file)
+    if cache_file.exists():
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            if cache.get('version') == CANONICAL_VERSION:
+                return cache['mappings']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Could not read group name cache ({e}), rebuilding...")
+    return {}
+
+def save_name_cache(mappings, cache_file=NAME_CACHE_FILE):
+    """Write the cached mappings atomically, keeping only the MAX_CACHED_MAPPINGS newest."""
+    cache_file = Path(cache_file)
+    mappings = dict(list(mappings.items())[-MAX_CACHED_MAPPINGS:])
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(cache_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump({'version': CANONICAL_VERSION, 'mappings': mappings}, f, ensure_ascii=False)
+        tmp_file.replace(cache_file)
+    except OSError as e:
+        print(f"Warning: Could not write group name cache ({e})")
+
+def map_labels(labels):
+    """
+    Assign a canonical key (or None for placeholders) to every label.
+    Labels are matched in order (most frequent first) against the keys of
+    the labels before them only, and start a new canonical key if nothing is
+    close enough.
+    Returns a dict of label -> key.
+    """
+    index = KeyIndex()
+    mapping = {}
+    for label in labels:
+        key = normalize_label(label)
+        if is_placeholder(key):
+            mapping[label] = None
+            continue
+        canonical = index.best_match(key) or key
+        index.add(key, canonical)
+        mapping[label] = canonical
+    return mapping
+
+@profiled
+def canonicalize_group_names(group_name_counts, cache_file=NAME_CACHE_FILE):
+    """
+    Merge the raw group name counts into canonical names.
+    Each canonical name is displayed as its most common spelling.
+    Returns a dict with 'group_name_counts' (Counter of canonical names),
+    'variants' (canonical name -> the other spellings merged into it) and
+    'placeholders' (Counter of the discarded names).
+    """
+    # Most common names first, so they become the keys later names merge into
+    labels = [label for label, _ in group_name_counts.most_common()]
+    digest = labels_digest(labels)
+    mappings = load_name_cache(cache_file) if cache_file else {}
+    newest = next(reversed(mappings), None)
+    mapping = mappings.pop(digest, None)
+    if mapping is None:
+        mapping = map_labels(labels)
+        add_counts(labels=len(labels), cache_misses=1)
+    else:
+        add_counts(labels=len(labels), cache_hits=1)
+    if cache_file and newest != digest:
+        # Re-inserted last, so the mappings still in use are the last evicted
+        mappings[digest] = mapping
+        save_name_cache(mappings, cache_file)
+
+    spellings = defaultdict(list)
+    placeholders = Counter()
+    for label in labels:
+        if mapping[label] is None:
+            placeholders[label] = group_name_counts[label]
+        else:
+            spellings[mapping[label]].append(label)
+
+    canonical_counts = Counter()
+    variants = {}
+    for members in spellings.values():
+        # labels are in count order, so members[0] is the most common spelling
+        display = members[0]
+        canonical_counts[display] = sum(group_name_counts[label] for label in members)
+        variants[display] = members[1:]
+
+    return {
+        'group_name_counts': canonical_counts,
+        'variants': variants,
+        'placeholders': placeholders
+    }
@@ -3,29 +3,71 @@ Card Sort Groupings Analyzer
 Analyzes card sort data to identify popular group names and element groupings.
 """
 
-import pandas as pd
-from collections import Counter, defaultdict
+import argparse
+from collections import Counter
 from pathlib import Path
-from itertools import combinations
 
 # Import functions from card_sort_parser
 from card_sort_parser import (
-    column_letter_to_index,
-    parse_group_elements,
     get_group_columns,
-    process_participant
+    extract_card_model,
+    fit_group_columns
 )
+from cooccurrence import (
+    build_cooccurrence,
+    pair_counts_from_matrix,
+    count_pairs,
+    element_frequency_from_matrix,
+    element_neighbors
+)
+from clustering import (
+    LINKAGE_METHODS,
+    DEFAULT_CUT_HEIGHTS,
+    cluster_cards,
+    write_cluster_report,
+    write_distance_matrix
+)
+from bootstrap import (
+    DEFAULT_CONFIDENCE,
+    DEFAULT_REPLICATES,
+    DEFAULT_SEED,
+    bootstrap_groupings,
+    bootstrap_tables,
+    write_bootstrap_report
+)
+from group_names import NAME_CACHE_FILE, canonicalize_group_names
+from card_model import CardSortModel
+from pair_store import stream_groupings_to_store
+from parallel import extract_card_model_parallel
+from profiling import add_counts, add_profile_arguments, profile_session, profiled
+from reports import TEXT_FORMAT, add_format_arguments, print_written, write_tables, write_text
+from survey_schema import read_survey_columns
+from survey_stream import stream_groupings
+from topk import top_counter
+from validation import add_validation_arguments, first_row, load_keep_mask, select_participants
+from workbook_cache import CACHE_DIR
 
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent
 EXCEL_FILE = SCRIPT_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
 OUTPUT_FILE = SCRIPT_DIR / "Groupings.txt"
+CLUSTER_FILE = SCRIPT_DIR / "Clusters.txt"
+DISTANCE_FILE = SCRIPT_DIR / "ClusterDistances.csv"
+BOOTSTRAP_FILE = SCRIPT_DIR / "Bootstrap.txt"
+
+# Entries kept per report section (None keeps all); neighbors are per element
+REPORT_LIMITS = {'names': None, 'pairs': 30, 'elements': None, 'neighbors': 5}
 
+@profiled
 def analyze_group_names(participants_data):
     """
     Count occurrences of each unique group name (excluding "___").
+    Accepts a list of participants or a CardSortModel.
     Returns a Counter sorted by count (descending).
     """
+    if isinstance(participants_data, CardSortModel):
+        return participants_data.group_name_counts()
+    
     group_name_counts = Counter()
     
     for participant in participants_data:
@@ -36,195 +78,380 @@ def analyze_group_names(participants_data):
     
     return group_name_counts
 
-def analyze_cooccurrence_pairs(participants_data):
+def format_pair(pair):
+    """Format a pair tuple for display."""
+    return f"{pair[0]} + {pair[1]}"
+
+@profiled
+def analyze_groupings(group_name_counts, engine, canonical_names=True, name_cache=NAME_CACHE_FILE,
+                      limits=None):
     """
-    Find all pairs of elements that appear together in groups.
-    Returns a Counter of pairs (as tuples) sorted by count (descending).
+    Derive the groupings report from the group name counts and the
+    co-occurrence engine. Pairs, frequencies and relationships are all read
+    off the same matrix. Unless canonical_names is False, spelling variants
+    of a group name are merged and placeholder names dropped (see group_names).
+    limits overrides REPORT_LIMITS; each section only selects its top
+    entries (see topk) instead of sorting everything.
+    Returns a dict with 'group_name_counts', 'group_name_variants',
+    'placeholder_names', 'pair_counts', 'num_pairs', 'element_counts',
+    'element_relationships' (Counters and lists most common first),
+    'num_group_names', 'num_elements' and 'limits'; plus 'pair_sketch'
+    when the pair counts are approximate (see survey_stream).
     """
-    pair_counts = Counter()
+    limits = {**REPORT_LIMITS, **(limits or {})}
+    if canonical_names:
+        print("Canonicalizing group names...")
+        names = canonicalize_group_names(group_name_counts, name_cache)
+    else:
+        names = {'group_name_counts': group_name_counts, 'variants': {}, 'placeholders': Counter()}
     
-    for participant in participants_data:
-        for group in participant['groups']:
-            elements = group['elements']
-            # Generate all pairs of elements within this group
-            for pair in combinations(sorted(elements), 2):
-                pair_counts[pair] += 1
+    print("Analyzing co-occurrence pairs...")
+    pair_counts = pair_counts_from_matrix(engine, limit=limits['pairs'])
+    num_pairs = count_pairs(engine)
+    
+    print("Analyzing element frequency...")
+    element_counts = element_frequency_from_matrix(engine, limit=limits['elements'])
     
-    return pair_counts
+    print("Analyzing element relationships...")
+    element_relationships = element_neighbors(engine, top_n=limits['neighbors'])
+    add_counts(elements=len(engine['elements']), pairs=num_pairs)
+    
+    results = {
+        'group_name_counts': top_counter(names['group_name_counts'], limits['names']),
+        'group_name_variants': names['variants'],
+        'placeholder_names': names['placeholders'],
+        'pair_counts': pair_counts,
+        'num_pairs': num_pairs,
+        'element_counts': element_counts,
+        'element_relationships': element_relationships,
+        'num_group_names': len(names['group_name_counts']),
+        'num_elements': len(engine['elements']),
+        'limits': limits
+    }
+    if engine.get('pair_sketch'):
+        results['pair_sketch'] = engine['pair_sketch']
+    return results
 
-def analyze_element_frequency(participants_data):
+def groupings_lines(results):
     """
-    Count how many times each element appears in any group.
-    Returns a Counter sorted by count (descending).
+    Yield the lines of the groupings text report. The counts in results are
+    already most common first (see analyze_groupings), so nothing is re-sorted.
     """
-    element_counts = Counter()
+    group_name_counts = results['group_name_counts']
+    group_name_variants = results.get('group_name_variants', {})
+    placeholder_names = results.get('placeholder_names', Counter())
+    pair_counts = results['pair_counts']
+    element_counts = results['element_counts']
+    element_relationships = results['element_relationships']
+    num_neighbors = results.get('limits', REPORT_LIMITS)['neighbors']
+    pair_sketch = results.get('pair_sketch')
     
-    for participant in participants_data:
-        for group in participant['groups']:
-            for element in group['elements']:
-                element_counts[element] += 1
+    yield "=" * 80 + "\n"
+    yield "CARD SORT GROUPINGS ANALYSIS\n"
+    yield "=" * 80 + "\n\n"
     
-    return element_counts
+    # 1. Most Popular Group Names
+    yield "-" * 80 + "\n"
+    yield "1. MOST POPULAR GROUP NAMES\n"
+    yield "-" * 80 + "\n\n"
+    if group_name_counts:
+        for group_name, count in group_name_counts.items():
+            yield f"  {group_name}: {count} occurrence(s)\n"
+            if group_name_variants.get(group_name):
+                yield f"      (also: {', '.join(group_name_variants[group_name])})\n"
+    else:
+        yield "  (No group names found)\n"
+    if placeholder_names:
+        yield (f"\n  Placeholder names ignored: {sum(placeholder_names.values())} "
+               f"({', '.join(repr(name) for name in placeholder_names)})\n")
+    yield "\n\n"
+    
+    # 2. Top Co-occurring Element Pairs
+    yield "-" * 80 + "\n"
+    yield "2. TOP CO-OCCURRING ELEMENT PAIRS\n"
+    yield "-" * 80 + "\n\n"
+    if pair_sketch:
+        yield (f"  (Approximate: counted in {pair_sketch['capacity']} space-saving counters; "
+               f"each count may be high by up to {pair_sketch['max_error']})\n\n")
+    if pair_counts:
+        for pair, count in pair_counts.items():
+            yield f"  {format_pair(pair)}: {count} occurrence(s)\n"
+    else:
+        yield "  (No pairs found)\n"
+    yield "\n\n"
+    
+    # 3. Element Frequency
+    yield "-" * 80 + "\n"
+    yield "3. ELEMENT FREQUENCY (How often each element appears in groups)\n"
+    yield "-" * 80 + "\n\n"
+    if element_counts:
+        for element, count in element_counts.items():
+            yield f"  {element}: {count} occurrence(s)\n"
+    else:
+        yield "  (No elements found)\n"
+    yield "\n\n"
+    
+    # 4. Element-to-Element Relationships
+    yield "-" * 80 + "\n"
+    yield "4. ELEMENT-TO-ELEMENT RELATIONSHIPS\n"
+    yield f"(For each element, shows top {num_neighbors} most commonly co-occurring elements)\n"
+    yield "-" * 80 + "\n\n"
+    if element_relationships:
+        # Elements are already ordered by their overall frequency
+        for element, top_related in element_relationships.items():
+            yield f"  {element}:\n"
+            for related_element, count in top_related:
+                yield f"    - {related_element}: {count} time(s) together\n"
+            yield "\n"
+    else:
+        yield "  (No relationships found)\n"
+
+@profiled
+def write_groupings(results, output_file=OUTPUT_FILE):
+    """Write the groupings analysis to a text file."""
+    write_text(groupings_lines(results), output_file)
 
-def analyze_element_relationships(participants_data):
+def groupings_tables(results):
     """
-    For each element, find all other elements it's been grouped with.
-    Returns a dict mapping each element to a Counter of co-occurring elements.
+    Build the structured version of the groupings analysis.
+    Returns a dict of table name -> (columns, rows) for reports.write_tables:
+    group names (with merged spellings), top pairs, element frequency and
+    element relationships.
     """
-    element_relationships = defaultdict(Counter)
-    
-    for participant in participants_data:
-        for group in participant['groups']:
-            elements = group['elements']
-            # For each element, count co-occurrences with other elements in the same group
-            for element in elements:
-                for other_element in elements:
-                    if element != other_element:
-                        element_relationships[element][other_element] += 1
+    variants = results.get('group_name_variants', {})
+    group_names = [
+        {'rank': rank, 'group_name': name, 'count': count, 'variants': '; '.join(variants.get(name, []))}
+        for rank, (name, count) in enumerate(results['group_name_counts'].items(), 1)
+    ]
+    pairs = [
+        {'rank': rank, 'card_a': pair[0], 'card_b': pair[1], 'count': count}
+        for rank, (pair, count) in enumerate(results['pair_counts'].items(), 1)
+    ]
+    elements = [
+        {'rank': rank, 'card': element, 'count': count}
+        for rank, (element, count) in enumerate(results['element_counts'].items(), 1)
+    ]
+    relationships = [
+        {'card': element, 'rank': rank, 'related_card': related_element, 'count': count}
+        for element, top_related in results['element_relationships'].items()
+        for rank, (related_element, count) in enumerate(top_related, 1)
+    ]
+    return {
+        'groupings_names': (['rank', 'group_name', 'count', 'variants'], group_names),
+        'groupings_pairs': (['rank', 'card_a', 'card_b', 'count'], pairs),
+        'groupings_elements': (['rank', 'card', 'count'], elements),
+        'groupings_relationships': (['card', 'rank', 'related_card', 'count'], relationships)
+    }
+
+def print_groupings_summary(results, num_participants):
+    """Print a short summary of the groupings analysis to the console."""
+    group_name_counts = results['group_name_counts']
+    pair_counts = results['pair_counts']
     
-    return element_relationships
+    print("\n" + "=" * 80)
+    print("ANALYSIS SUMMARY")
+    print("=" * 80)
+    print(f"Total participants analyzed: {num_participants}")
+    print(f"Unique group names: {results['num_group_names']}")
+    print(f"Unique element pairs: {results['num_pairs']}")
+    print(f"Unique elements: {results['num_elements']}")
+    if group_name_counts:
+        print(f"\nTop 5 group names:")
+        for name, count in group_name_counts.most_common(5):
+            print(f"  - {name}: {count}")
+    if pair_counts:
+        print(f"\nTop 5 element pairs:")
+        for pair, count in pair_counts.most_common(5):
+            print(f"  - {format_pair(pair)}: {count}")
 
-def format_pair(pair):
-    """Format a pair tuple for display."""
-    return f"{pair[0]} + {pair[1]}"
+@profiled
+def run_clustering(engine, linkage_method='average', cut_heights=DEFAULT_CUT_HEIGHTS,
+                   cluster_file=CLUSTER_FILE, distance_file=DISTANCE_FILE):
+    """Cluster the elements and write the cluster report and distance matrix."""
+    print(f"\nClustering elements ({linkage_method} linkage)...")
+    cluster_result = cluster_cards(engine, method=linkage_method, cut_heights=cut_heights)
+    write_cluster_report(cluster_result, cluster_file)
+    write_distance_matrix(cluster_result, distance_file)
+    height, num_clusters = cluster_result['suggested_cut']
+    print(f"Suggested cut: {num_clusters} categories at distance {height:.3f}")
+    print(f"Clusters written to: {cluster_file}")
+    print(f"Distance matrix written to: {distance_file}")
+    return cluster_result
+
+@profiled
+def run_bootstrap(engine, num_participants, replicates, confidence=DEFAULT_CONFIDENCE, seed=DEFAULT_SEED,
+                  workers=1, linkage_method='average', bootstrap_file=BOOTSTRAP_FILE):
+    """
+    Bootstrap the top pairs and the suggested clusters and write the report.
+    Returns the bootstrap results dict.
+    """
+    print(f"\nBootstrapping {replicates} replicates of {num_participants} participants...")
+    results = bootstrap_groupings(
+        engine, num_participants, replicates=replicates, confidence=confidence, seed=seed,
+        workers=workers, method=linkage_method
+    )
+    write_bootstrap_report(results, bootstrap_file)
+    print(f"Bootstrap report written to: {bootstrap_file}")
+    return results
+
+def parse_args(argv=None):
+    """Parse command line options for the groupings analysis."""
+    parser = argparse.ArgumentParser(description="Analyze card sort groupings.")
+    parser.add_argument('--cluster', action='store_true',
+                        help=f"Also run hierarchical clustering and write {CLUSTER_FILE.name} "
+                             f"and {DISTANCE_FILE.name}")
+    parser.add_argument('--linkage', choices=LINKAGE_METHODS, default='average',
+                        help="Linkage method for clustering (default: average)")
+    parser.add_argument('--cut-heights', type=float, nargs='+', default=list(DEFAULT_CUT_HEIGHTS),
+                        help="Distance heights (0-1) to cut the dendrogram at")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream the workbook row by row instead of loading it into memory")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for parsing and bootstrapping (default: 1, no pool)")
+    parser.add_argument('--bootstrap', type=int, nargs='?', const=DEFAULT_REPLICATES, default=0,
+                        metavar='REPLICATES',
+                        help=f"Bootstrap participants for pair count intervals and cluster stability, "
+                             f"written to {BOOTSTRAP_FILE.name} (default: {DEFAULT_REPLICATES} replicates)")
+    parser.add_argument('--confidence', type=float, default=DEFAULT_CONFIDENCE,
+                        help=f"Confidence level of the bootstrap intervals (default: {DEFAULT_CONFIDENCE})")
+    parser.add_argument('--seed', type=int, default=DEFAULT_SEED,
+                        help=f"Random seed for the bootstrap (default: {DEFAULT_SEED})")
+    parser.add_argument('--raw-names', action='store_true',
+                        help="Count group names exactly as typed instead of merging spelling variants")
+    parser.add_argument('--top-names', type=int, default=REPORT_LIMITS['names'],
+                        help="Group names to report (default: all)")
+    parser.add_argument('--top-pairs', type=int, default=REPORT_LIMITS['pairs'],
+                        help=f"Element pairs to report (default: {REPORT_LIMITS['pairs']})")
+    parser.add_argument('--top-elements', type=int, default=REPORT_LIMITS['elements'],
+                        help="Elements to report by frequency (default: all)")
+    parser.add_argument('--top-neighbors', type=int, default=REPORT_LIMITS['neighbors'],
+                        help=f"Related elements to report per element (default: {REPORT_LIMITS['neighbors']})")
+    parser.add_argument('--pair-capacity', type=int, default=None,
+                        help="With --stream, count pairs approximately in this many counters "
+                             "instead of the full matrix (for very large decks)")
+    parser.add_argument('--pair-store', type=Path, nargs='?', const=CACHE_DIR, default=None, metavar='DIR',
+                        help="Stream with the pair counts in a memory-mapped file in DIR (default: the cache "
+                             "directory), reusing it while the export is unchanged")
+    parser.add_argument('--refresh-pair-store', action='store_true',
+                        help="Recount the pair store even if it is up to date")
+    add_validation_arguments(parser)
+    add_format_arguments(parser)
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
 
-def main():
+def report_limits(args):
+    """Get the per-section report limits from the command line options."""
+    return {
+        'names': args.top_names,
+        'pairs': args.top_pairs,
+        'elements': args.top_elements,
+        'neighbors': args.top_neighbors
+    }
+
+def main(argv=None):
     """Main function to analyze card sort data and generate summary."""
-    print(f"Reading Excel file: {EXCEL_FILE}")
-    
-    try:
-        # Read the Excel file
-        df = pd.read_excel(EXCEL_FILE, header=0)
-        print(f"Successfully loaded {len(df)} rows and {len(df.columns)} columns")
-        
-        # Get column indices
-        group_start, group_end, name_start, name_end = get_group_columns()
-        
-        # Verify we have enough columns
-        max_needed = max(group_end, name_end)
-        if max_needed >= len(df.columns):
-            print(f"\nWARNING: Expected columns may be beyond available columns!")
-            print(f"  Need up to column index {max_needed}, but only have {len(df.columns)} columns")
-            print(f"  Attempting to process with available columns...")
-            group_end = min(group_end, len(df.columns) - 1)
-            name_end = min(name_end, len(df.columns) - 1)
-        
-        # Process each participant (starting from row 3, matching card_sort_parser.py)
-        participants_data = []
-        
-        for row_index in range(3, len(df)):
-            groups = process_participant(row_index, df, group_start, group_end, name_start, name_end)
-            if groups:  # Only add participants who have at least one group
-                participants_data.append({
-                    'participant_number': row_index + 1,
-                    'groups': groups
-                })
-        
-        print(f"Processed {len(participants_data)} participants")
-        
-        # Perform analyses
-        print("\nAnalyzing group names...")
-        group_name_counts = analyze_group_names(participants_data)
+    args = parse_args(argv)
+    with profile_session(args.profile, args.cprofile):
+        print(f"Reading Excel file: {EXCEL_FILE}")
         
-        print("Analyzing co-occurrence pairs...")
-        pair_counts = analyze_cooccurrence_pairs(participants_data)
-        
-        print("Analyzing element frequency...")
-        element_counts = analyze_element_frequency(participants_data)
-        
-        print("Analyzing element relationships...")
-        element_relationships = analyze_element_relationships(participants_data)
-        
-        # Write results to file
-        print(f"\nWriting analysis results to: {OUTPUT_FILE}")
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            f.write("=" * 80 + "\n")
-            f.write("CARD SORT GROUPINGS ANALYSIS\n")
-            f.write("=" * 80 + "\n\n")
+        try:
+            if args.pair_capacity and (not args.stream or args.pair_store):
+                print("WARNING: --pair-capacity only applies with --stream and no --pair-store; "
+                      "counting pairs exactly")
+            # The pair store is a streaming backend
+            args.stream = args.stream or args.pair_store is not None
+            keep = load_keep_mask(EXCEL_FILE) if args.validate else None
             
-            # 1. Most Popular Group Names
-            f.write("-" * 80 + "\n")
-            f.write("1. MOST POPULAR GROUP NAMES\n")
-            f.write("-" * 80 + "\n\n")
-            if group_name_counts:
-                for group_name, count in group_name_counts.most_common():
-                    f.write(f"  {group_name}: {count} occurrence(s)\n")
+            if args.pair_store is not None:
+                # Get column indices from the workbook header
+                group_start, group_end, name_start, name_end = get_group_columns()
+                
+                # Count pairs on disk, or reopen the counts of an earlier run
+                num_participants, group_name_counts, engine = stream_groupings_to_store(
+                    EXCEL_FILE, group_start, group_end, name_start, name_end, first_row(keep),
+                    store_dir=args.pair_store, refresh=args.refresh_pair_store, keep=keep
+                )
+                print(f"Processed {num_participants} participants")
+            elif args.stream:
+                # Get column indices from the workbook header
+                group_start, group_end, name_start, name_end = get_group_columns()
+                
+                # Stream participants and aggregate the counts as we go
+                print("Streaming rows from the workbook...")
+                num_participants, group_name_counts, engine = stream_groupings(
+                    EXCEL_FILE, group_start, group_end, name_start, name_end, first_row(keep),
+                    pair_capacity=args.pair_capacity, keep=keep
+                )
+                print(f"Processed {num_participants} participants")
             else:
-                f.write("  (No group names found)\n")
-            f.write("\n\n")
+                # Read only the card sort columns (through the columnar cache)
+                df, schema = read_survey_columns(EXCEL_FILE, card_sort=True)
+                print(f"Successfully loaded {len(df)} rows and {len(df.columns)} columns")
+                
+                # Get column indices, verifying we have enough columns
+                group_start, group_end, name_start, name_end = fit_group_columns(df, *get_group_columns(schema))
+                
+                # Process each participant (starting from row 3, matching card_sort_parser.py,
+                # or after the question text with the previews masked out by validation)
+                if args.workers > 1:
+                    print(f"Parsing with {args.workers} worker processes...")
+                    participants_data = extract_card_model_parallel(
+                        df, group_start, group_end, name_start, name_end, args.workers, first_row(keep)
+                    )
+                else:
+                    participants_data = extract_card_model(df, group_start, group_end, name_start, name_end,
+                                                           first_row(keep))
+                # Flagged responses are dropped before any pairs are counted
+                participants_data = select_participants(participants_data, keep)
+                num_participants = len(participants_data)
+                
+                print(f"Processed {num_participants} participants")
+                
+                # Perform analyses
+                print("\nAnalyzing group names...")
+                group_name_counts = analyze_group_names(participants_data)
+                
+                print("Building co-occurrence matrix...")
+                engine = build_cooccurrence(participants_data)
             
-            # 2. Top Co-occurring Element Pairs
-            f.write("-" * 80 + "\n")
-            f.write("2. TOP CO-OCCURRING ELEMENT PAIRS\n")
-            f.write("-" * 80 + "\n\n")
-            if pair_counts:
-                top_pairs = pair_counts.most_common(30)  # Top 30 pairs
-                for pair, count in top_pairs:
-                    f.write(f"  {format_pair(pair)}: {count} occurrence(s)\n")
-            else:
-                f.write("  (No pairs found)\n")
-            f.write("\n\n")
+            results = analyze_groupings(group_name_counts, engine, canonical_names=not args.raw_names,
+                                        limits=report_limits(args))
             
-            # 3. Element Frequency
-            f.write("-" * 80 + "\n")
-            f.write("3. ELEMENT FREQUENCY (How often each element appears in groups)\n")
-            f.write("-" * 80 + "\n\n")
-            if element_counts:
-                for element, count in element_counts.most_common():
-                    f.write(f"  {element}: {count} occurrence(s)\n")
-            else:
-                f.write("  (No elements found)\n")
-            f.write("\n\n")
+            # Write results to file
+            if TEXT_FORMAT in args.formats:
+                print(f"\nWriting analysis results to: {OUTPUT_FILE}")
+                write_groupings(results, OUTPUT_FILE)
+            print_written(write_tables(groupings_tables(results), args.formats, args.report_dir))
             
-            # 4. Element-to-Element Relationships
-            f.write("-" * 80 + "\n")
-            f.write("4. ELEMENT-TO-ELEMENT RELATIONSHIPS\n")
-            f.write("(For each element, shows top 5 most commonly co-occurring elements)\n")
-            f.write("-" * 80 + "\n\n")
-            if element_relationships:
-                # Sort elements by their overall frequency for consistent ordering
-                sorted_elements = sorted(element_relationships.keys(), 
-                                       key=lambda x: element_counts.get(x, 0), 
-                                       reverse=True)
-                
-                for element in sorted_elements:
-                    relationships = element_relationships[element]
-                    if relationships:
-                        f.write(f"  {element}:\n")
-                        top_5 = relationships.most_common(5)
-                        for related_element, count in top_5:
-                            f.write(f"    - {related_element}: {count} time(s) together\n")
-                        f.write("\n")
-            else:
-                f.write("  (No relationships found)\n")
-        
-        print(f"Successfully generated analysis!")
-        print(f"Results written to: {OUTPUT_FILE}")
-        
-        # Print summary to console
-        print("\n" + "=" * 80)
-        print("ANALYSIS SUMMARY")
-        print("=" * 80)
-        print(f"Total participants analyzed: {len(participants_data)}")
-        print(f"Unique group names: {len(group_name_counts)}")
-        print(f"Unique element pairs: {len(pair_counts)}")
-        print(f"Unique elements: {len(element_counts)}")
-        if group_name_counts:
-            print(f"\nTop 5 group names:")
-            for name, count in group_name_counts.most_common(5):
-                print(f"  - {name}: {count}")
-        if pair_counts:
-            print(f"\nTop 5 element pairs:")
-            for pair, count in pair_counts.most_common(5):
-                print(f"  - {format_pair(pair)}: {count}")
-        
-    except FileNotFoundError:
-        print(f"Error: Excel file not found at {EXCEL_FILE}")
-    except Exception as e:
-        print(f"Error processing file: {e}")
-        import traceback
-        traceback.print_exc()
+            print(f"Successfully generated analysis!")
+            if TEXT_FORMAT in args.formats:
+                print(f"Results written to: {OUTPUT_FILE}")
+            
+            # Optional hierarchical clustering over the same co-occurrence data
+            if args.cluster and args.stream:
+                print("\nWARNING: --cluster needs the full incidence matrix and is skipped with --stream")
+            elif args.cluster:
+                run_clustering(engine, args.linkage, args.cut_heights)
+            
+            # Optional bootstrap intervals, resampling participants
+            if args.bootstrap and args.stream:
+                print("\nWARNING: --bootstrap needs the full incidence matrix and is skipped with --stream")
+            elif args.bootstrap:
+                bootstrap_results = run_bootstrap(
+                    engine, num_participants, args.bootstrap, args.confidence, args.seed,
+                    args.workers, args.linkage
+                )
+                print_written(write_tables(bootstrap_tables(bootstrap_results), args.formats, args.report_dir))
+            
+            # Print summary to console
+            print_groupings_summary(results, num_participants)
+            
+        except FileNotFoundError:
+            print(f"Error: Excel file not found at {EXCEL_FILE}")
+        except Exception as e:
+            print(f"Error processing file: {e}")
+            import traceback
+            traceback.print_exc()
 
 if __name__ == "__main__":
     main()
-
@@ -0,0 +1,304 @@
+"""
+Incremental Analysis
+Keeps the aggregated Summary and Groupings counts on disk together with the
+IDs of the responses already processed, so a new export only has its unseen
+rows parsed and merged into the stored state.
+"""
+
+import argparse
+import json
+from collections import Counter
+from pathlib import Path
+
+from card_sort_parser import (
+    get_group_columns,
+    fit_group_columns,
+    slice_group_blocks,
+    model_from_blocks
+)
+from cooccurrence import build_cooccurrence
+from groupings_analyzer import (
+    OUTPUT_FILE as GROUPINGS_FILE,
+    analyze_group_names,
+    analyze_groupings,
+    write_groupings,
+    groupings_tables,
+    print_groupings_summary
+)
+from lazy_imports import lazy_module
+from main import (
+    OUTPUT_FILE as SUMMARY_FILE,
+    COLUMNS_TO_ANALYZE,
+    parse_response_series,
+    resolve_column,
+    write_summary,
+    summary_tables,
+    print_summary
+)
+from profiling import add_counts, add_profile_arguments, profile_session, profiled
+from reports import REPORT_DIR, TEXT_FORMAT, add_format_arguments, print_written, write_tables
+from survey_schema import column_letter, read_survey_columns, schema_from_frame
+from validation import add_validation_arguments, first_row, load_keep_mask
+from workbook_cache import CACHE_DIR
+
+np = lazy_module('numpy')
+sparse = lazy_module('scipy.sparse')
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+EXCEL_FILE = SCRIPT_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
+STATE_FILE = CACHE_DIR / "incremental_state.json"
+
+# Bump when the state layout changes so old state files are rebuilt
+STATE_VERSION = 1
+RESPONSE_ID_COLUMN = 'ResponseId'
+
+def empty_state(validated=False):
+    """Return a fresh state with nothing processed."""
+    return {
+        'version': STATE_VERSION,
+        'columns': [list(column) for column in COLUMNS_TO_ANALYZE],
+        # Whether flagged responses (see validation) were left out
+        'validated': validated,
+        'seen_ids': [],
+        'summary': {
+            question_text: {'column': column, 'all_items': [], 'item_counts': {}}
+            for column, question_text in COLUMNS_TO_ANALYZE
+        },
+        'num_participants': 0,
+        'group_name_counts': {},
+        'elements': [],
+        'frequency': [],
+        # Upper triangle (including the diagonal) of the co-occurrence matrix
+        # as [row, col, count] triplets over the element IDs above
+        'cooccurrence': []
+    }
+
+def load_state(state_file=STATE_FILE):
+    """
+    Load the stored state, or a fresh one if there is none or it was written
+    for a different layout or set of columns.
+    """
+    state_file = Path(state_file)
+    if not state_file.exists():
+        return empty_state()
+    try:
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not read incremental state ({e}), starting over...")
+        return empty_state()
+    if state.get('version') != STATE_VERSION or state.get('columns') != [list(c) for c in COLUMNS_TO_ANALYZE]:
+        print("Incremental state is out of date, starting over...")
+        return empty_state()
+    return state
+
+def save_state(state, state_file=STATE_FILE):
+    """Write the state atomically."""
+    state_file = Path(state_file)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = state_file.with_name(state_file.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    tmp_file.replace(state_file)
+
+def row_ids(df):
+    """
+    Get an ID for every row: the Qualtrics ResponseId where present, otherwise
+    the row position.
+    """
+    if RESPONSE_ID_COLUMN in df.columns:
+        ids = df[RESPONSE_ID_COLUMN].tolist()
+    else:
+        ids = [None] * len(df)
+    return [
+        str(value) if isinstance(value, str) and value.strip() else f"row-{position}"
+        for position, value in enumerate(ids)
+    ]
+
+@profiled
+def merge_summary(state, df, new_rows, schema=None):
+    """Parse the free-text columns of the new rows and merge them into the state."""
+    if schema is None:
+        schema = schema_from_frame(df)
+    for column, question_text in COLUMNS_TO_ANALYZE:
+        index = resolve_column(df, column, schema)
+        if index is None:
+            continue
+        entry = state['summary'][question_text]
+        entry['column'] = column_letter(schema, index)
+        item_counts = Counter(entry['item_counts'])
+        items = parse_response_series(df.iloc[new_rows, index]).tolist()
+        entry['all_items'].extend(items)
+        item_counts.update(items)
+        entry['item_counts'] = dict(item_counts)
+
+def state_engine(state):
+    """Rebuild a co-occurrence engine dict (without incidence) from the state."""
+    size = len(state['elements'])
+    triplets = np.asarray(state['cooccurrence'], dtype=np.int64).reshape(-1, 3)
+    upper = sparse.coo_matrix((triplets[:, 2], (triplets[:, 0], triplets[:, 1])), shape=(size, size))
+    # Mirror the strict upper triangle to get the full symmetric matrix
+    cooccurrence = (upper + sparse.triu(upper, k=1).T).tocsr()
+    return {
+        'elements': list(state['elements']),
+        'element_index': {element: i for i, element in enumerate(state['elements'])},
+        'cooccurrence': cooccurrence,
+        'frequency': np.asarray(state['frequency'], dtype=np.int64)
+    }
+
+@profiled
+def merge_groupings(state, participants_data):
+    """Merge the group names and co-occurrence counts of new participants into the state."""
+    state['num_participants'] += len(participants_data)
+
+    group_name_counts = Counter(state['group_name_counts'])
+    group_name_counts.update(analyze_group_names(participants_data))
+    state['group_name_counts'] = dict(group_name_counts)
+
+    new_engine = build_cooccurrence(participants_data)
+    if not new_engine['elements']:
+        return
+
+    # Map the new batch's element IDs onto the stored IDs, appending unseen elements
+    element_index = {element: i for i, element in enumerate(state['elements'])}
+    for element in new_engine['elements']:
+        if element not in element_index:
+            element_index[element] = len(state['elements'])
+            state['elements'].append(element)
+    id_map = np.array([element_index[element] for element in new_engine['elements']], dtype=np.int64)
+    size = len(state['elements'])
+
+    frequency = np.zeros(size, dtype=np.int64)
+    frequency[:len(state['frequency'])] = state['frequency']
+    np.add.at(frequency, id_map, new_engine['frequency'])
+    state['frequency'] = frequency.tolist()
+
+    new_counts = new_engine['cooccurrence'].tocoo()
+    rows, cols = id_map[new_counts.row], id_map[new_counts.col]
+    keep = rows <= cols
+    added = sparse.coo_matrix((new_counts.data[keep], (rows[keep], cols[keep])), shape=(size, size))
+    stored = np.asarray(state['cooccurrence'], dtype=np.int64).reshape(-1, 3)
+    merged = (sparse.coo_matrix((stored[:, 2], (stored[:, 0], stored[:, 1])), shape=(size, size)) + added).tocoo()
+    state['cooccurrence'] = np.column_stack([merged.row, merged.col, merged.data]).astype(int).tolist()
+
+@profiled
+def update_state(state, df, keep=None):
+    """
+    Parse only the rows whose IDs are not in the state yet and merge them in.
+    New rows that fail the keep mask (see validation) are marked as seen
+    without being merged.
+    Returns the number of new rows.
+    """
+    seen = set(state['seen_ids'])
+    ids = row_ids(df)
+    new_rows = [position for position, row_id in enumerate(ids) if row_id not in seen]
+    add_counts(rows=len(ids), new_rows=len(new_rows))
+    if not new_rows:
+        return 0
+
+    schema = schema_from_frame(df)
+    valid_rows = new_rows if keep is None else [position for position in new_rows if keep[position]]
+    merge_summary(state, df, valid_rows, schema)
+
+    # Card sort data only starts at FIRST_RESPONSE_ROW (or after the question
+    # text when validation masks out the previews)
+    start = first_row(keep)
+    card_rows = np.array([position for position in valid_rows if position >= start], dtype=int)
+    if len(card_rows):
+        ranges = fit_group_columns(df, *get_group_columns(schema))
+        group_block, name_block = slice_group_blocks(df, *ranges, start)
+        if group_block is not None:
+            offsets = card_rows - start
+            model = model_from_blocks(group_block[offsets], name_block[offsets])
+            merge_groupings(state, model)
+
+    state['seen_ids'].extend(ids[position] for position in new_rows)
+    return len(new_rows)
+
+def summary_results(state):
+    """Build the main.write_summary results dict from the state."""
+    return {
+        question_text: {
+            'all_items': entry['all_items'],
+            'top_10': Counter(entry['item_counts']).most_common(10),
+            'column': entry['column']
+        }
+        for question_text, entry in state['summary'].items()
+    }
+
+@profiled
+def run_incremental(excel_file=EXCEL_FILE, state_file=STATE_FILE, reset=False, canonical_names=True,
+                    formats=(TEXT_FORMAT,), report_dir=REPORT_DIR, validate=False):
+    """
+    Merge any new responses into the stored state and rewrite Summary.txt and
+    Groupings.txt (and/or their structured tables) from it. With validate,
+    responses flagged by validation are left out.
+    Returns the updated state.
+    """
+    state = empty_state(validate) if reset else load_state(state_file)
+    if state.get('validated', False) != validate:
+        if state['seen_ids']:
+            print("Validation setting changed since the state was saved, starting over...")
+        state = empty_state(validate)
+    print(f"Reading Excel file: {excel_file}")
+    df, _ = read_survey_columns(excel_file, [column for column, _ in COLUMNS_TO_ANALYZE],
+                                card_sort=True, extra=[RESPONSE_ID_COLUMN])
+    print(f"Successfully loaded {len(df)} rows and {len(df.columns)} columns")
+
+    keep = load_keep_mask(excel_file) if validate else None
+    num_new = update_state(state, df, keep)
+    print(f"Processed {num_new} new row(s) ({len(state['seen_ids'])} total)")
+    if num_new:
+        save_state(state, state_file)
+        print(f"State saved to: {state_file}")
+
+    summary = summary_results(state)
+    if TEXT_FORMAT in formats:
+        write_summary(summary, SUMMARY_FILE)
+        print(f"Summary written to: {SUMMARY_FILE}")
+    print_written(write_tables(summary_tables(summary), formats, report_dir))
+
+    groupings = analyze_groupings(Counter(state['group_name_counts']), state_engine(state), canonical_names)
+    if TEXT_FORMAT in formats:
+        write_groupings(groupings, GROUPINGS_FILE)
+        print(f"Groupings written to: {GROUPINGS_FILE}")
+    print_written(write_tables(groupings_tables(groupings), formats, report_dir))
+
+    print_summary(summary)
+    print_groupings_summary(groupings, state['num_participants'])
+    return state
+
+def parse_args(argv=None):
+    """Parse command line options for the incremental run."""
+    parser = argparse.ArgumentParser(description="Update the summary and groupings with new responses only.")
+    parser.add_argument('--excel-file', type=Path, default=EXCEL_FILE,
+                        help="Survey export to analyze")
+    parser.add_argument('--state-file', type=Path, default=STATE_FILE,
+                        help="Where the aggregated state is stored")
+    parser.add_argument('--reset', action='store_true',
+                        help="Ignore the stored state and reprocess every row")
+    parser.add_argument('--raw-names', action='store_true',
+                        help="Count group names exactly as typed instead of merging spelling variants")
+    add_validation_arguments(parser)
+    add_format_arguments(parser)
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function to run the incremental update."""
+    args = parse_args(argv)
+
+    with profile_session(args.profile, args.cprofile):
+        try:
+            run_incremental(args.excel_file, args.state_file, args.reset, not args.raw_names,
+                            args.formats, args.report_dir, args.validate)
+        except FileNotFoundError:
+            print(f"Error: Excel file not found at {args.excel_file}")
+        except Exception as e:
+            print(f"Error processing file: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == "__main__":
+    main()
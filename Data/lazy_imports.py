@@ -0,0 +1,34 @@
+"""
+Lazy Imports
+Defers the heavy third-party imports (pandas, NumPy, SciPy) until a script
+actually uses them, so `--help`, cache-hit runs and analytics store queries
+start without paying for libraries they never touch. Modules write
+
+    pd = lazy_module('pandas')
+
+instead of `import pandas as pd`; the real import happens on the first
+attribute access, and after that lookups go straight to the module's
+attributes.
+"""
+
+import importlib
+import sys
+import types
+
+class LazyModule(types.ModuleType):
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __getattr__(self, attribute):
+        # Only called for attributes the stand-in doesn't have yet
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+def lazy_module(name):
+    """
+    Get a module that is only imported once one of its attributes is used.
+    Returns the module itself if it is already imported.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
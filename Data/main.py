@@ -3,16 +3,40 @@ Parsing script for Excel survey data.
 Extracts and summarizes responses from specific columns.
 """
 
-import pandas as pd
+import argparse
 import re
 from collections import Counter
 from pathlib import Path
 
+from lazy_imports import lazy_module
+from profiling import add_counts, add_profile_arguments, profile_session, profiled
+from reports import TEXT_FORMAT, add_format_arguments, print_written, write_tables, write_text
+from survey_schema import SchemaError, column_index, column_letter, load_schema, read_survey_columns, schema_from_frame
+from survey_stream import iter_column_values
+from validation import add_validation_arguments, load_keep_mask, select_rows
+
+pd = lazy_module('pandas')
+
 # Get the directory where this script is located
 SCRIPT_DIR = Path(__file__).parent
 EXCEL_FILE = SCRIPT_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
 OUTPUT_FILE = SCRIPT_DIR / "Summary.txt"
 
+# Free-text questions by Qualtrics question ID (columns T, W, Z of the December export);
+# Excel letters still work here too
+COLUMNS_TO_ANALYZE = [
+    ('Q8', 'What are the top things you typically use Esther for?'),
+    ('Q12', 'Which features are hardest to find on Esther?'),
+    ('Q14', 'What were you trying to find, and what made it difficult?')
+]
+
+# Item delimiters (runs of newlines, commas, semicolons) and the leading or
+# trailing "and"/"&" stripped from each item
+ITEM_SEPARATOR = re.compile(r'\n+|[,;]')
+LEADING_AND = re.compile(r'^\s*(and|&)\s+', re.IGNORECASE)
+TRAILING_AND = re.compile(r'\s+(and|&)\s*$', re.IGNORECASE)
+
+@profiled(memory=False)
 def parse_responses(text):
     """
     Parse a text response that may contain multiple items separated by commas, semicolons, or newlines.
@@ -35,132 +59,254 @@ def parse_responses(text):
         sub_items = re.split(r'[,;]', item)
         for sub_item in sub_items:
             # Remove "and" at the beginning/end
-            sub_item = re.sub(r'^\s*(and|&)\s+', '', sub_item, flags=re.IGNORECASE)
-            sub_item = re.sub(r'\s+(and|&)\s*$', '', sub_item, flags=re.IGNORECASE)
+            sub_item = LEADING_AND.sub('', sub_item)
+            sub_item = TRAILING_AND.sub('', sub_item)
             sub_item = sub_item.strip()
             if sub_item and len(sub_item) > 1:  # Filter out empty or single-character items
                 all_items.append(sub_item)
     
     return all_items
 
-def analyze_column(df, column_letter, question_text):
+def parse_response_series(responses):
     """
-    Analyze a specific column in the dataframe.
-    Returns a tuple of (all_items, top_10_items)
+    Vectorized parse_responses over a whole Series of responses.
+    Splitting on newlines and then on commas/semicolons is the same as one
+    split on either, so every response is split, exploded and cleaned in a
+    few bulk string operations.
+    Returns a Series of the items, in response order, keeping each item's
+    response index.
     """
-    # Convert column letter to index (T=19, W=22, Z=25)
-    column_index = ord(column_letter.upper()) - ord('A')
-    
-    # Try to get column by index
-    if column_index < len(df.columns):
-        column_name = df.columns[column_index]
+    texts = responses.dropna().map(str).str.strip()
+    items = texts[texts != ''].str.split(ITEM_SEPARATOR).explode()
+    items = items.str.replace(LEADING_AND, '', regex=True)
+    items = items.str.replace(TRAILING_AND, '', regex=True).str.strip()
+    # Filter out empty or single-character items
+    return items[items.str.len() > 1].astype(object)
+
+def count_items(items, n=None):
+    """
+    Count a Series of items, most common first.
+    Ties keep first-appearance order, like Counter.most_common.
+    Returns a list of (item, count) tuples (the top n if n is given).
+    """
+    counts = items.value_counts(sort=False).sort_values(ascending=False, kind='stable')
+    if n is not None:
+        counts = counts.head(n)
+    return list(zip(counts.index.tolist(), counts.tolist()))
+
+def resolve_column(df, column, schema=None):
+    """
+    Find the position of a column in df by question ID (Q8), column ID or
+    Excel letter(s) (T, Z, AA, ...), using the schema of df's header.
+    Returns the column index, or None (with a warning) if the export doesn't have it.
+    """
+    if schema is None:
+        schema = schema_from_frame(df)
+    try:
+        return column_index(schema, column)
+    except SchemaError as e:
+        print(f"Warning: {e}.")
+        return None
+
+@profiled
+def analyze_columns_streaming(export_file, columns_to_analyze, keep=None):
+    """
+    Analyze several columns while streaming the export one row at a time.
+    Item counts are aggregated incrementally instead of loading a DataFrame.
+    Rows where the keep mask (see validation) is False are skipped.
+    Returns the same results dict as analyze_columns.
+    """
+    schema = load_schema(export_file)
+    column_indices = [column_index(schema, column) for column, _ in columns_to_analyze]
+    all_items = [[] for _ in columns_to_analyze]
+    item_counts = [Counter() for _ in columns_to_analyze]
+
+    for row, values in enumerate(iter_column_values(export_file, column_indices)):
+        # Trailing blank rows read_excel drops are past the end of the mask
+        if keep is not None and (row >= len(keep) or not keep[row]):
+            continue
+        for position, response in enumerate(values):
+            if response is None:
+                continue
+            items = parse_responses(response)
+            all_items[position].extend(items)
+            item_counts[position].update(items)
+
+    results = {}
+    for position, (_, question_text) in enumerate(columns_to_analyze):
+        results[question_text] = {
+            'all_items': all_items[position],
+            'top_10': item_counts[position].most_common(10),
+            'column': column_letter(schema, column_indices[position])
+        }
+    return results
+
+@profiled
+def analyze_columns(df, columns_to_analyze):
+    """
+    Analyze each (question ID or column letter, question text) pair in the dataframe.
+    All requested columns are stacked and parsed in one vectorized pass,
+    then counted per column; the items match parse_responses on each
+    response in turn, and the top 10 match Counter.most_common.
+    Returns a dict mapping question text to its 'all_items', 'top_10' and
+    'column' (the Excel letter the question was found in).
+    """
+    schema = schema_from_frame(df)
+    column_indices = [resolve_column(df, column, schema) for column, _ in columns_to_analyze]
+    found = [position for position, index in enumerate(column_indices) if index is not None]
+    for position in found:
+        column = columns_to_analyze[position][0]
+        print(f"Processing column {column} (index {column_indices[position]}): "
+              f"'{df.columns[column_indices[position]]}'...")
+
+    # One Series of every response, keyed by (position in columns_to_analyze, row)
+    if found:
+        responses = pd.concat([df.iloc[:, column_indices[position]] for position in found], keys=found)
+        items = parse_response_series(responses)
+        add_counts(responses=int(responses.notna().sum()), items=len(items))
+        item_positions = items.index.get_level_values(0)
     else:
-        print(f"Warning: Column {column_letter} (index {column_index}) not found.")
-        print(f"Available columns: {list(df.columns)}")
-        return [], []
-    
-    print(f"Processing column {column_letter} (index {column_index}): '{column_name}'...")
-    
-    # Get all non-null responses
-    responses = df[column_name].dropna()
-    
-    # Parse all responses
-    all_items = []
-    for response in responses:
-        items = parse_responses(response)
-        all_items.extend(items)
-    
-    # Count occurrences
-    item_counts = Counter(all_items)
-    
-    # Get top 10
-    top_10 = item_counts.most_common(10)
-    
-    return all_items, top_10
+        items = pd.Series(dtype=object)
+        item_positions = pd.Index([])
 
-def main():
-    """Main function to process the Excel file and generate summary."""
-    print(f"Reading Excel file: {EXCEL_FILE}")
+    results = {}
+    for position, (column, question_text) in enumerate(columns_to_analyze):
+        column_items = items[item_positions == position]
+        index = column_indices[position]
+        results[question_text] = {
+            'all_items': column_items.tolist(),
+            'top_10': count_items(column_items, 10),
+            'column': column_letter(schema, index) if index is not None else column
+        }
+    return results
+
+def summary_lines(results):
+    """Yield the lines of the summary text report."""
+    yield "=" * 80 + "\n"
+    yield "SURVEY DATA SUMMARY\n"
+    yield "=" * 80 + "\n\n"
     
-    try:
-        # Read the Excel file
-        df = pd.read_excel(EXCEL_FILE)
-        print(f"Successfully loaded {len(df)} rows and {len(df.columns)} columns")
-        print(f"Column names: {list(df.columns)}")
+    for question_text, data in results.items():
+        yield "-" * 80 + "\n"
+        yield f"QUESTION: {question_text}\n"
+        yield f"COLUMN: {data['column']}\n"
+        yield "-" * 80 + "\n\n"
         
-        # Column mappings: T, W, Z
-        columns_to_analyze = [
-            ('T', 'What are the top things you typically use Esther for?'),
-            ('W', 'Which features are hardest to find on Esther?'),
-            ('Z', 'What were you trying to find, and what made it difficult?')
-        ]
+        # Write all items
+        yield "ALL RESPONSES:\n"
+        yield "-" * 80 + "\n"
+        if data['all_items']:
+            for item in data['all_items']:
+                yield f"  - {item}\n"
+        else:
+            yield "  (No responses found)\n"
+        yield "\n"
         
-        results = {}
-        
-        # Analyze each column
-        for col_letter, question_text in columns_to_analyze:
-            all_items, top_10 = analyze_column(df, col_letter, question_text)
-            results[question_text] = {
-                'all_items': all_items,
-                'top_10': top_10,
-                'column': col_letter
-            }
+        # Write top 10 summary
+        yield "TOP 10 MOST COMMONLY LISTED ITEMS:\n"
+        yield "-" * 80 + "\n"
+        if data['top_10']:
+            for i, (item, count) in enumerate(data['top_10'], 1):
+                yield f"  {i}. {item} (mentioned {count} time{'s' if count != 1 else ''})\n"
+        else:
+            yield "  (No items found)\n"
+        yield "\n\n"
+
+@profiled
+def write_summary(results, output_file=OUTPUT_FILE):
+    """Write the per-question results to the summary text file."""
+    write_text(summary_lines(results), output_file)
+
+def summary_tables(results):
+    """
+    Build the structured version of the summary: one row per distinct item
+    and question, with its count and rank (instead of every mention).
+    Returns a dict of table name -> (columns, rows) for reports.write_tables.
+    """
+    columns = ['question', 'column', 'rank', 'item', 'count']
+    rows = []
+    for question_text, data in results.items():
+        for rank, (item, count) in enumerate(Counter(data['all_items']).most_common(), 1):
+            rows.append({
+                'question': question_text,
+                'column': data['column'],
+                'rank': rank,
+                'item': item,
+                'count': count
+            })
+    return {'summary_items': (columns, rows)}
+
+def print_summary(results):
+    """Print a short per-question summary to the console."""
+    print("\n" + "=" * 80)
+    print("SUMMARY")
+    print("=" * 80)
+    for question_text, data in results.items():
+        print(f"\n{question_text} (Column {data['column']}):")
+        print(f"  Total items found: {len(data['all_items'])}")
+        print(f"  Unique items: {len(set(data['all_items']))}")
+        if data['top_10']:
+            print("  Top 3:")
+            for item, count in data['top_10'][:3]:
+                print(f"    - {item}: {count}")
+
+def parse_args(argv=None):
+    """Parse command line options for the summary script."""
+    parser = argparse.ArgumentParser(description="Summarize free-text survey responses.")
+    parser.add_argument('--stream', action='store_true',
+                        help="Stream the workbook row by row instead of loading it into memory")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for parsing (default: 1, no pool)")
+    add_validation_arguments(parser)
+    add_format_arguments(parser)
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function to process the Excel file and generate summary."""
+    args = parse_args(argv)
+    with profile_session(args.profile, args.cprofile):
+        print(f"Reading Excel file: {EXCEL_FILE}")
         
-        # Write results to file
-        print(f"\nWriting summary to: {OUTPUT_FILE}")
-        with open(OUTPUT_FILE, 'w', encoding='utf-8') as f:
-            f.write("=" * 80 + "\n")
-            f.write("SURVEY DATA SUMMARY\n")
-            f.write("=" * 80 + "\n\n")
+        try:
+            keep = load_keep_mask(EXCEL_FILE) if args.validate else None
             
-            for question_text, data in results.items():
-                f.write("-" * 80 + "\n")
-                f.write(f"QUESTION: {question_text}\n")
-                f.write(f"COLUMN: {data['column']}\n")
-                f.write("-" * 80 + "\n\n")
+            if args.stream:
+                # Stream rows and aggregate counts as we go
+                print("Streaming rows from the workbook...")
+                results = analyze_columns_streaming(EXCEL_FILE, COLUMNS_TO_ANALYZE, keep)
+            else:
+                # Read the analyzed columns of the Excel file (through the columnar cache)
+                df, _ = read_survey_columns(EXCEL_FILE, [column for column, _ in COLUMNS_TO_ANALYZE])
+                print(f"Successfully loaded {len(df)} rows and {len(df.columns)} columns")
+                print(f"Column names: {list(df.columns)}")
+                df = select_rows(df, keep)
                 
-                # Write all items
-                f.write("ALL RESPONSES:\n")
-                f.write("-" * 80 + "\n")
-                if data['all_items']:
-                    for item in data['all_items']:
-                        f.write(f"  - {item}\n")
+                # Analyze each column
+                if args.workers > 1:
+                    # Imported here because parallel itself imports this module
+                    from parallel import analyze_columns_parallel
+                    print(f"Parsing with {args.workers} worker processes...")
+                    results = analyze_columns_parallel(df, COLUMNS_TO_ANALYZE, args.workers)
                 else:
-                    f.write("  (No responses found)\n")
-                f.write("\n")
-                
-                # Write top 10 summary
-                f.write("TOP 10 MOST COMMONLY LISTED ITEMS:\n")
-                f.write("-" * 80 + "\n")
-                if data['top_10']:
-                    for i, (item, count) in enumerate(data['top_10'], 1):
-                        f.write(f"  {i}. {item} (mentioned {count} time{'s' if count != 1 else ''})\n")
-                else:
-                    f.write("  (No items found)\n")
-                f.write("\n\n")
-        
-        print("Summary file created successfully!")
-        
-        # Print summary to console as well
-        print("\n" + "=" * 80)
-        print("SUMMARY")
-        print("=" * 80)
-        for question_text, data in results.items():
-            print(f"\n{question_text} (Column {data['column']}):")
-            print(f"  Total items found: {len(data['all_items'])}")
-            print(f"  Unique items: {len(set(data['all_items']))}")
-            if data['top_10']:
-                print("  Top 3:")
-                for item, count in data['top_10'][:3]:
-                    print(f"    - {item}: {count}")
-        
-    except FileNotFoundError:
-        print(f"Error: Excel file not found at {EXCEL_FILE}")
-    except Exception as e:
-        print(f"Error processing file: {e}")
-        import traceback
-        traceback.print_exc()
+                    results = analyze_columns(df, COLUMNS_TO_ANALYZE)
+            
+            # Write results to file
+            if TEXT_FORMAT in args.formats:
+                print(f"\nWriting summary to: {OUTPUT_FILE}")
+                write_summary(results, OUTPUT_FILE)
+                print("Summary file created successfully!")
+            print_written(write_tables(summary_tables(results), args.formats, args.report_dir))
+            
+            # Print summary to console as well
+            print_summary(results)
+            
+        except FileNotFoundError:
+            print(f"Error: Excel file not found at {EXCEL_FILE}")
+        except Exception as e:
+            print(f"Error processing file: {e}")
+            import traceback
+            traceback.print_exc()
 
 if __name__ == "__main__":
     main()
-
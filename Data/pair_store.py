@@ -0,0 +1,269 @@
+"""
+On-Disk Pair Counts
+Out-of-core backend for the streaming groupings analysis: the card x card
+co-occurrence counts live in a numpy.memmap file instead of memory, as the
+upper triangle (diagonal included) packed column by column, indexed by
+interned card IDs. Entry (i, j) with i <= j is at j * (j + 1) / 2 + i, which
+doesn't depend on the number of cards, so the file grows in place as new
+cards appear. Updates are buffered and applied in batched np.add.at calls.
+The finished counts are saved with the card list, element frequencies and
+group name counts, keyed by the export, so a later run over the same export
+reopens them without streaming it again.
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+from pathlib import Path
+
+from card_sort_parser import FIRST_RESPONSE_ROW
+from lazy_imports import lazy_module
+from profiling import add_counts, profiled
+from survey_stream import stream_groupings
+from workbook_cache import CACHE_DIR, workbook_key
+
+np = lazy_module('numpy')
+sparse = lazy_module('scipy.sparse')
+
+# Bump when the on-disk layout changes so stale pair stores are rebuilt
+STORE_VERSION = 1
+# Pending (triangle index, count) updates held before they are applied
+FLUSH_ENTRIES = 1 << 18
+# Cards the triangle file is sized for at first (it doubles as needed)
+INITIAL_CARDS = 64
+# Triangle entries scanned at a time when building the sparse matrix
+SCAN_ENTRIES = 1 << 22
+
+def triangle_size(num_cards):
+    """Number of entries in the packed upper triangle of num_cards cards."""
+    return num_cards * (num_cards + 1) // 2
+
+def triangle_index(first_ids, second_ids):
+    """Position of each (i, j) card pair in the packed triangle (either order)."""
+    low = np.minimum(first_ids, second_ids)
+    high = np.maximum(first_ids, second_ids)
+    return high * (high + 1) // 2 + low
+
+def triangle_pairs(indices):
+    """
+    Inverse of triangle_index.
+    Returns tuple of (row_ids, column_ids) arrays with row <= column.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    columns = ((np.sqrt(8 * indices.astype(np.float64) + 1) - 1) // 2).astype(np.int64)
+    # Correct the float square root where it lands one column off
+    columns -= columns * (columns + 1) // 2 > indices
+    columns += (columns + 1) * (columns + 2) // 2 <= indices
+    return indices - columns * (columns + 1) // 2, columns
+
+def pair_store_paths(export_file, store_dir=CACHE_DIR):
+    """
+    Get the pair store file locations for an export.
+    Returns tuple of (counts_path, meta_path)
+    """
+    stem = Path(export_file).stem
+    return Path(store_dir) / f"{stem}.pairs.bin", Path(store_dir) / f"{stem}.pairs.json"
+
+def open_counts(counts_path, capacity, mode='r+'):
+    """Memory-map a triangle file sized for capacity cards."""
+    return np.memmap(counts_path, dtype=np.int64, mode=mode, shape=(triangle_size(capacity),))
+
+class MemmapCooccurrence:
+    """
+    Accumulates element frequencies and co-occurrence counts like
+    survey_stream.StreamingCooccurrence, but with the pair counts in a
+    memory-mapped triangle file. Memory holds only the card list, the
+    frequencies and the pending update buffer, however many rows are
+    streamed. Counts are written to a temporary file that save() moves into
+    place once the stream is complete.
+    """
+
+    def __init__(self, counts_path, capacity=INITIAL_CARDS):
+        self.counts_path = Path(counts_path)
+        self.build_path = self.counts_path.with_name(self.counts_path.name + '.tmp')
+        self.build_path.parent.mkdir(parents=True, exist_ok=True)
+        self.element_index = {}
+        self.elements = []
+        self.frequency = np.zeros(capacity, dtype=np.int64)
+        self.capacity = capacity
+        with open(self.build_path, 'wb') as f:
+            f.truncate(triangle_size(capacity) * 8)
+        self.counts = open_counts(self.build_path, capacity)
+        self._pending_indices = []
+        self._pending_counts = []
+        self._pending = 0
+
+    def _grow(self):
+        """Double the card capacity, extending the triangle file in place."""
+        self.flush()
+        capacity = 2 * self.capacity
+        self.counts.flush()
+        del self.counts
+        # New entries are zero-filled; existing ones keep their positions
+        os.truncate(self.build_path, triangle_size(capacity) * 8)
+        self.counts = open_counts(self.build_path, capacity)
+        frequency = np.zeros(capacity, dtype=np.int64)
+        frequency[:self.capacity] = self.frequency
+        self.frequency = frequency
+        self.capacity = capacity
+
+    def _intern(self, element):
+        """Return the ID for an element, growing the file for new elements."""
+        element_id = self.element_index.get(element)
+        if element_id is None:
+            element_id = len(self.elements)
+            self.element_index[element] = element_id
+            self.elements.append(element)
+            if element_id >= self.capacity:
+                self._grow()
+        return element_id
+
+    def add_group(self, elements):
+        """Queue one group's elements."""
+        if not elements:
+            return
+        ids = np.fromiter((self._intern(element) for element in elements), dtype=np.int64, count=len(elements))
+        # A card repeated m times contributes m * m to its diagonal entry and
+        # m * n to its pair with a card repeated n times, as in the dense matrix
+        unique_ids, repeats = np.unique(ids, return_counts=True)
+        self.frequency[unique_ids] += repeats
+        rows, columns = np.triu_indices(len(unique_ids))
+        self._pending_indices.append(triangle_index(unique_ids[rows], unique_ids[columns]))
+        self._pending_counts.append(repeats[rows] * repeats[columns])
+        self._pending += len(rows)
+        if self._pending >= FLUSH_ENTRIES:
+            self.flush()
+
+    def add_participant(self, participant):
+        """Queue every group of one participant."""
+        for group in participant['groups']:
+            self.add_group(group['elements'])
+
+    def flush(self):
+        """Apply the pending updates to the triangle in one np.add.at call."""
+        if not self._pending:
+            return
+        np.add.at(self.counts, np.concatenate(self._pending_indices), np.concatenate(self._pending_counts))
+        self._pending_indices, self._pending_counts, self._pending = [], [], 0
+
+    def save(self, meta_path, key, num_participants, group_name_counts):
+        """
+        Finish the counts and store them with everything needed to reopen
+        them (see load_pair_store) for the given key.
+        """
+        self.flush()
+        self.counts.flush()
+        del self.counts
+        self.build_path.replace(self.counts_path)
+        self.counts = open_counts(self.counts_path, self.capacity, mode='r')
+        meta = {
+            'version': STORE_VERSION,
+            'key': key,
+            'capacity': self.capacity,
+            'elements': self.elements,
+            'frequency': self.frequency[:len(self.elements)].tolist(),
+            'num_participants': num_participants,
+            'group_name_counts': list(group_name_counts.items())
+        }
+        tmp_path = Path(meta_path).with_name(Path(meta_path).name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        tmp_path.replace(meta_path)
+
+    def to_engine(self):
+        """
+        Build an engine dict usable by the cooccurrence report helpers, like
+        StreamingCooccurrence.to_engine (the incidence matrix is not kept).
+        """
+        self.flush()
+        return triangle_engine(self.counts, self.elements, self.frequency[:len(self.elements)])
+
+def triangle_engine(counts, elements, frequency):
+    """
+    Build an engine dict from a packed triangle of pair counts. The triangle
+    is scanned in SCAN_ENTRIES slices, so only its nonzero entries (the
+    sparse matrix) are ever held in memory.
+    """
+    size = len(elements)
+    first_ids, second_ids, values = [], [], []
+    for start in range(0, triangle_size(size), SCAN_ENTRIES):
+        block = np.asarray(counts[start:min(start + SCAN_ENTRIES, triangle_size(size))])
+        nonzero = np.flatnonzero(block)
+        rows, columns = triangle_pairs(nonzero + start)
+        first_ids.append(rows)
+        second_ids.append(columns)
+        values.append(block[nonzero])
+    rows, columns, values = (np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int64)
+                             for arrays in (first_ids, second_ids, values))
+    off_diagonal = rows != columns
+    return {
+        'elements': list(elements),
+        'element_index': {element: i for i, element in enumerate(elements)},
+        'frequency': np.asarray(frequency, dtype=np.int64).copy(),
+        'cooccurrence': sparse.coo_matrix(
+            (np.concatenate([values, values[off_diagonal]]),
+             (np.concatenate([rows, columns[off_diagonal]]), np.concatenate([columns, rows[off_diagonal]]))),
+            shape=(size, size)
+        ).tocsr()
+    }
+
+def load_pair_store(counts_path, meta_path, key):
+    """
+    Reopen saved pair counts if they were built for the given key, mapping
+    the triangle file read-only instead of recomputing it.
+    Returns tuple of (num_participants, group_name_counts, engine), or None
+    if there is no usable store.
+    """
+    counts_path, meta_path = Path(counts_path), Path(meta_path)
+    if not counts_path.exists() or not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION or meta.get('key') != key:
+            print("Export changed since the pair store was built, rebuilding it...")
+            return None
+        counts = open_counts(counts_path, meta['capacity'], mode='r')
+        engine = triangle_engine(counts, meta['elements'], meta['frequency'])
+        return meta['num_participants'], Counter(dict(meta['group_name_counts'])), engine
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Warning: Could not read pair store ({e}), rebuilding...")
+        return None
+
+@profiled
+def stream_groupings_to_store(export_file, group_start, group_end, name_start, name_end,
+                              first_row=FIRST_RESPONSE_ROW, store_dir=CACHE_DIR, refresh=False, keep=None):
+    """
+    Run the streaming groupings analysis with the pair counts on disk,
+    reusing the saved counts when the export, card sort columns and keep
+    mask (see validation) are unchanged (unless refresh=True).
+    Returns tuple of (num_participants, group_name_counts, engine).
+    """
+    counts_path, meta_path = pair_store_paths(export_file, store_dir)
+    key = {
+        'workbook': workbook_key(export_file),
+        'columns': [group_start, group_end, name_start, name_end],
+        'first_row': first_row,
+        'keep': hashlib.sha256(np.packbits(keep).tobytes()).hexdigest() if keep is not None else None
+    }
+    if not refresh:
+        stored = load_pair_store(counts_path, meta_path, key)
+        if stored is not None:
+            print(f"Using stored pair counts: {counts_path}")
+            add_counts(cache_hits=1)
+            return stored
+
+    # Drop the old metadata first so a half-built store is never taken as current
+    meta_path.unlink(missing_ok=True)
+    print(f"Counting pairs into: {counts_path}")
+    accumulator = MemmapCooccurrence(counts_path)
+    num_participants, group_name_counts, engine = stream_groupings(
+        export_file, group_start, group_end, name_start, name_end, first_row, accumulator=accumulator, keep=keep
+    )
+    try:
+        accumulator.save(meta_path, key, num_participants, group_name_counts)
+    except OSError as e:
+        print(f"Warning: Could not save pair store ({e})")
+    add_counts(cache_misses=1)
+    return num_participants, group_name_counts, engine
@@ -0,0 +1,115 @@
+"""
+Parallel Parsing
+Shards the free-text and card sort parsing across a process pool. Shards are
+merged in row order, so the results (and the report files) are identical to
+the serial run.
+"""
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from card_model import CardSortModel
+from card_sort_parser import (
+    FIRST_RESPONSE_ROW,
+    slice_group_blocks,
+    model_from_blocks
+)
+from main import parse_responses, resolve_column
+from profiling import profiled
+from survey_schema import column_letter, schema_from_frame
+
+# Shards per worker, so a slow shard doesn't leave the other workers idle
+SHARDS_PER_WORKER = 4
+
+def shard_bounds(num_items, workers):
+    """
+    Split range(num_items) into contiguous shards for the given worker count.
+    Returns a list of (start, stop) tuples, in order.
+    """
+    num_shards = max(1, min(num_items, workers * SHARDS_PER_WORKER))
+    size, extra = divmod(num_items, num_shards)
+    bounds = []
+    start = 0
+    for shard in range(num_shards):
+        stop = start + size + (1 if shard < extra else 0)
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+def parse_response_shard(responses):
+    """
+    Worker: parse a shard of free-text responses.
+    Returns tuple of (items, item_counts) for the shard, items in response order.
+    """
+    items = []
+    for response in responses:
+        items.extend(parse_responses(response))
+    return items, Counter(items)
+
+def model_shard(group_block, name_block, first_row):
+    """Worker: build the card sort model for one shard of rows."""
+    return model_from_blocks(group_block, name_block, first_row)
+
+@profiled
+def analyze_columns_parallel(df, columns_to_analyze, workers):
+    """
+    Parallel version of main.analyze_columns.
+    Each column's responses are sharded across the pool; the item lists are
+    concatenated in shard order and the partial Counters merged in the same
+    order, so ties in the top 10 come out exactly as in the serial run.
+    Returns the same results dict as main.analyze_columns.
+    """
+    # Resolve every column first so all shards can be submitted together
+    schema = schema_from_frame(df)
+    tasks = []
+    for column, question_text in columns_to_analyze:
+        index = resolve_column(df, column, schema)
+        if index is not None:
+            print(f"Processing column {column} (index {index}): '{df.columns[index]}'...")
+            responses = df.iloc[:, index].dropna().tolist()
+            column = column_letter(schema, index)
+        else:
+            responses = []
+        tasks.append((column, question_text, responses))
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            [executor.submit(parse_response_shard, responses[start:stop])
+             for start, stop in shard_bounds(len(responses), workers)]
+            for _, _, responses in tasks
+        ]
+
+        results = {}
+        for (column, question_text, _), column_futures in zip(tasks, futures):
+            all_items = []
+            item_counts = Counter()
+            for future in column_futures:
+                items, counts = future.result()
+                all_items.extend(items)
+                item_counts.update(counts)
+            results[question_text] = {
+                'all_items': all_items,
+                'top_10': item_counts.most_common(10),
+                'column': column
+            }
+    return results
+
+@profiled
+def extract_card_model_parallel(df, group_start, group_end, name_start, name_end, workers,
+                                first_row=FIRST_RESPONSE_ROW):
+    """
+    Parallel version of card_sort_parser.extract_card_model.
+    The group and name blocks are sliced once and split into row shards; each
+    worker returns a CardSortModel for its rows and the shards are
+    concatenated in order.
+    """
+    group_block, name_block = slice_group_blocks(df, group_start, group_end, name_start, name_end, first_row)
+    if group_block is None:
+        return CardSortModel.empty()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(model_shard, group_block[start:stop], name_block[start:stop], first_row + start)
+            for start, stop in shard_bounds(len(group_block), workers)
+        ]
+        return CardSortModel.concat([future.result() for future in futures])
@@ -0,0 +1,176 @@
+"""
+Survey Analysis Pipeline
+Loads the survey export once, builds the participant model once and runs the
+free-text summary, card sort dump and groupings analysis as stages over it.
+"""
+
+import argparse
+from pathlib import Path
+
+from card_sort_parser import (
+    OUTPUT_FILE as CARD_SORT_FILE,
+    get_group_columns,
+    fit_group_columns,
+    extract_card_model,
+    write_card_sort,
+    card_sort_tables
+)
+from clustering import LINKAGE_METHODS, DEFAULT_CUT_HEIGHTS
+from cooccurrence import build_cooccurrence
+from groupings_analyzer import (
+    OUTPUT_FILE as GROUPINGS_FILE,
+    analyze_group_names,
+    analyze_groupings,
+    write_groupings,
+    groupings_tables,
+    print_groupings_summary,
+    run_clustering
+)
+from main import (
+    OUTPUT_FILE as SUMMARY_FILE,
+    COLUMNS_TO_ANALYZE,
+    analyze_columns,
+    write_summary,
+    summary_tables,
+    print_summary
+)
+from parallel import analyze_columns_parallel, extract_card_model_parallel
+from profiling import add_profile_arguments, profile_session, profiled
+from reports import REPORT_DIR, TEXT_FORMAT, add_format_arguments, print_written, write_tables
+from survey_schema import read_survey_columns, schema_from_frame
+from validation import add_validation_arguments, first_row, load_keep_mask, select_participants, select_rows
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+EXCEL_FILE = SCRIPT_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
+
+# Stages in the order they run
+STAGES = ('summary', 'cardsort', 'groupings', 'clusters')
+
+@profiled
+def load_participant_model(df, workers=1, keep=None):
+    """
+    Build the card sort participant model from the survey DataFrame, sharding
+    the rows across a process pool if workers > 1, and leaving out the rows
+    that fail the keep mask (see validation).
+    Returns a CardSortModel (see card_model).
+    """
+    ranges = get_group_columns(schema_from_frame(df))
+    group_start, group_end, name_start, name_end = fit_group_columns(df, *ranges)
+    if workers > 1:
+        model = extract_card_model_parallel(df, group_start, group_end, name_start, name_end, workers,
+                                            first_row(keep))
+    else:
+        model = extract_card_model(df, group_start, group_end, name_start, name_end, first_row(keep))
+    return select_participants(model, keep)
+
+@profiled
+def run_pipeline(stages=STAGES, excel_file=EXCEL_FILE, refresh=False,
+                 linkage_method='average', cut_heights=DEFAULT_CUT_HEIGHTS, workers=1,
+                 canonical_names=True, formats=(TEXT_FORMAT,), report_dir=REPORT_DIR, validate=False):
+    """
+    Run the selected stages over one load of the survey data, leaving out
+    the responses flagged by validation if validate is True.
+    The participant model and co-occurrence engine are only built if a stage
+    needs them, and then shared by every stage that does. Each stage writes
+    its text report and/or structured tables, depending on formats.
+    Returns a dict with each stage's results.
+    """
+    stages = [stage for stage in STAGES if stage in stages]
+    outputs = {}
+    card_sort_stages = ('cardsort', 'groupings', 'clusters')
+
+    # Only the columns the selected stages use are loaded
+    print(f"Reading Excel file: {excel_file}")
+    columns = [column for column, _ in COLUMNS_TO_ANALYZE] if 'summary' in stages else []
+    card_sort = any(stage in stages for stage in card_sort_stages)
+    df, _ = read_survey_columns(excel_file, columns, card_sort=card_sort, refresh=refresh)
+    print(f"Successfully loaded {len(df)} rows and {len(df.columns)} columns")
+    keep = load_keep_mask(excel_file) if validate else None
+
+    if 'summary' in stages:
+        print("\n[summary] Analyzing free-text columns...")
+        if workers > 1:
+            results = analyze_columns_parallel(select_rows(df, keep), COLUMNS_TO_ANALYZE, workers)
+        else:
+            results = analyze_columns(select_rows(df, keep), COLUMNS_TO_ANALYZE)
+        if TEXT_FORMAT in formats:
+            write_summary(results, SUMMARY_FILE)
+            print(f"Summary written to: {SUMMARY_FILE}")
+        print_written(write_tables(summary_tables(results), formats, report_dir))
+        print_summary(results)
+        outputs['summary'] = results
+
+    participants_data = None
+    if card_sort:
+        participants_data = load_participant_model(df, workers, keep)
+        print(f"\nBuilt participant model: {len(participants_data)} participants")
+
+    if 'cardsort' in stages:
+        print("\n[cardsort] Writing card sort results...")
+        if TEXT_FORMAT in formats:
+            write_card_sort(participants_data, CARD_SORT_FILE)
+            print(f"Card sort results written to: {CARD_SORT_FILE}")
+        print_written(write_tables(card_sort_tables(participants_data), formats, report_dir))
+        outputs['cardsort'] = participants_data
+
+    engine = None
+    if 'groupings' in stages or 'clusters' in stages:
+        print("\nBuilding co-occurrence matrix...")
+        engine = build_cooccurrence(participants_data)
+
+    if 'groupings' in stages:
+        print("\n[groupings] Analyzing group names...")
+        results = analyze_groupings(analyze_group_names(participants_data), engine, canonical_names)
+        if TEXT_FORMAT in formats:
+            write_groupings(results, GROUPINGS_FILE)
+            print(f"Groupings written to: {GROUPINGS_FILE}")
+        print_written(write_tables(groupings_tables(results), formats, report_dir))
+        print_groupings_summary(results, len(participants_data))
+        outputs['groupings'] = results
+
+    if 'clusters' in stages:
+        print("\n[clusters] Running hierarchical clustering...")
+        outputs['clusters'] = run_clustering(engine, linkage_method, cut_heights)
+
+    return outputs
+
+def parse_args(argv=None):
+    """Parse command line options for the pipeline."""
+    parser = argparse.ArgumentParser(description="Run the survey analyses over a single load of the data.")
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=['summary', 'cardsort', 'groupings'],
+                        help="Stages to run (default: summary cardsort groupings)")
+    parser.add_argument('--excel-file', type=Path, default=EXCEL_FILE,
+                        help="Survey export to analyze")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Rebuild the workbook cache even if it is up to date")
+    parser.add_argument('--linkage', choices=LINKAGE_METHODS, default='average',
+                        help="Linkage method for the clusters stage (default: average)")
+    parser.add_argument('--cut-heights', type=float, nargs='+', default=list(DEFAULT_CUT_HEIGHTS),
+                        help="Distance heights (0-1) to cut the dendrogram at in the clusters stage")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Worker processes for parsing (default: 1, no pool)")
+    parser.add_argument('--raw-names', action='store_true',
+                        help="Count group names exactly as typed instead of merging spelling variants")
+    add_validation_arguments(parser)
+    add_format_arguments(parser)
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function to run the selected pipeline stages."""
+    args = parse_args(argv)
+
+    with profile_session(args.profile, args.cprofile):
+        try:
+            run_pipeline(args.stages, args.excel_file, args.refresh, args.linkage, args.cut_heights, args.workers,
+                         not args.raw_names, args.formats, args.report_dir, args.validate)
+        except FileNotFoundError:
+            print(f"Error: Excel file not found at {args.excel_file}")
+        except Exception as e:
+            print(f"Error processing file: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == "__main__":
+    main()
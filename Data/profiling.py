@@ -0,0 +1,234 @@
+"""
+Profiling
+Opt-in stage timers for the analysis scripts. Run any script with --profile
+(or set SURVEY_PROFILE) to record wall time, call counts, row/cell/pair
+counters and tracemalloc peaks per stage, written as a JSON trace. Add
+--cprofile (or SURVEY_CPROFILE) for a cProfile dump of the whole run.
+When profiling is off every hook returns immediately.
+"""
+
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+TRACE_FILE = SCRIPT_DIR / "profile_trace.json"
+
+# Environment variables that turn profiling on without the command line flags
+PROFILE_ENV = 'SURVEY_PROFILE'
+CPROFILE_ENV = 'SURVEY_CPROFILE'
+
+# The active profiling session, or None when profiling is off
+_session = None
+
+class ProfileSession:
+    """
+    Collects the stage records of one profiled run.
+    Stages nest: a stage entered while another is running is recorded under
+    it, and repeated calls of the same stage at the same place are merged.
+    """
+
+    def __init__(self, trace_file, cprofile_file=None, command=None):
+        self.trace_file = Path(trace_file)
+        self.cprofile_file = Path(cprofile_file) if cprofile_file else None
+        self.command = command or Path(sys.argv[0]).name
+        self.records = {}
+        self.stack = []
+        self.profiler = None
+        self.started = None
+        self.start_time = None
+
+    def start(self):
+        """Start the clocks, tracemalloc and (if requested) cProfile."""
+        self.started = datetime.now().isoformat(timespec='seconds')
+        self.start_time = time.perf_counter()
+        tracemalloc.start()
+        if self.cprofile_file is not None:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def record(self, path, name):
+        """Get (or create) the aggregated record for a stage path."""
+        record = self.records.get(path)
+        if record is None:
+            record = {
+                'stage': path,
+                'name': name,
+                'depth': len(self.stack),
+                'calls': 0,
+                'seconds': 0.0,
+                'peak_bytes': None,
+                'counters': {}
+            }
+            self.records[path] = record
+        return record
+
+    @contextlib.contextmanager
+    def stage(self, name, memory=True):
+        """
+        Time one run of a stage. With memory=True its tracemalloc peak is
+        recorded too (the peak is reset on entry and handed up to the parent
+        stage on exit, so nesting doesn't hide the parent's peak).
+        """
+        parent = self.stack[-1] if self.stack else None
+        path = f"{parent['record']['stage']}/{name}" if parent else name
+        frame = {'record': self.record(path, name), 'peak': 0, 'memory': memory}
+        if memory:
+            current_peak = tracemalloc.get_traced_memory()[1]
+            for outer in self.stack:
+                outer['peak'] = max(outer['peak'], current_peak)
+            tracemalloc.reset_peak()
+        self.stack.append(frame)
+        start = time.perf_counter()
+        try:
+            yield frame['record']['counters']
+        finally:
+            elapsed = time.perf_counter() - start
+            self.stack.pop()
+            record = frame['record']
+            record['calls'] += 1
+            record['seconds'] += elapsed
+            if memory:
+                peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+                record['peak_bytes'] = max(record['peak_bytes'] or 0, peak)
+                for outer in self.stack:
+                    outer['peak'] = max(outer['peak'], peak)
+                tracemalloc.reset_peak()
+
+    def count(self, **counters):
+        """Add to the counters of the innermost running stage."""
+        if not self.stack:
+            return
+        target = self.stack[-1]['record']['counters']
+        for key, value in counters.items():
+            target[key] = target.get(key, 0) + int(value)
+
+    def finish(self):
+        """
+        Stop profiling, write the JSON trace (and cProfile dump).
+        Returns the trace dict.
+        """
+        wall_seconds = time.perf_counter() - self.start_time
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.cprofile_file.parent.mkdir(parents=True, exist_ok=True)
+            self.profiler.dump_stats(self.cprofile_file)
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        trace = {
+            'command': self.command,
+            'argv': sys.argv[1:],
+            'started': self.started,
+            'wall_seconds': wall_seconds,
+            'peak_bytes': max([peak_bytes] + [r['peak_bytes'] or 0 for r in self.records.values()]),
+            'cprofile': str(self.cprofile_file) if self.cprofile_file else None,
+            'stages': list(self.records.values())
+        }
+        self.trace_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.trace_file, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, indent=2)
+        return trace
+
+def add_counts(**counters):
+    """Add row/cell/pair counters to the running stage (no-op when profiling is off)."""
+    if _session is not None:
+        _session.count(**counters)
+
+def profiled(func=None, *, name=None, memory=True):
+    """
+    Decorator running every call of a function as a stage.
+    Use memory=False for functions called once per row or cell: they still
+    get call counts and time, without the tracemalloc bookkeeping.
+    """
+    def decorate(func):
+        stage_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _session is None:
+                return func(*args, **kwargs)
+            with _session.stage(stage_name, memory):
+                return func(*args, **kwargs)
+        return wrapper
+
+    if func is not None:
+        return decorate(func)
+    return decorate
+
+def add_profile_arguments(parser):
+    """Add the --profile and --cprofile options to a script's argument parser."""
+    parser.add_argument('--profile', nargs='?', const=TRACE_FILE, default=None, type=Path,
+                        metavar='TRACE_FILE',
+                        help=f"Write a JSON stage trace (default file: {TRACE_FILE.name}; "
+                             f"or set {PROFILE_ENV})")
+    parser.add_argument('--cprofile', type=Path, default=None, metavar='STATS_FILE',
+                        help=f"Also write a cProfile dump of the run (or set {CPROFILE_ENV})")
+
+def resolve_profile_files(trace_file=None, cprofile_file=None):
+    """
+    Combine the command line options with the environment variables.
+    SURVEY_PROFILE may be a trace path or a flag like 1/true.
+    Returns tuple of (trace_file, cprofile_file); trace_file is None when profiling is off.
+    """
+    env_trace = os.environ.get(PROFILE_ENV, '').strip()
+    env_cprofile = os.environ.get(CPROFILE_ENV, '').strip()
+    if cprofile_file is None and env_cprofile:
+        cprofile_file = Path(env_cprofile)
+    if trace_file is None and env_trace and env_trace.lower() not in ('0', 'false', 'no', 'off'):
+        trace_file = TRACE_FILE if env_trace.lower() in ('1', 'true', 'yes', 'on') else Path(env_trace)
+    if trace_file is None and cprofile_file is not None:
+        # A cProfile dump implies the stage trace as well
+        trace_file = TRACE_FILE
+    return trace_file, cprofile_file
+
+@contextlib.contextmanager
+def profile_session(trace_file=None, cprofile_file=None, command=None):
+    """
+    Profile the enclosed run if trace_file/cprofile_file (or the environment
+    variables) ask for it, then write the trace and print the stage table.
+    Yields the session, or None when profiling is off.
+    """
+    global _session
+    trace_file, cprofile_file = resolve_profile_files(trace_file, cprofile_file)
+    if trace_file is None or _session is not None:
+        yield _session
+        return
+
+    _session = ProfileSession(trace_file, cprofile_file, command)
+    _session.start()
+    try:
+        with _session.stage('run'):
+            yield _session
+    finally:
+        active, _session = _session, None
+        trace = active.finish()
+        print_trace(trace)
+        print(f"Profile trace written to: {active.trace_file}")
+        if active.cprofile_file is not None:
+            print(f"cProfile stats written to: {active.cprofile_file}")
+
+def format_bytes(num_bytes):
+    """Format a byte count in MB (or '-' if not measured)."""
+    return '-' if num_bytes is None else f"{num_bytes / 2**20:.1f}"
+
+def print_trace(trace):
+    """Print the stages of a trace as an indented table."""
+    print("\n" + "=" * 80)
+    print(f"PROFILE: {trace['command']} ({trace['wall_seconds']:.3f}s, "
+          f"peak {format_bytes(trace['peak_bytes'])} MB)")
+    print("=" * 80)
+    print(f"{'Stage':<40} {'Calls':>7} {'Seconds':>10} {'Peak MB':>8}  Counters")
+    for record in trace['stages']:
+        label = '  ' * record['depth'] + record['name']
+        counters = ', '.join(f"{key}={value}" for key, value in record['counters'].items())
+        print(f"{label:<40} {record['calls']:>7} {record['seconds']:>10.4f} "
+              f"{format_bytes(record['peak_bytes']):>8}  {counters}")
@@ -0,0 +1,122 @@
+"""
+Report Writers
+Writes the analysis results in bulk: text reports are built as line
+generators and flushed in large chunks instead of one f.write per line, and
+the same results can be written as structured tables (JSON Lines, CSV, or
+Parquet when pyarrow is installed) so other tools don't have to parse the
+text reports.
+"""
+
+import csv
+import json
+from pathlib import Path
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+REPORT_DIR = SCRIPT_DIR / "reports"
+
+# Lines (or table rows) buffered before each write
+CHUNK_LINES = 4096
+
+TEXT_FORMAT = 'text'
+STRUCTURED_FORMATS = ('jsonl', 'csv', 'parquet')
+REPORT_FORMATS = (TEXT_FORMAT,) + STRUCTURED_FORMATS
+
+def chunked(iterable, size=CHUNK_LINES):
+    """Yield lists of up to `size` items from an iterable."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def write_text(lines, output_file):
+    """
+    Write an iterable of text pieces (lines or preformatted blocks, each
+    ending in a newline) to a file, joining them into large chunks so the
+    file sees a few big writes.
+    Returns the number of pieces written.
+    """
+    num_lines = 0
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for chunk in chunked(lines):
+            f.write(''.join(chunk))
+            num_lines += len(chunk)
+    return num_lines
+
+def write_jsonl(rows, output_file):
+    """Write table rows (dicts) as JSON Lines."""
+    with open(output_file, 'w', encoding='utf-8') as f:
+        for chunk in chunked(rows):
+            f.write(''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in chunk))
+
+def write_csv(rows, columns, output_file):
+    """Write table rows (dicts) as CSV with the given column order."""
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in chunked(rows):
+            writer.writerows([row.get(column) for column in columns] for row in chunk)
+
+def write_parquet(rows, columns, output_file):
+    """Write table rows (dicts) as Parquet (needs pyarrow)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    rows = list(rows)
+    table = pa.table({column: [row.get(column) for row in rows] for column in columns})
+    pq.write_table(table, output_file)
+
+def parquet_available():
+    """Whether pyarrow is installed, so Parquet output can be written."""
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def write_tables(tables, formats, output_dir=REPORT_DIR, prefix=''):
+    """
+    Write structured tables in each requested format.
+    tables maps a table name to (columns, rows), where rows is a list of
+    dicts; each table is written to output_dir / f"{prefix}{name}.{format}".
+    Text is not a table format and is ignored here.
+    Returns the list of files written.
+    """
+    formats = [fmt for fmt in formats if fmt in STRUCTURED_FORMATS]
+    if 'parquet' in formats and not parquet_available():
+        print("Warning: pyarrow is not installed, skipping Parquet output")
+        formats.remove('parquet')
+    if not formats:
+        return []
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    written = []
+    for name, (columns, rows) in tables.items():
+        for fmt in formats:
+            output_file = output_dir / f"{prefix}{name}.{fmt}"
+            if fmt == 'jsonl':
+                write_jsonl(rows, output_file)
+            elif fmt == 'csv':
+                write_csv(rows, columns, output_file)
+            else:
+                write_parquet(rows, columns, output_file)
+            written.append(output_file)
+    return written
+
+def add_format_arguments(parser):
+    """Add the --format and --report-dir options to a script's argument parser."""
+    parser.add_argument('--format', nargs='+', choices=REPORT_FORMATS, default=[TEXT_FORMAT],
+                        dest='formats',
+                        help="Report formats to write (default: text). Structured formats "
+                             "are written as one file per table")
+    parser.add_argument('--report-dir', type=Path, default=REPORT_DIR,
+                        help=f"Directory for structured reports (default: {REPORT_DIR.name}/)")
+
+def print_written(files):
+    """Print the structured report files that were written."""
+    for output_file in files:
+        print(f"Structured report written to: {output_file}")
@@ -0,0 +1,234 @@
+"""
+Survey Schema
+Resolves where each question lives in a Qualtrics export from its header
+(question IDs like Q8, Q30_3_GROUP, Q31_4) and question text row, instead of
+hardcoded column letters. The card sort is found as the Qn_k_GROUP columns
+plus the numbered columns of the question that follows them (the group
+names), and the two ranges are checked to line up. The resolved schema is
+cached next to the workbook cache, so scripts can look columns up by
+question ID and read only the columns they use.
+"""
+
+import json
+import re
+from pathlib import Path
+
+from lazy_imports import lazy_module
+from workbook_cache import CACHE_DIR, EXCEL_FILE, SHEET_POSITIONS, read_survey, workbook_key
+
+pd = lazy_module('pandas')
+
+# Bump when the resolution rules change so cached schemas are rebuilt
+SCHEMA_VERSION = 1
+
+# Question ID at the start of a column ID (Q8_6_TEXT -> Q8; Q28.1 is its own question)
+QUESTION_ID = re.compile(r'^(Q\d+(?:\.\d+)?)(?:_|$)')
+# Card sort group columns (Q30_0_GROUP) and numbered sub-columns (Q31_1)
+GROUP_COLUMN = re.compile(r'^(Q\d+)_(\d+)_GROUP$')
+NUMBERED_COLUMN = re.compile(r'^(Q\d+)_(\d+)$')
+
+class SchemaError(ValueError):
+    """The export's columns don't match what the analysis needs."""
+
+def column_letter_to_index(column_letter):
+    """
+    Convert Excel column letter(s) to zero-based index.
+    Examples: A -> 0, Z -> 25, AA -> 26, AL -> 37
+    Uses Excel's column numbering: A=1, B=2, ..., Z=26, AA=27, etc.
+    """
+    column_letter = column_letter.upper()
+    result = 0
+    for char in column_letter:
+        result = result * 26 + (ord(char) - ord('A') + 1)
+    return result - 1  # Convert to zero-based (Excel uses 1-based)
+
+def index_to_column_letter(column_index):
+    """Convert a zero-based column index to Excel letter(s) (37 -> AL)."""
+    letters = ''
+    column_index += 1
+    while column_index:
+        column_index, remainder = divmod(column_index - 1, 26)
+        letters = chr(ord('A') + remainder) + letters
+    return letters
+
+def find_card_sort(column_ids, questions):
+    """
+    Locate the card sort group columns and the group name columns.
+    The group question is the one with the most Qn_k_GROUP columns (ordered
+    by k); the names are the first later question made only of numbered
+    Qm_k columns.
+    Returns a dict with 'groups_question', 'groups', 'names_question' and
+    'names' (column indices), or None if the export has no card sort.
+    """
+    groups_by_question = {}
+    for index, column_id in enumerate(column_ids):
+        match = GROUP_COLUMN.match(column_id)
+        if match:
+            groups_by_question.setdefault(match.group(1), []).append((int(match.group(2)), index))
+    if not groups_by_question:
+        return None
+    groups_question = max(groups_by_question, key=lambda question: len(groups_by_question[question]))
+    groups = [index for _, index in sorted(groups_by_question[groups_question])]
+
+    names_question, names = None, []
+    for question, entry in questions.items():
+        if entry['columns'][0] <= groups[-1] or question == groups_question:
+            continue
+        numbered = [NUMBERED_COLUMN.match(column_ids[index]) for index in entry['columns']]
+        if all(numbered):
+            names_question = question
+            names = [index for _, index in sorted(
+                (int(match.group(2)), index) for match, index in zip(numbered, entry['columns'])
+            )]
+            break
+
+    return {'groups_question': groups_question, 'groups': groups, 'names_question': names_question, 'names': names}
+
+def resolve_schema(column_ids, question_texts=(), positions=None):
+    """
+    Resolve the schema of an export from its column IDs (header row) and the
+    question text row below it. positions gives each column's index in the
+    full sheet, for frames that only hold some of the columns.
+    Returns a dict with 'version', 'columns' (column IDs), 'positions',
+    'questions' (question ID -> 'text' and 'columns') and 'card_sort'.
+    """
+    column_ids = [str(column_id) for column_id in column_ids]
+    question_texts = list(question_texts) + [None] * (len(column_ids) - len(question_texts))
+    questions = {}
+    for index, (column_id, text) in enumerate(zip(column_ids, question_texts)):
+        match = QUESTION_ID.match(column_id)
+        if match is None:
+            continue
+        entry = questions.setdefault(match.group(1), {'text': None, 'columns': []})
+        entry['columns'].append(index)
+        if entry['text'] is None and isinstance(text, str):
+            entry['text'] = text
+
+    return {
+        'version': SCHEMA_VERSION,
+        'columns': column_ids,
+        'positions': list(positions) if positions is not None else list(range(len(column_ids))),
+        'questions': questions,
+        'card_sort': find_card_sort(column_ids, questions)
+    }
+
+def schema_from_frame(df):
+    """
+    Resolve the schema of an export already loaded as a DataFrame (header as
+    the columns, question text in row 0). Column indices are positions in df.
+    """
+    question_texts = df.iloc[0].tolist() if len(df) else []
+    return resolve_schema(df.columns, question_texts, df.attrs.get(SHEET_POSITIONS))
+
+def schema_path(excel_file, cache_dir=CACHE_DIR):
+    """Get the cache file location of a workbook's schema."""
+    return Path(cache_dir) / f"{Path(excel_file).stem}.schema.json"
+
+def read_header(export_file):
+    """Read just the header and question text rows of an export (.xlsx or .csv)."""
+    if Path(export_file).suffix.lower() == '.csv':
+        return pd.read_csv(export_file, nrows=1)
+    return pd.read_excel(export_file, header=0, nrows=1)
+
+def load_schema(excel_file=EXCEL_FILE, cache_dir=CACHE_DIR, refresh=False):
+    """
+    Resolve the schema of a workbook, reading only its header and question
+    text rows. The result is cached and reused until the workbook changes.
+    Returns the schema dict (column indices are sheet positions).
+    """
+    excel_file = Path(excel_file)
+    cache_file = schema_path(excel_file, cache_dir)
+    key = workbook_key(excel_file)
+    if not refresh and cache_file.exists():
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('key') == key and cached['schema'].get('version') == SCHEMA_VERSION:
+                return cached['schema']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Could not read schema cache ({e}), resolving again...")
+
+    header = read_header(excel_file)
+    schema = resolve_schema(header.columns, header.iloc[0].tolist() if len(header) else [])
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'schema': schema}, f, indent=2)
+    except OSError as e:
+        print(f"Warning: Could not write schema cache ({e})")
+    return schema
+
+def column_index(schema, column):
+    """
+    Find a column by column ID (Q8_6_TEXT), question ID (Q8, its first
+    column) or, for older configurations, Excel letter(s) (T).
+    Returns the column index in the schema.
+    Raises SchemaError if the column isn't in the export.
+    """
+    if column in schema['columns']:
+        return schema['columns'].index(column)
+    if column in schema['questions']:
+        return schema['questions'][column]['columns'][0]
+    if column.isalpha():
+        position = column_letter_to_index(column)
+        if position in schema['positions']:
+            return schema['positions'].index(position)
+    raise SchemaError(f"Column {column} not found in the export")
+
+def column_letter(schema, index):
+    """Excel letter(s) of a schema column in the full sheet."""
+    return index_to_column_letter(schema['positions'][index])
+
+def card_sort_columns(schema):
+    """
+    Get the card sort group and group name column ranges.
+    Both must be contiguous and the same length, since group k is named by
+    the k-th name column.
+    Returns tuple of (group_start, group_end, name_start, name_end).
+    Raises SchemaError if the export has no card sort or the ranges don't line up.
+    """
+    card_sort = schema['card_sort']
+    if card_sort is None:
+        raise SchemaError("No card sort (Qn_k_GROUP) columns found in the export")
+    groups, names = card_sort['groups'], card_sort['names']
+    if len(groups) != len(names):
+        raise SchemaError(
+            f"{card_sort['groups_question']} has {len(groups)} group columns but "
+            f"{card_sort['names_question'] or 'no later question'} has {len(names)} group name columns"
+        )
+    for label, indices in (('group', groups), ('group name', names)):
+        if indices != list(range(indices[0], indices[0] + len(indices))):
+            raise SchemaError(f"The card sort {label} columns are not contiguous")
+    return groups[0], groups[-1], names[0], names[-1]
+
+def used_columns(schema, columns=(), card_sort=False, extra=()):
+    """
+    Collect the sheet positions an analysis reads: the given columns (by
+    column ID, question ID or letter), the card sort ranges if card_sort is
+    True, and any extra column IDs that exist (e.g. ResponseId).
+    The question text row is always row 0, so nothing else is needed.
+    Returns a sorted list of sheet positions.
+    """
+    indices = set()
+    for column in columns:
+        try:
+            indices.add(column_index(schema, column))
+        except SchemaError as e:
+            print(f"Warning: {e}")
+    if card_sort:
+        group_start, group_end, name_start, name_end = card_sort_columns(schema)
+        indices.update(range(group_start, group_end + 1))
+        indices.update(range(name_start, name_end + 1))
+    indices.update(schema['columns'].index(column) for column in extra if column in schema['columns'])
+    return sorted(schema['positions'][index] for index in indices)
+
+def read_survey_columns(excel_file=EXCEL_FILE, columns=(), card_sort=False, extra=(), refresh=False):
+    """
+    Read only the columns an analysis uses (see used_columns) through the
+    workbook cache, and resolve the schema of the resulting frame.
+    Returns tuple of (df, schema), with schema indices being positions in df.
+    """
+    schema = load_schema(excel_file, refresh=refresh)
+    positions = used_columns(schema, columns, card_sort, extra)
+    df = read_survey(excel_file, refresh=refresh, columns=positions)
+    return df, schema_from_frame(df)
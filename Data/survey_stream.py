@@ -0,0 +1,203 @@
+"""
+Streaming Survey Reader
+Reads the survey export one row at a time (openpyxl read-only mode, or a CSV
+export) and aggregates results incrementally, so very large exports can be
+analyzed in bounded memory.
+"""
+
+import csv
+from collections import Counter
+from pathlib import Path
+
+from card_sort_parser import FIRST_RESPONSE_ROW, process_row
+from lazy_imports import lazy_module
+from profiling import add_counts, profiled
+from topk import SpaceSaving
+
+np = lazy_module('numpy')
+sparse = lazy_module('scipy.sparse')
+
+# Strings pandas reads as missing values by default (so "NA" or "None" typed as
+# a group name is treated the same way in both modes)
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND',
+    '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+def clean_row(row):
+    """Replace missing-value strings with None, matching pd.read_excel."""
+    return tuple(None if isinstance(value, str) and value in NA_STRINGS else value for value in row)
+
+def iter_rows(export_file):
+    """
+    Yield the data rows of a survey export as tuples, one at a time.
+    The header row is skipped, so the first tuple is the row pd.read_excel
+    would return at index 0. Works on .xlsx (read-only openpyxl) and .csv.
+    """
+    export_file = Path(export_file)
+    if export_file.suffix.lower() == '.csv':
+        # Qualtrics CSV exports may start with a byte order mark
+        with open(export_file, 'r', encoding='utf-8-sig', newline='') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                yield clean_row(row)
+        return
+
+    import openpyxl
+    workbook = openpyxl.load_workbook(export_file, read_only=True, data_only=True)
+    try:
+        worksheet = workbook.active
+        for row in worksheet.iter_rows(min_row=2, values_only=True):
+            yield clean_row(row)
+    finally:
+        workbook.close()
+
+def iter_column_values(export_file, column_indices):
+    """
+    Yield one tuple per data row with the values of the requested columns
+    (None where the row is too short or the cell is missing).
+    """
+    for row in iter_rows(export_file):
+        yield tuple(row[index] if index < len(row) else None for index in column_indices)
+
+def iter_participants(export_file, group_start, group_end, name_start, name_end, first_row=FIRST_RESPONSE_ROW):
+    """
+    Yield each participant's card sort data, one row at a time.
+    Yields the same dicts extract_participants returns (participant_number and
+    groups), skipping rows before first_row and participants with no groups.
+    """
+    for row_index, row in enumerate(iter_rows(export_file)):
+        if row_index < first_row:
+            continue
+        groups = process_row(row, group_start, group_end, name_start, name_end)
+        if groups:
+            yield {
+                'participant_number': row_index + 1,
+                'groups': groups
+            }
+
+class StreamingCooccurrence:
+    """
+    Incrementally accumulates element frequencies and the card x card
+    co-occurrence matrix, one group at a time.
+    Memory depends on the number of distinct cards, not on the number of rows.
+    With pair_capacity, pairs of different cards are counted approximately
+    in a SpaceSaving sketch of that many counters instead of the dense
+    matrix, for decks whose pair space is too large to hold exactly.
+    """
+
+    def __init__(self, pair_capacity=None):
+        self.element_index = {}
+        self.elements = []
+        self.frequency = np.zeros(0, dtype=np.int64)
+        self.cooccurrence = np.zeros((0, 0), dtype=np.int64)
+        self.pair_sketch = SpaceSaving(pair_capacity) if pair_capacity else None
+        # Diagonal of the co-occurrence matrix, kept separately with a sketch
+        self.diagonal = np.zeros(0, dtype=np.int64)
+
+    def _intern(self, element):
+        """Return the ID for an element, growing the arrays for new elements."""
+        element_id = self.element_index.get(element)
+        if element_id is None:
+            element_id = len(self.elements)
+            self.element_index[element] = element_id
+            self.elements.append(element)
+            if element_id >= len(self.frequency):
+                capacity = max(16, 2 * len(self.frequency))
+                size = len(self.frequency)
+                frequency = np.zeros(capacity, dtype=np.int64)
+                frequency[:size] = self.frequency
+                if self.pair_sketch is None:
+                    cooccurrence = np.zeros((capacity, capacity), dtype=np.int64)
+                    cooccurrence[:size, :size] = self.cooccurrence
+                    self.cooccurrence = cooccurrence
+                else:
+                    diagonal = np.zeros(capacity, dtype=np.int64)
+                    diagonal[:size] = self.diagonal
+                    self.diagonal = diagonal
+                self.frequency = frequency
+        return element_id
+
+    def add_group(self, elements):
+        """Add one group's elements."""
+        if not elements:
+            return
+        ids = np.fromiter((self._intern(element) for element in elements), dtype=np.int64, count=len(elements))
+        np.add.at(self.frequency, ids, 1)
+        if self.pair_sketch is None:
+            np.add.at(self.cooccurrence, (ids[:, None], ids[None, :]), 1)
+            return
+        # A card repeated m times contributes m * m to its diagonal entry and
+        # m * n to its pair with a card repeated n times, as in the dense matrix
+        unique_ids, repeats = np.unique(ids, return_counts=True)
+        self.diagonal[unique_ids] += repeats * repeats
+        unique_ids, repeats = unique_ids.tolist(), repeats.tolist()
+        for a in range(len(unique_ids)):
+            for b in range(a + 1, len(unique_ids)):
+                self.pair_sketch.add((unique_ids[a], unique_ids[b]), repeats[a] * repeats[b])
+
+    def add_participant(self, participant):
+        """Add every group of one participant."""
+        for group in participant['groups']:
+            self.add_group(group['elements'])
+
+    def to_engine(self):
+        """
+        Build an engine dict usable by the cooccurrence report helpers
+        (pair_arrays, count_pairs, element_frequency_from_matrix, element_neighbors).
+        The incidence matrix is not kept in streaming mode. With a pair sketch
+        the matrix holds the tracked (approximate) pair counts, and the engine
+        gets a 'pair_sketch' dict with the sketch's 'capacity' and 'max_error'.
+        """
+        size = len(self.elements)
+        engine = {
+            'elements': list(self.elements),
+            'element_index': dict(self.element_index),
+            'frequency': self.frequency[:size].copy()
+        }
+        if self.pair_sketch is None:
+            engine['cooccurrence'] = sparse.csr_matrix(self.cooccurrence[:size, :size])
+            return engine
+
+        pairs = list(self.pair_sketch.counts.items())
+        first_ids = np.array([pair[0] for pair, _ in pairs], dtype=np.int64)
+        second_ids = np.array([pair[1] for pair, _ in pairs], dtype=np.int64)
+        counts = np.array([count for _, count in pairs], dtype=np.int64)
+        diagonal_ids = np.arange(size)
+        engine['cooccurrence'] = sparse.coo_matrix(
+            (np.concatenate([counts, counts, self.diagonal[:size]]),
+             (np.concatenate([first_ids, second_ids, diagonal_ids]),
+              np.concatenate([second_ids, first_ids, diagonal_ids]))),
+            shape=(size, size)
+        ).tocsr()
+        engine['pair_sketch'] = {'capacity': self.pair_sketch.capacity, 'max_error': self.pair_sketch.max_error()}
+        return engine
+
+@profiled
+def stream_groupings(export_file, group_start, group_end, name_start, name_end, first_row=FIRST_RESPONSE_ROW,
+                     pair_capacity=None, accumulator=None, keep=None):
+    """
+    Aggregate the groupings analysis while streaming participants, counting
+    pairs approximately in pair_capacity counters if given. accumulator
+    replaces the in-memory StreamingCooccurrence (e.g. with the on-disk
+    pair_store.MemmapCooccurrence). Participants whose rows fail the keep
+    mask (see validation) are skipped before anything is counted.
+    Returns tuple of (num_participants, group_name_counts, engine).
+    """
+    group_name_counts = Counter()
+    if accumulator is None:
+        accumulator = StreamingCooccurrence(pair_capacity)
+    num_participants = 0
+
+    for participant in iter_participants(export_file, group_start, group_end, name_start, name_end, first_row):
+        if keep is not None and not keep[participant['participant_number'] - 1]:
+            continue
+        num_participants += 1
+        for group in participant['groups']:
+            if group['name'] != '___' and group['name'].strip():
+                group_name_counts[group['name']] += 1
+        accumulator.add_participant(participant)
+    add_counts(participants=num_participants, elements=len(accumulator.elements))
+
+    return num_participants, group_name_counts, accumulator.to_engine()
@@ -0,0 +1,195 @@
+"""
+Synthetic Survey Generator
+Writes Qualtrics-shaped survey exports (.xlsx or .csv) with the same column
+layout as the real export: free text in T/W/Z, card sort groups in AL onward,
+group names in YC-YQ. Used to benchmark the analysis scripts without the
+real (private) export.
+"""
+
+import argparse
+import csv
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from card_sort_parser import KNOWN_CARDS
+
+# Column layout of the real export
+METADATA_COLUMNS = [
+    ('StartDate', 'Start Date'), ('EndDate', 'End Date'), ('Status', 'Response Type'),
+    ('IPAddress', 'IP Address'), ('Progress', 'Progress'), ('Duration (in seconds)', 'Duration (in seconds)'),
+    ('Finished', 'Finished'), ('RecordedDate', 'Recorded Date'), ('ResponseId', 'Response ID'),
+    ('RecipientLastName', 'Recipient Last Name'), ('RecipientFirstName', 'Recipient First Name'),
+    ('RecipientEmail', 'Recipient Email'), ('ExternalReference', 'External Data Reference'),
+    ('LocationLatitude', 'Location Latitude'), ('LocationLongitude', 'Location Longitude'),
+    ('DistributionChannel', 'Distribution Channel'), ('UserLanguage', 'User Language')
+]
+# Question columns from R (index 17) up to AK (index 36); T, W and Z are free text
+QUESTION_COLUMNS = ['Q4', 'Q6', 'Q8', 'Q8_6_TEXT', 'Q10', 'Q12', 'Q12_7_TEXT', 'Q13', 'Q14', 'Q15',
+                    'Q16', 'Q18', 'Q19', 'Q20', 'Q32', 'Q33', 'Q35', 'Q36', 'Q38', 'Q39']
+FREE_TEXT_COLUMNS = {
+    'Q8': 'What are the top things you typically use Esther for? - Selected Choice',
+    'Q12': 'Which features are hardest to find on Esther? - Selected Choice',
+    'Q14': 'What were you trying to find, and what made it difficult?'
+}
+TRAILING_COLUMNS = ['Q24', 'Q26', 'Q28', 'Q29', 'Q29_5_TEXT', 'Q27', 'Q28', 'Q29']
+MAX_GROUPS = 15
+RANKS_PER_GROUP = 40
+
+# Phrases the free-text answers are assembled from
+FREE_TEXT_PHRASES = [
+    'Checking grades', 'Registering for classes', 'Viewing your transcript',
+    'Accessing financial information', 'Checking holds or account status',
+    'degree audit', 'major declaration', 'course catalog', 'finding the registrar forms',
+    'the menus are confusing', 'too many clicks', 'search does not work',
+    'enrollment verification', 'tuition bill', 'housing agreement'
+]
+GROUP_LABELS = [
+    'Registration', 'Academics', 'Finances', 'Finance', 'Financial Info', 'Personal Info',
+    'Personal Information', 'Wellbeing', 'Housing', 'Transcript', 'Graduation', 'Other', '.', 'x', 'none'
+]
+
+def build_columns():
+    """
+    Build the (column name, question text) pairs for the whole export.
+    Returns a list of tuples in column order.
+    """
+    columns = list(METADATA_COLUMNS)
+    for name in QUESTION_COLUMNS:
+        columns.append((name, FREE_TEXT_COLUMNS.get(name, f"Question {name}")))
+    sort_prompt = "Organizing Esther Features - Please group these items in a way that makes sense to you."
+    for group in range(MAX_GROUPS):
+        columns.append((f"Q30_{group}_GROUP", f"{sort_prompt} - Groups - Group {group + 1}"))
+    for group in range(MAX_GROUPS):
+        for rank in range(1, RANKS_PER_GROUP + 1):
+            columns.append((f"Q30_{group}_{rank}_RANK", f"{sort_prompt} - Ranks - Group {group + 1} - Rank {rank}"))
+    for group in range(1, MAX_GROUPS + 1):
+        columns.append((f"Q31_{group}", f"Please give each group a name. - Group {group}"))
+    for name in TRAILING_COLUMNS:
+        columns.append((name, f"Question {name}"))
+    return columns
+
+def card_vocabulary(num_cards):
+    """
+    Get a card vocabulary of the requested size: the real cards first, then
+    generated names. The generated names have no commas, since the parser
+    only keeps comma-containing names together for the real cards.
+    """
+    cards = list(KNOWN_CARDS[:num_cards])
+    cards.extend(f"Card {number}" for number in range(len(cards) + 1, num_cards + 1))
+    return cards
+
+def free_text_answer(rng, text_length):
+    """Assemble one free-text answer of about text_length items."""
+    count = rng.randint(1, max(1, text_length))
+    items = rng.sample(FREE_TEXT_PHRASES, min(count, len(FREE_TEXT_PHRASES)))
+    separators = [', ', '; ', '\n', ' and ']
+    answer = items[0]
+    for item in items[1:]:
+        answer += rng.choice(separators) + item
+    return answer
+
+def card_sort_answer(rng, cards, num_groups):
+    """
+    Split the cards into up to num_groups groups.
+    Returns tuple of (group_cells, name_cells), each MAX_GROUPS long.
+    """
+    groups_used = rng.randint(1, max(1, min(num_groups, MAX_GROUPS)))
+    shuffled = cards[:]
+    rng.shuffle(shuffled)
+    groups = [[] for _ in range(groups_used)]
+    for card in shuffled:
+        groups[rng.randrange(groups_used)].append(card)
+    group_cells = [','.join(group) if group else None for group in groups]
+    name_cells = [rng.choice(GROUP_LABELS) if group else None for group in groups]
+    padding = [None] * (MAX_GROUPS - groups_used)
+    return group_cells + padding, name_cells + padding
+
+def generate_rows(num_respondents, num_cards=len(KNOWN_CARDS), num_groups=MAX_GROUPS,
+                  text_length=3, seed=0):
+    """
+    Yield the data rows of a synthetic export, one list per row: the question
+    text row, two survey previews, then num_respondents responses.
+    """
+    rng = random.Random(seed)
+    columns = build_columns()
+    names = [name for name, _ in columns]
+    # First position of each name (the trailing Q28/Q29 columns repeat)
+    positions = {}
+    for i, name in enumerate(names):
+        positions.setdefault(name, i)
+    cards = card_vocabulary(num_cards)
+    group_start = names.index('Q30_0_GROUP')
+    name_start = names.index('Q31_1')
+    started = datetime(2025, 11, 12, 14, 0, 0)
+
+    yield [text for _, text in columns]
+
+    for row_number in range(num_respondents + 2):
+        row = [None] * len(columns)
+        start = started + timedelta(minutes=7 * row_number)
+        duration = rng.randint(120, 1800)
+        row[positions['StartDate']] = start
+        row[positions['EndDate']] = start + timedelta(seconds=duration)
+        row[positions['Status']] = 'Survey Preview' if row_number < 2 else 'IP Address'
+        row[positions['Progress']] = 100
+        row[positions['Duration (in seconds)']] = duration
+        row[positions['Finished']] = 'True'
+        row[positions['RecordedDate']] = start + timedelta(seconds=duration)
+        row[positions['ResponseId']] = f"R_{row_number:015d}"
+        row[positions['DistributionChannel']] = 'preview' if row_number < 2 else 'anonymous'
+        row[positions['UserLanguage']] = 'EN'
+        for name in FREE_TEXT_COLUMNS:
+            row[positions[name]] = free_text_answer(rng, text_length)
+        group_cells, name_cells = card_sort_answer(rng, cards, num_groups)
+        row[group_start:group_start + MAX_GROUPS] = group_cells
+        row[name_start:name_start + MAX_GROUPS] = name_cells
+        yield row
+
+def write_survey(output_file, num_respondents, num_cards=len(KNOWN_CARDS), num_groups=MAX_GROUPS,
+                 text_length=3, seed=0):
+    """
+    Write a synthetic export to output_file (.xlsx or .csv).
+    Returns the output path.
+    """
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    header = [name for name, _ in build_columns()]
+    rows = generate_rows(num_respondents, num_cards, num_groups, text_length, seed)
+
+    if output_file.suffix.lower() == '.csv':
+        with open(output_file, 'w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(header)
+            for row in rows:
+                writer.writerow(['' if value is None else value for value in row])
+        return output_file
+
+    import openpyxl
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Sheet0')
+    worksheet.append(header)
+    for row in rows:
+        worksheet.append(row)
+    workbook.save(output_file)
+    return output_file
+
+def main():
+    """Write a synthetic survey export."""
+    parser = argparse.ArgumentParser(description="Generate a synthetic Qualtrics-shaped survey export.")
+    parser.add_argument('output', type=Path, help="Output file (.xlsx or .csv)")
+    parser.add_argument('--respondents', type=int, default=1000, help="Number of responses (default: 1000)")
+    parser.add_argument('--cards', type=int, default=len(KNOWN_CARDS),
+                        help=f"Card vocabulary size (default: {len(KNOWN_CARDS)})")
+    parser.add_argument('--groups', type=int, default=MAX_GROUPS,
+                        help=f"Maximum groups per respondent, up to {MAX_GROUPS} (default: {MAX_GROUPS})")
+    parser.add_argument('--text-length', type=int, default=3,
+                        help="Maximum items per free-text answer (default: 3)")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed (default: 0)")
+    args = parser.parse_args()
+
+    path = write_survey(args.output, args.respondents, args.cards, args.groups, args.text_length, args.seed)
+    print(f"Wrote {args.respondents} synthetic responses to: {path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""
+Shared fixtures for the Data script tests. The scripts import each other as
+top-level modules, so the Data directory is put on sys.path first. Tests run
+against the committed survey export.
+"""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+DATA_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(DATA_DIR))
+
+EXPORT_FILE = DATA_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
+
+@pytest.fixture(scope='session')
+def export_frame():
+    """The committed export exactly as pd.read_excel reads it."""
+    return pd.read_excel(EXPORT_FILE, header=0)
+
+@pytest.fixture(scope='session')
+def export_participants(export_frame):
+    """Participants parsed from the committed export."""
+    from card_sort_parser import extract_participants, get_group_columns
+    return extract_participants(export_frame, *get_group_columns())
+
+@pytest.fixture(scope='session')
+def synthetic_export(tmp_path_factory):
+    """A 60-respondent synthetic export with the real column layout."""
+    from synthetic_survey import write_survey
+    return write_survey(tmp_path_factory.mktemp('synthetic') / 'synthetic.xlsx', 60, seed=1)
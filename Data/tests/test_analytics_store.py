@@ -0,0 +1,152 @@
+import json
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import quote
+from urllib.request import urlopen
+
+import pytest
+
+from analytics_store import (
+    TOP_NEIGHBORS,
+    AnalyticsStore,
+    StoreRequestHandler,
+    build_store,
+    check_limit,
+    parse_args,
+    positive_int,
+    store_is_current
+)
+from card_sort_parser import extract_card_model, get_group_columns
+from cooccurrence import build_cooccurrence, element_neighbors
+from group_names import canonicalize_group_names
+
+@pytest.fixture(scope='module')
+def model(export_frame):
+    return extract_card_model(export_frame, *get_group_columns())
+
+@pytest.fixture(scope='module')
+def store_file(tmp_path_factory, model):
+    store_file = tmp_path_factory.mktemp('store') / 'analytics.sqlite'
+    build_store(model, store_file, 'export-key', name_cache=None)
+    return store_file
+
+@pytest.fixture(scope='module')
+def store(store_file):
+    with AnalyticsStore(store_file) as store:
+        yield store
+
+@pytest.fixture(scope='module')
+def server(store):
+    """Serve the store on a free local port. Yields the API base URL."""
+    handler = type('Handler', (StoreRequestHandler,), {'store': store})
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}/api"
+    httpd.shutdown()
+    httpd.server_close()
+
+def get(url):
+    """Fetch a JSON endpoint. Returns tuple of (status, body)."""
+    try:
+        with urlopen(url) as response:
+            return response.status, json.load(response)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+def test_cards_and_neighbors_match_the_engine(store, model):
+    engine = build_cooccurrence(model)
+    frequency = dict(zip(engine['elements'], engine['frequency'].tolist()))
+    assert {row['card']: row['frequency'] for row in store.cards()} == frequency
+    for card, top in element_neighbors(engine, top_n=TOP_NEIGHBORS).items():
+        assert [(row['card'], row['count']) for row in store.top_neighbors(card, TOP_NEIGHBORS)] == top
+
+def test_large_limits_walk_the_full_row(store, model):
+    engine = build_cooccurrence(model)
+    matrix = engine['cooccurrence'].toarray()
+    card = engine['elements'][0]
+    expected = sorted(((count, other) for other, count in enumerate(matrix[0]) if other != 0 and count),
+                      key=lambda item: (-item[0], item[1]))
+    rows = store.top_neighbors(card, 1000)
+    assert [(row['count'], engine['element_index'][row['card']]) for row in rows] == expected
+    assert store.pair_count(card, engine['elements'][expected[0][1]]) == expected[0][0]
+
+def test_cards_for_label_match_a_direct_count(store, model):
+    names = canonicalize_group_names(model.group_name_counts(), cache_file=None)
+    label, _ = names['group_name_counts'].most_common(1)[0]
+    spellings = {label, *names['variants'][label]}
+    counts = Counter(
+        card for participant in model for group in participant['groups']
+        if group['name'] in spellings for card in group['elements']
+    )
+    result = store.cards_for_label(label.upper(), limit=100)
+    assert result['label'] == label
+    assert {row['card']: row['count'] for row in result['cards']} == dict(counts)
+    for spelling in spellings:
+        assert store.cards_for_label(spelling, limit=3)['cards'] == result['cards'][:3]
+
+def test_lookups_ignore_case(store, model):
+    card = model.cards[0]
+    assert store.top_neighbors(card.lower()) == store.top_neighbors(card)
+
+def test_unknown_names(store, model):
+    assert store.top_neighbors('No Such Card') is None
+    assert store.cards_for_label('No Such Label') is None
+    assert store.pair_count(model.cards[0], 'No Such Card') is None
+
+def test_store_is_current(store_file, tmp_path):
+    assert store_is_current(store_file, 'export-key')
+    assert not store_is_current(store_file, 'other-key')
+    assert not store_is_current(store_file, 'export-key', canonical_names=False)
+    assert not store_is_current(tmp_path / 'missing.sqlite', 'export-key')
+
+def test_http_endpoints(server, store, model):
+    card = model.cards[0]
+    assert get(f"{server}/cards/{quote(card)}/neighbors?limit=3") == (200, store.top_neighbors(card, 3))
+    status, labels = get(f"{server}/labels?limit=2")
+    assert status == 200 and labels == store.labels(2)
+    assert get(f"{server}/meta")[1]['source'] == 'export-key'
+
+def test_unknown_card_and_endpoint(server):
+    assert get(f"{server}/cards/Nothing/neighbors")[0] == 404
+    assert get(f"{server}/nothing")[0] == 404
+
+@pytest.mark.parametrize('limit', ['0', '-1', 'ten'])
+def test_limit_must_be_a_positive_integer(server, model, limit):
+    card = quote(model.cards[0])
+    for path in ('labels', f"cards/{card}/neighbors", "labels/Finances/cards"):
+        status, body = get(f"{server}/{path}?limit={limit}")
+        assert status == 400
+        assert body['error'].startswith("limit must be a positive integer")
+
+@pytest.mark.parametrize('limit', [0, -1, 2.0, True, '3'])
+def test_check_limit_rejects_non_positive_integers(limit):
+    with pytest.raises(ValueError):
+        check_limit(limit)
+
+def test_positive_int():
+    assert positive_int('12') == check_limit(12) == 12
+    for text in ('0', '-1', 'ten', ''):
+        with pytest.raises(ValueError):
+            positive_int(text)
+
+@pytest.mark.parametrize('limit', ['0', '-1', 'ten'])
+def test_cli_rejects_bad_limits(limit, capsys):
+    with pytest.raises(SystemExit):
+        parse_args(['--neighbors', 'Bill Payment Suite', '--limit', limit])
+    assert "--limit" in capsys.readouterr().err
+
+@pytest.mark.parametrize('limit', [0, -1])
+def test_queries_reject_bad_limits(store, model, limit):
+    for query, name in ((store.labels, None), (store.top_neighbors, model.cards[0]),
+                        (store.cards_for_label, 'Finances')):
+        with pytest.raises(ValueError):
+            query(limit) if name is None else query(name, limit)
+
+def test_labels_without_limit_lists_every_label(store):
+    labels = store.labels()
+    assert len(labels) == store.connection.execute("SELECT COUNT(*) FROM labels").fetchone()[0]
+    assert store.labels(len(labels) + 10) == labels
+    assert store.labels(2) == labels[:2]
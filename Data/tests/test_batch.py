@@ -0,0 +1,82 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from batch import analyze_card_sort, compare_waves, find_exports, load_waves, name_spellings, run_batch, share
+from card_model import CardSortModel
+from conftest import DATA_DIR, EXPORT_FILE
+from synthetic_survey import write_survey
+
+@pytest.fixture(scope='module')
+def wave_files(tmp_path_factory):
+    """Two synthetic waves and a copy of the real export, named in wave order."""
+    wave_dir = tmp_path_factory.mktemp('waves')
+    files = [
+        write_survey(wave_dir / 'wave1.xlsx', 30, seed=1),
+        write_survey(wave_dir / 'wave2.xlsx', 45, seed=2)
+    ]
+    files.append(Path(shutil.copyfile(EXPORT_FILE, wave_dir / 'wave3.xlsx')))
+    return files
+
+def report_files(output_dir):
+    """Every report under a batch output directory, keyed by relative path."""
+    return {
+        str(path.relative_to(output_dir)): path.read_text(encoding='utf-8')
+        for path in sorted(Path(output_dir).rglob('*')) if path.is_file()
+    }
+
+def test_find_exports_in_name_order(wave_files):
+    assert find_exports(str(wave_files[0].parent / '*.xlsx')) == wave_files
+
+def test_single_wave_reproduces_the_reports(tmp_path):
+    run_batch([EXPORT_FILE], tmp_path)
+    wave_dir = tmp_path / EXPORT_FILE.stem
+    for name in ('Summary.txt', 'Groupings.txt'):
+        assert (wave_dir / name).read_text(encoding='utf-8') == (DATA_DIR / name).read_text(encoding='utf-8')
+        assert (tmp_path / 'merged' / name).read_text(encoding='utf-8') == \
+               (DATA_DIR / name).read_text(encoding='utf-8')
+
+def test_merged_waves_match_one_model(tmp_path, wave_files):
+    result = run_batch(wave_files, tmp_path)
+    waves = result['waves']
+    assert [wave['name'] for wave in waves] == ['wave1', 'wave2', 'wave3']
+    assert len(result['diffs']) == 2
+
+    assert [len(wave['model']) for wave in waves[:2]] == [30, 45]
+
+    model = CardSortModel.concat([wave['model'] for wave in waves])
+    expected = analyze_card_sort(model)
+    assert result['merged']['groupings']['pair_ranks'] == expected['pair_ranks']
+    assert result['merged']['groupings']['group_name_counts'] == expected['group_name_counts']
+    for question_text, merged in result['merged']['summary'].items():
+        assert merged['all_items'] == [item for wave in waves for item in wave['summary'][question_text]['all_items']]
+
+def test_two_workers_write_the_same_reports(tmp_path, wave_files):
+    run_batch(wave_files, tmp_path / 'serial')
+    run_batch(wave_files, tmp_path / 'parallel', workers=2)
+    assert report_files(tmp_path / 'parallel') == report_files(tmp_path / 'serial')
+
+@pytest.mark.parametrize('canonical_names', [True, False])
+def test_workers_return_each_waves_groupings(wave_files, canonical_names):
+    waves = load_waves(wave_files, workers=2, canonical_names=canonical_names)
+    for wave in waves:
+        assert wave['groupings'] == analyze_card_sort(wave['model'], canonical_names)
+
+def test_wave_without_card_sort_is_skipped(tmp_path, wave_files):
+    broken = tmp_path / 'broken.csv'
+    broken.write_text("ResponseId,Q8\nResponse ID,Question\nR_1,Grades\n", encoding='utf-8')
+    waves = load_waves([wave_files[0], broken])
+    assert [wave['name'] for wave in waves] == ['wave1']
+
+def test_wave_compared_with_itself_is_unchanged(wave_files):
+    wave = load_waves(wave_files[:1])[0]
+    diff = compare_waves(wave, wave, name_spellings(wave['groupings']))
+    assert diff['names'] and diff['pairs']
+    assert all(before == after for _, before, after in diff['names'] + diff['pairs'])
+
+def test_share_is_per_100_participants():
+    # A name used twice by some participants can pass 100
+    assert share((1, 12), 10) == '120.0'
+    assert share((3, 1), 8) == '12.5'
+    assert share(None, 8) == share((1, 2), 0) == '-'
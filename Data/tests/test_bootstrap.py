@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from bootstrap import bootstrap_groupings, cluster_match, participant_pair_matrix
+from clustering import membership_matrix
+from cooccurrence import build_cooccurrence, pair_arrays, pair_counts_from_matrix
+
+@pytest.fixture(scope='module')
+def engine(export_participants):
+    return build_cooccurrence(export_participants)
+
+def test_same_seed_same_results(engine, export_participants):
+    first = bootstrap_groupings(engine, len(export_participants), replicates=120, seed=11)
+    assert first == bootstrap_groupings(engine, len(export_participants), replicates=120, seed=11)
+    assert first != bootstrap_groupings(engine, len(export_participants), replicates=120, seed=12)
+
+def test_results_do_not_depend_on_workers(engine, export_participants):
+    serial = bootstrap_groupings(engine, len(export_participants), replicates=60, seed=3, cluster=False)
+    parallel = bootstrap_groupings(engine, len(export_participants), replicates=60, seed=3, cluster=False, workers=2)
+    assert serial == parallel
+
+def test_pairs_are_the_report_top_pairs(engine, export_participants):
+    num_participants = len(export_participants)
+    results = bootstrap_groupings(engine, num_participants, replicates=200, top_pairs=5)
+    top = pair_counts_from_matrix(engine, limit=5)
+    assert [(pair['pair'], pair['count']) for pair in results['pairs']] == list(top.items())
+    for pair in results['pairs']:
+        assert pair['low'] <= pair['count'] <= pair['high']
+        assert pair['rate'] == pair['count'] / num_participants
+    for cluster in results['clustering']['clusters']:
+        # The stability is a mean, so a skewed sample can put it outside the percentile interval
+        assert 0.0 <= cluster['low'] <= cluster['high'] <= 1.0
+        assert 0.0 <= cluster['stability'] <= 1.0
+
+def test_identical_participants_have_no_spread(export_participants):
+    # Every resample of identical participants is the original sample
+    participants = [export_participants[0]] * 12
+    results = bootstrap_groupings(build_cooccurrence(participants), len(participants), replicates=100)
+    for pair in results['pairs']:
+        assert pair['low'] == pair['high'] == pair['count']
+    for cluster in results['clustering']['clusters']:
+        assert cluster['stability'] == cluster['low'] == cluster['high'] == 1.0
+
+def test_participant_pair_matrix_sums_to_the_pair_counts(export_participants):
+    # Repeated cards within a group pair with themselves
+    participants = export_participants + [
+        {'participant_number': 99, 'groups': [{'number': 1, 'name': 'x', 'elements': ['Holds'] * 3}]}
+    ]
+    engine = build_cooccurrence(participants)
+    first_ids, second_ids, counts = pair_arrays(engine)
+    membership = membership_matrix(engine['group_participant'], len(participants))
+    matrix = participant_pair_matrix(engine, membership, first_ids, second_ids)
+    assert matrix.shape == (len(participants), len(counts))
+    assert np.array_equal(np.asarray(matrix.sum(axis=0)).ravel(), counts)
+
+def test_streamed_engine_is_rejected(engine):
+    streamed = {key: value for key, value in engine.items() if key != 'incidence'}
+    with pytest.raises(ValueError):
+        bootstrap_groupings(streamed, 10)
+
+def test_cluster_match():
+    jaccard, stays = cluster_match(np.array([1, 1, 2, 2]), np.array([5, 5, 5, 6]))
+    assert jaccard.tolist() == [2 / 3, 1 / 2]
+    assert stays.tolist() == [True, True, False, True]
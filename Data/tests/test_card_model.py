@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from card_model import UNNAMED_GROUP, CardSortModel
+from card_sort_parser import extract_card_model, extract_participants, get_group_columns
+from cooccurrence import build_cooccurrence
+from groupings_analyzer import analyze_group_names
+
+ARRAYS = ('participant_numbers', 'participant_offsets', 'group_numbers',
+          'group_name_ids', 'group_offsets', 'card_ids')
+
+def assert_same_model(model, expected):
+    assert model.cards == expected.cards
+    assert model.names == expected.names
+    for attribute in ARRAYS:
+        assert np.array_equal(getattr(model, attribute), getattr(expected, attribute)), attribute
+
+@pytest.fixture(params=['export', 'synthetic'])
+def survey_frame(request, export_frame, synthetic_export):
+    if request.param == 'export':
+        return export_frame
+    return pd.read_excel(synthetic_export, header=0)
+
+def test_model_from_blocks_matches_the_participants(survey_frame):
+    columns = get_group_columns()
+    participants = extract_participants(survey_frame, *columns)
+    model = extract_card_model(survey_frame, *columns)
+    assert len(model) == len(participants)
+    assert model.num_groups == sum(len(participant['groups']) for participant in participants)
+    assert model.to_participants() == participants
+    assert_same_model(model, CardSortModel.from_participants(participants))
+
+def test_round_trip_with_repeated_cards():
+    participants = [
+        {'participant_number': 3, 'groups': [
+            {'number': 1, 'name': 'A', 'elements': ['x', 'y', 'x']},
+            {'number': 4, 'name': UNNAMED_GROUP, 'elements': ['z']}
+        ]},
+        {'participant_number': 5, 'groups': [{'number': 2, 'name': 'A', 'elements': ['y']}]}
+    ]
+    assert CardSortModel.from_participants(participants).to_participants() == participants
+
+def test_group_name_counts_match_the_legacy_analysis(export_participants):
+    counts = CardSortModel.from_participants(export_participants).group_name_counts()
+    assert UNNAMED_GROUP not in counts
+    legacy = analyze_group_names(export_participants)
+    assert counts == legacy
+    assert counts.most_common() == legacy.most_common()
+
+def test_concat_matches_one_model(export_participants):
+    shards = [export_participants[:7], [], export_participants[7:15], export_participants[15:]]
+    model = CardSortModel.concat([CardSortModel.from_participants(shard) for shard in shards])
+    assert_same_model(model, CardSortModel.from_participants(export_participants))
+
+def test_concat_of_nothing():
+    assert len(CardSortModel.concat([])) == 0
+    assert CardSortModel.concat([CardSortModel.empty()]).to_participants() == []
+
+def test_cooccurrence_from_the_model(export_participants):
+    from_model = build_cooccurrence(CardSortModel.from_participants(export_participants))
+    from_list = build_cooccurrence(export_participants)
+    assert from_model['elements'] == from_list['elements']
+    assert np.array_equal(from_model['frequency'], from_list['frequency'])
+    assert np.array_equal(from_model['group_participant'], from_list['group_participant'])
+    assert (from_model['cooccurrence'] != from_list['cooccurrence']).nnz == 0
@@ -0,0 +1,68 @@
+import numpy as np
+
+from benchmark import extract_with_iloc, scale_rows
+from card_sort_parser import (
+    KNOWN_CARDS,
+    build_card_tokenizer,
+    extract_participants,
+    get_group_columns,
+    parse_group_cells,
+    parse_group_elements,
+    tokenize_cards
+)
+
+def test_bulk_extraction_matches_the_iloc_path(export_frame):
+    columns = get_group_columns()
+    participants = extract_participants(export_frame, *columns)
+    assert participants
+    assert participants == extract_with_iloc(export_frame, *columns)
+
+def test_bulk_extraction_of_repeated_rows(export_frame):
+    scaled = scale_rows(export_frame, 3)
+    columns = get_group_columns()
+    assert extract_participants(scaled, *columns) == extract_with_iloc(scaled, *columns)
+
+def test_no_rows_after_the_header(export_frame):
+    assert extract_participants(export_frame.iloc[:2], *get_group_columns()) == []
+
+def test_export_cards_are_all_known(export_participants):
+    elements = {element for participant in export_participants
+                for group in participant['groups'] for element in group['elements']}
+    assert elements == set(KNOWN_CARDS)
+
+def test_known_card_with_commas_stays_whole():
+    text = "View Grades,Register, Add, or Drop Classes,Student Profile"
+    assert parse_group_elements(text) == ["View Grades", "Register, Add, or Drop Classes", "Student Profile"]
+
+def test_known_card_at_start_and_end_with_spaces():
+    text = "  Degrees, Majors, Minors, and Certificates Declared , Register, Add, or Drop Classes  "
+    assert parse_group_elements(text) == [
+        "Degrees, Majors, Minors, and Certificates Declared",
+        "Register, Add, or Drop Classes"
+    ]
+
+def test_unknown_text_splits_on_commas():
+    assert parse_group_elements("Alpha, Beta,,Gamma ,") == ["Alpha", "Beta", "Gamma"]
+
+def test_card_prefix_of_longer_text_is_not_matched():
+    # "Register, Add" is not a card, so the cell splits at every comma
+    assert parse_group_elements("Register, Add") == ["Register", "Add"]
+
+def test_longest_card_wins():
+    tokenizer = build_card_tokenizer(["A, B", "A, B, C", "C"])
+    assert tokenize_cards("A, B, C,C,A, B", tokenizer) == ["A, B, C", "C", "A, B"]
+
+def test_empty_vocabulary_splits_on_commas():
+    assert tokenize_cards("x, y", build_card_tokenizer([])) == ["x", "y"]
+
+def test_missing_and_blank_cells():
+    assert parse_group_elements(np.nan) == []
+    assert parse_group_elements('') == []
+    assert parse_group_elements('   ') == []
+
+def test_bulk_parse_matches_cell_by_cell():
+    cells = np.array([
+        ",".join(KNOWN_CARDS[:6]), None, '', 'Other, things', KNOWN_CARDS[20],
+        ' , ', 42, np.nan, f" {KNOWN_CARDS[1]} ,{KNOWN_CARDS[1]}"
+    ], dtype=object)
+    assert parse_group_cells(cells) == [parse_group_elements(cell) for cell in cells]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+from scipy.cluster import hierarchy
+
+from clustering import LINKAGE_METHODS, cluster_cards, similarity_matrix, suggest_cut
+from cooccurrence import build_cooccurrence
+
+def test_similarity_is_share_of_participants(export_participants):
+    engine = build_cooccurrence(export_participants)
+    index = engine['element_index']
+    together = np.zeros((len(index), len(index)))
+    both_sorted = np.zeros((len(index), len(index)))
+    for participant in export_participants:
+        sorted_ids = set()
+        same_group = set()
+        for group in participant['groups']:
+            ids = {index[element] for element in group['elements']}
+            sorted_ids |= ids
+            same_group |= {(i, j) for i in ids for j in ids}
+        for i in sorted_ids:
+            for j in sorted_ids:
+                both_sorted[i, j] += 1
+                together[i, j] += (i, j) in same_group
+    expected = np.divide(together, both_sorted, out=np.zeros_like(together), where=both_sorted > 0)
+    np.fill_diagonal(expected, 1.0)
+    np.testing.assert_allclose(similarity_matrix(engine), expected)
+
+def test_suggest_cut_at_largest_gap():
+    points = np.array([[0.0], [0.1], [5.0], [5.1], [20.0]])
+    tree = hierarchy.linkage(points, method='average')
+    cut_height, num_clusters = suggest_cut(tree)
+    # Merges at 0.1, 0.1, 5 and about 17.5: the cut falls between the last two
+    assert tree[2, 2] < cut_height < tree[3, 2]
+    assert num_clusters == 2
+
+def test_suggest_cut_with_tied_heights_matches_fcluster():
+    # Every pair at the same distance: all merges happen at one height
+    tree = hierarchy.linkage(np.full(6, 0.5), method='average')
+    cut_height, num_clusters = suggest_cut(tree)
+    labels = hierarchy.fcluster(tree, t=cut_height, criterion='distance')
+    assert num_clusters == len(np.unique(labels)) == 1
+
+def test_suggest_cut_of_a_single_merge():
+    tree = hierarchy.linkage(np.array([0.3]), method='average')
+    assert suggest_cut(tree) == (1.0, 1)
+
+@pytest.mark.parametrize('method', LINKAGE_METHODS)
+def test_suggested_cut_is_one_of_the_cuts(export_participants, method):
+    result = cluster_cards(build_cooccurrence(export_participants), method=method)
+    height, num_clusters = result['suggested_cut']
+    labels = dict(result['cuts'])[height]
+    assert len(np.unique(labels)) == num_clusters
+    assert sorted(result['leaf_order']) == list(range(len(result['elements'])))
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        cluster_cards({'elements': []}, method='ward')
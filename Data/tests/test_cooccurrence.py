@@ -0,0 +1,94 @@
+from collections import Counter, defaultdict
+from itertools import combinations
+
+import pytest
+
+from cooccurrence import (
+    build_cooccurrence,
+    count_pairs,
+    element_frequency_from_matrix,
+    element_neighbors,
+    pair_counts_from_matrix
+)
+
+# One participant repeats a card within a group, so the diagonal of the
+# co-occurrence matrix is more than the card's frequency.
+DUPLICATES = [
+    {'groups': [
+        {'name': 'A', 'elements': ['Housing', 'Housing', 'Dining', 'Housing']},
+        {'name': 'B', 'elements': ['Grades', 'Dining']},
+        {'name': 'C', 'elements': ['Parking']}
+    ]},
+    {'groups': [
+        {'name': 'A', 'elements': ['Dining', 'Housing']},
+        {'name': 'B', 'elements': ['Grades', 'Grades', 'Parking']}
+    ]}
+]
+
+def direct_counts(participants_data):
+    """Count pairs, frequencies and relationships group by group."""
+    pairs = Counter()
+    frequency = Counter()
+    relationships = defaultdict(Counter)
+    for participant in participants_data:
+        for group in participant['groups']:
+            elements = group['elements']
+            pairs.update(combinations(sorted(elements), 2))
+            frequency.update(elements)
+            for element in elements:
+                for other in elements:
+                    if element != other:
+                        relationships[element][other] += 1
+    return pairs, frequency, relationships
+
+@pytest.fixture(params=['export', 'duplicates'])
+def participants(request, export_participants):
+    return export_participants if request.param == 'export' else DUPLICATES
+
+def test_pairs_match_direct_count(participants):
+    engine = build_cooccurrence(participants)
+    pairs, _, _ = direct_counts(participants)
+    assert pair_counts_from_matrix(engine) == pairs
+    assert count_pairs(engine) == len(pairs)
+
+def test_pairs_ordered_by_count_then_element_id(participants):
+    engine = build_cooccurrence(participants)
+    index = engine['element_index']
+    keys = [
+        (-count, sorted((index[a], index[b])))
+        for (a, b), count in pair_counts_from_matrix(engine).items()
+    ]
+    assert keys == sorted(keys)
+
+def test_pair_limit_keeps_the_top_pairs(export_participants):
+    engine = build_cooccurrence(export_participants)
+    top = pair_counts_from_matrix(engine, limit=30)
+    assert list(top.items()) == list(pair_counts_from_matrix(engine).items())[:30]
+
+def test_frequencies_match_direct_count(participants):
+    engine = build_cooccurrence(participants)
+    _, frequency, _ = direct_counts(participants)
+    from_matrix = element_frequency_from_matrix(engine)
+    assert from_matrix == frequency
+    assert from_matrix.most_common() == frequency.most_common()
+
+def test_neighbors_match_direct_count(participants):
+    engine = build_cooccurrence(participants)
+    _, frequency, relationships = direct_counts(participants)
+    index = engine['element_index']
+    neighbors = element_neighbors(engine)
+
+    related = [element for element, _ in frequency.most_common() if relationships[element]]
+    assert list(neighbors) == related
+    for element, top in neighbors.items():
+        expected = sorted(relationships[element].items(), key=lambda item: (-item[1], index[item[0]]))
+        assert top == expected[:5]
+
+def test_duplicate_cards_within_a_group():
+    engine = build_cooccurrence(DUPLICATES)
+    pairs = pair_counts_from_matrix(engine)
+    assert pairs[('Housing', 'Housing')] == 3
+    assert pairs[('Dining', 'Housing')] == 4
+    assert pairs[('Grades', 'Grades')] == 1
+    assert element_frequency_from_matrix(engine)['Housing'] == 4
+    assert element_neighbors(engine)['Housing'] == [('Dining', 4)]
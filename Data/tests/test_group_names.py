@@ -0,0 +1,116 @@
+from collections import Counter
+
+import pytest
+
+import group_names
+from group_names import (
+    MAX_CACHED_MAPPINGS,
+    MIN_FUZZY_LENGTH,
+    SIMILARITY_THRESHOLD,
+    KeyIndex,
+    bounded_edit_distance,
+    canonicalize_group_names,
+    is_placeholder,
+    labels_digest,
+    load_name_cache,
+    normalize_label
+)
+from groupings_analyzer import analyze_group_names
+
+def edit_distance(a, b):
+    """Plain Levenshtein distance, for checking the banded version."""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+@pytest.mark.parametrize('name', ['none', 'N/A', 'idk', '12', 'Group', '.', 'x', '  '])
+def test_placeholders(name):
+    assert is_placeholder(normalize_label(name))
+
+@pytest.mark.parametrize('name', ['Grades', 'Group 1', 'Finances'])
+def test_real_names(name):
+    assert not is_placeholder(normalize_label(name))
+
+@pytest.mark.parametrize('name', ['Finance', 'Finances', 'Financial', 'Financial Info.', 'FINANCES!'])
+def test_spelling_variants_share_a_key(name):
+    assert normalize_label(name) == normalize_label('Finance')
+
+def test_spellings_merge_into_the_most_common():
+    counts = Counter({'Finances': 5, 'Financial Info': 3, 'Finaces': 1, 'Housing': 2, 'none': 4})
+    result = canonicalize_group_names(counts, cache_file=None)
+    assert result['group_name_counts'] == Counter({'Finances': 9, 'Housing': 2})
+    assert sorted(result['variants']['Finances']) == ['Finaces', 'Financial Info']
+    assert result['placeholders'] == Counter({'none': 4})
+
+def test_export_counts_are_only_regrouped(export_participants):
+    counts = analyze_group_names(export_participants)
+    result = canonicalize_group_names(counts, cache_file=None)
+    merged = sum(result['group_name_counts'].values()) + sum(result['placeholders'].values())
+    assert merged == sum(counts.values())
+    spellings = [name for display, others in result['variants'].items() for name in [display] + others]
+    assert sorted(spellings + list(result['placeholders'])) == sorted(counts)
+
+def test_index_finds_the_brute_force_match(export_participants):
+    keys = sorted({normalize_label(name) for name in analyze_group_names(export_participants)})
+    keys = [key for key in keys if not is_placeholder(key)]
+    index = KeyIndex()
+    for key in keys:
+        index.add(key, key)
+    for key in keys:
+        probe = key + 'q'
+        expected = None
+        if len(probe) >= MIN_FUZZY_LENGTH:
+            scores = [
+                (1.0 - edit_distance(probe, other) / max(len(probe), len(other)), other)
+                for other in keys if len(other) >= MIN_FUZZY_LENGTH
+            ]
+            scores = [(score, other) for score, other in scores if score >= SIMILARITY_THRESHOLD]
+            if scores:
+                best_score = max(score for score, _ in scores)
+                expected = min(other for score, other in scores if score == best_score)
+        assert index.best_match(probe) == expected, probe
+
+@pytest.mark.parametrize('a, b', [('financ', 'finac'), ('kitten', 'sitting'), ('', 'abc'), ('regist', 'regrist')])
+@pytest.mark.parametrize('limit', [0, 1, 2, 3])
+def test_bounded_edit_distance(a, b, limit):
+    distance = edit_distance(a, b)
+    assert bounded_edit_distance(a, b, limit) == (distance if distance <= limit else limit + 1)
+
+def test_merges_do_not_depend_on_earlier_runs(tmp_path):
+    cache_file = tmp_path / 'group_names.json'
+    counts = Counter({'Finaces': 3, 'Housing': 2})
+    # An earlier run with other spellings fills the shared cache first
+    canonicalize_group_names(Counter({'Finances': 5, 'Financial Info': 3, 'Housng': 1}), cache_file=cache_file)
+    cached = canonicalize_group_names(counts, cache_file=cache_file)
+    assert cached == canonicalize_group_names(counts, cache_file=None)
+    assert cached['group_name_counts'] == counts
+
+def test_cached_mapping_is_reused_for_the_same_labels(tmp_path, monkeypatch, export_participants):
+    cache_file = tmp_path / 'group_names.json'
+    counts = analyze_group_names(export_participants)
+    first = canonicalize_group_names(counts, cache_file=cache_file)
+    assert list(load_name_cache(cache_file)) == [labels_digest([label for label, _ in counts.most_common()])]
+
+    matched = []
+    map_labels = group_names.map_labels
+    monkeypatch.setattr(group_names, 'map_labels', lambda labels: matched.append(labels) or map_labels(labels))
+    assert canonicalize_group_names(counts, cache_file=cache_file) == first
+    assert not matched
+    # Another label order can merge differently, so it is matched again
+    canonicalize_group_names(Counter({'Finaces': 3, 'Finances': 2}), cache_file=cache_file)
+    canonicalize_group_names(Counter({'Finances': 3, 'Finaces': 2}), cache_file=cache_file)
+    assert matched == [['Finaces', 'Finances'], ['Finances', 'Finaces']]
+
+def test_name_cache_keeps_the_newest_mappings(tmp_path):
+    cache_file = tmp_path / 'group_names.json'
+    runs = [Counter({f"Name {i}": 1}) for i in range(MAX_CACHED_MAPPINGS + 2)]
+    for counts in runs:
+        canonicalize_group_names(counts, cache_file=cache_file)
+    # Using the oldest kept mapping again moves it to the end
+    canonicalize_group_names(runs[2], cache_file=cache_file)
+    expected = [labels_digest(list(counts)) for counts in runs[3:] + runs[2:3]]
+    assert list(load_name_cache(cache_file)) == expected
@@ -0,0 +1,83 @@
+import numpy as np
+
+import incremental
+import pipeline
+from conftest import EXPORT_FILE
+from cooccurrence import build_cooccurrence
+from groupings_analyzer import analyze_group_names
+from incremental import (
+    empty_state,
+    load_state,
+    merge_groupings,
+    save_state,
+    state_engine,
+    summary_results,
+    update_state
+)
+
+def dense_by_name(engine):
+    """Co-occurrence counts and frequencies keyed by element name, independent of ID order."""
+    matrix = engine['cooccurrence'].toarray()
+    elements = engine['elements']
+    pairs = {(elements[i], elements[j]): int(matrix[i, j]) for i, j in zip(*np.nonzero(matrix))}
+    frequency = {element: int(count) for element, count in zip(elements, engine['frequency'])}
+    return pairs, frequency
+
+def test_partial_then_full_export_matches_one_pass(tmp_path, export_frame):
+    state = empty_state()
+    assert update_state(state, export_frame.iloc[:20]) == 20
+    # Round trip through the state file, as separate runs would
+    save_state(state, tmp_path / 'state.json')
+    state = load_state(tmp_path / 'state.json')
+    assert update_state(state, export_frame) == len(export_frame) - 20
+    assert update_state(state, export_frame) == 0
+
+    full = empty_state()
+    update_state(full, export_frame)
+    assert state['seen_ids'] == full['seen_ids']
+    assert state['num_participants'] == full['num_participants']
+    assert state['group_name_counts'] == full['group_name_counts']
+    assert state['elements'] == full['elements']
+    assert state['frequency'] == full['frequency']
+    assert summary_results(state) == summary_results(full)
+    assert dense_by_name(state_engine(state)) == dense_by_name(state_engine(full))
+
+def test_merged_batches_match_the_engine(export_participants):
+    state = empty_state()
+    for start in range(0, len(export_participants), 7):
+        merge_groupings(state, export_participants[start:start + 7])
+
+    assert state['num_participants'] == len(export_participants)
+    assert state['group_name_counts'] == dict(analyze_group_names(export_participants))
+    assert dense_by_name(state_engine(state)) == dense_by_name(build_cooccurrence(export_participants))
+
+def test_new_cards_are_appended():
+    state = empty_state()
+    merge_groupings(state, [{'participant_number': 2, 'groups': [
+        {'number': 1, 'name': 'A', 'elements': ['a', 'b']},
+        {'number': 2, 'name': 'B', 'elements': ['c']}
+    ]}])
+    stored = list(state['elements'])
+    merge_groupings(state, [{'participant_number': 3, 'groups': [
+        {'number': 1, 'name': 'A', 'elements': ['c', 'd', 'a']}
+    ]}])
+    # Stored IDs keep their positions; only the unseen card is added
+    assert state['elements'] == stored + ['d']
+
+def test_empty_batch_only_counts_participants():
+    state = empty_state()
+    merge_groupings(state, [{'participant_number': 2, 'groups': []}])
+    assert state['num_participants'] == 1
+    assert state['elements'] == [] and state['cooccurrence'] == []
+
+def test_reset_run_writes_the_pipeline_reports(tmp_path, monkeypatch):
+    for module, prefix in ((incremental, 'incremental'), (pipeline, 'pipeline')):
+        monkeypatch.setattr(module, 'SUMMARY_FILE', tmp_path / f"{prefix}_Summary.txt")
+        monkeypatch.setattr(module, 'GROUPINGS_FILE', tmp_path / f"{prefix}_Groupings.txt")
+    monkeypatch.setattr(pipeline, 'CARD_SORT_FILE', tmp_path / "CardSort.txt")
+
+    incremental.run_incremental(EXPORT_FILE, tmp_path / 'state.json', reset=True)
+    pipeline.run_pipeline(['summary', 'groupings'], EXPORT_FILE)
+    for name in ('Summary.txt', 'Groupings.txt'):
+        expected = (tmp_path / f"pipeline_{name}").read_text(encoding='utf-8')
+        assert (tmp_path / f"incremental_{name}").read_text(encoding='utf-8') == expected, name
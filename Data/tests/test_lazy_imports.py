@@ -0,0 +1,71 @@
+import json
+import subprocess
+import sys
+
+import pytest
+
+from analytics_store import build_store
+from card_sort_parser import extract_card_model, get_group_columns
+from conftest import DATA_DIR, EXPORT_FILE
+from lazy_imports import LazyModule, lazy_module
+from workbook_cache import workbook_key
+
+HEAVY_MODULES = ('pandas', 'numpy', 'scipy', 'openpyxl')
+
+# Runs a script as __main__ and then prints which heavy modules it imported
+RUN_SCRIPT = """
+import json, runpy, sys
+script, *args = sys.argv[1:]
+sys.argv = [script] + args
+try:
+    runpy.run_path(script, run_name='__main__')
+except SystemExit:
+    pass
+print(json.dumps(sorted(name for name in {modules!r} if name in sys.modules)))
+"""
+
+def run_script(script, *args):
+    """
+    Run a Data script in a fresh interpreter.
+    Returns tuple of (output lines, heavy modules it imported).
+    """
+    completed = subprocess.run(
+        [sys.executable, '-c', RUN_SCRIPT.format(modules=HEAVY_MODULES), str(DATA_DIR / script), *map(str, args)],
+        cwd=DATA_DIR, capture_output=True, text=True, check=True
+    )
+    *output, imported = completed.stdout.strip().splitlines()
+    return output, json.loads(imported)
+
+@pytest.fixture(scope='module')
+def store_file(tmp_path_factory, export_frame):
+    store_file = tmp_path_factory.mktemp('store') / 'analytics.sqlite'
+    model = extract_card_model(export_frame, *get_group_columns())
+    build_store(model, store_file, workbook_key(EXPORT_FILE))
+    return store_file
+
+def test_neighbors_query_imports_no_heavy_library(store_file):
+    output, imported = run_script('analytics_store.py', '--store-file', store_file, '--neighbors', 'Bill Payment Suite')
+    assert output[0] == "Cards most often grouped with Bill Payment Suite:"
+    assert len(output) == 1 + 5
+    assert imported == []
+
+def test_up_to_date_check_imports_no_heavy_library(store_file):
+    output, imported = run_script('analytics_store.py', '--store-file', store_file, '--excel-file', EXPORT_FILE)
+    assert output == [f"Analytics store is up to date: {store_file}"]
+    assert imported == []
+
+@pytest.mark.parametrize('script', ['main.py', 'card_sort_parser.py', 'groupings_analyzer.py',
+                                    'pipeline.py', 'incremental.py', 'batch.py', 'analytics_store.py'])
+def test_help_imports_no_heavy_library(script):
+    output, imported = run_script(script, '--help')
+    assert output[0].startswith('usage:')
+    assert imported == []
+
+def test_lazy_module_imports_on_first_use():
+    module = lazy_module('this_module_does_not_exist_yet')
+    assert isinstance(module, LazyModule)
+    with pytest.raises(ModuleNotFoundError):
+        module.anything
+
+def test_lazy_module_of_an_imported_module():
+    assert lazy_module('json') is json
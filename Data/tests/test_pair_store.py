@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+
+import groupings_analyzer
+from card_sort_parser import get_group_columns
+from conftest import EXPORT_FILE
+from cooccurrence import build_cooccurrence
+from pair_store import (
+    MemmapCooccurrence, load_pair_store, pair_store_paths, stream_groupings_to_store,
+    triangle_index, triangle_pairs, triangle_size
+)
+from survey_stream import iter_participants
+
+def test_triangle_index_packs_the_upper_triangle():
+    rows, columns = np.triu_indices(6)
+    indices = triangle_index(rows, columns)
+    assert sorted(indices.tolist()) == list(range(triangle_size(6)))
+    assert np.array_equal(indices, triangle_index(columns, rows))
+
+def test_triangle_pairs_inverts_triangle_index():
+    # Large columns, where the float square root can land one column off
+    columns = np.array([0, 1, 2, 1000, 94906265, 3037000498], dtype=np.int64)
+    rows = np.array([0, 0, 2, 999, 0, 3037000498], dtype=np.int64)
+    first, second = triangle_pairs(triangle_index(rows, columns))
+    assert first.tolist() == rows.tolist()
+    assert second.tolist() == columns.tolist()
+
+def dense(engine):
+    """Full co-occurrence matrix keyed by element names."""
+    matrix = engine['cooccurrence'].toarray()
+    elements = engine['elements']
+    return {(elements[i], elements[j]): int(matrix[i, j]) for i, j in zip(*np.nonzero(matrix))}
+
+@pytest.fixture(params=['export', 'synthetic'])
+def participants(request, export_participants, synthetic_export):
+    if request.param == 'export':
+        return export_participants
+    return list(iter_participants(synthetic_export, *get_group_columns()))
+
+def test_memmap_counts_match_the_sparse_engine(participants, tmp_path):
+    # A small starting capacity makes the triangle file grow while counting
+    accumulator = MemmapCooccurrence(tmp_path / 'sort.pairs.bin', capacity=2)
+    for participant in participants:
+        accumulator.add_participant(participant)
+    engine, expected = accumulator.to_engine(), build_cooccurrence(participants)
+    assert dense(engine) == dense(expected)
+    assert engine['elements'] == expected['elements']
+    assert engine['frequency'].tolist() == expected['frequency'].tolist()
+
+def test_memmap_counts_repeated_cards_like_the_engine(tmp_path):
+    participants = [{'groups': [
+        {'name': 'Money', 'elements': ['Financial Aid', 'Financial Aid', 'Bill Payment Suite']},
+        {'name': 'Other', 'elements': ['Bill Payment Suite', 'Parking']}
+    ]}]
+    accumulator = MemmapCooccurrence(tmp_path / 'sort.pairs.bin')
+    accumulator.add_participant(participants[0])
+    engine, expected = accumulator.to_engine(), build_cooccurrence(participants)
+    assert dense(engine) == dense(expected)
+    assert engine['frequency'].tolist() == expected['frequency'].tolist()
+
+def test_saved_store_reopens_for_its_key_only(export_participants, tmp_path):
+    counts_path, meta_path = tmp_path / 'sort.pairs.bin', tmp_path / 'sort.pairs.json'
+    accumulator = MemmapCooccurrence(counts_path)
+    for participant in export_participants:
+        accumulator.add_participant(participant)
+    accumulator.save(meta_path, {'workbook': 'a'}, len(export_participants), {'Money': 3})
+
+    num_participants, group_name_counts, engine = load_pair_store(counts_path, meta_path, {'workbook': 'a'})
+    assert num_participants == len(export_participants)
+    assert group_name_counts == {'Money': 3}
+    assert dense(engine) == dense(build_cooccurrence(export_participants))
+    assert load_pair_store(counts_path, meta_path, {'workbook': 'b'}) is None
+
+def test_streamed_store_is_reused_until_refreshed(export_participants, tmp_path, capsys):
+    columns = get_group_columns()
+    first = stream_groupings_to_store(EXPORT_FILE, *columns, store_dir=tmp_path)
+    assert "Counting pairs into" in capsys.readouterr().out
+    second = stream_groupings_to_store(EXPORT_FILE, *columns, store_dir=tmp_path)
+    assert "Using stored pair counts" in capsys.readouterr().out
+    stream_groupings_to_store(EXPORT_FILE, *columns, store_dir=tmp_path, refresh=True)
+    assert "Counting pairs into" in capsys.readouterr().out
+
+    assert first[0] == second[0] == len(export_participants)
+    assert first[1] == second[1]
+    assert dense(first[2]) == dense(second[2]) == dense(build_cooccurrence(export_participants))
+    assert all(path.exists() for path in pair_store_paths(EXPORT_FILE, tmp_path))
+
+def test_pair_store_report_matches_in_memory(tmp_path, monkeypatch):
+    monkeypatch.setattr(groupings_analyzer, 'EXCEL_FILE', EXPORT_FILE)
+    reports = []
+    for argv in ([], ['--pair-store', str(tmp_path)], ['--pair-store', str(tmp_path)]):
+        output_file = tmp_path / f"report{len(reports)}.txt"
+        monkeypatch.setattr(groupings_analyzer, 'OUTPUT_FILE', output_file)
+        groupings_analyzer.main(argv)
+        reports.append(output_file.read_text(encoding='utf-8'))
+    assert reports[0]
+    assert reports[1] == reports[0]
+    assert reports[2] == reports[0]
@@ -0,0 +1,33 @@
+import pytest
+
+from benchmark import scale_rows
+from card_sort_parser import extract_card_model, get_group_columns
+from main import COLUMNS_TO_ANALYZE, analyze_columns
+from parallel import analyze_columns_parallel, extract_card_model_parallel, shard_bounds
+
+@pytest.mark.parametrize('num_items, workers', [(0, 2), (1, 4), (10, 2), (1003, 3)])
+def test_shards_cover_the_range_in_order(num_items, workers):
+    bounds = shard_bounds(num_items, workers)
+    assert bounds[0][0] == 0 and bounds[-1][1] == num_items
+    assert all(stop == start for (_, stop), (start, _) in zip(bounds, bounds[1:]))
+
+@pytest.mark.parametrize('copies', [1, 3])
+def test_two_workers_match_the_serial_summary(export_frame, copies):
+    df = scale_rows(export_frame, copies)
+    serial = analyze_columns(df, COLUMNS_TO_ANALYZE)
+    parallel = analyze_columns_parallel(df, COLUMNS_TO_ANALYZE, 2)
+    assert list(parallel) == list(serial)
+    for question, result in serial.items():
+        # Item order and top-10 tie order must survive the shard merge
+        assert parallel[question]['all_items'] == result['all_items']
+        assert parallel[question]['top_10'] == result['top_10']
+    assert parallel == serial
+
+@pytest.mark.parametrize('copies', [1, 3])
+def test_two_workers_match_the_serial_model(export_frame, copies):
+    df = scale_rows(export_frame, copies)
+    columns = get_group_columns()
+    parallel = extract_card_model_parallel(df, *columns, 2)
+    serial = extract_card_model(df, *columns)
+    assert parallel.cards == serial.cards
+    assert parallel.to_participants() == serial.to_participants()
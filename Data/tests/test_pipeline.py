@@ -0,0 +1,30 @@
+import card_sort_parser
+import groupings_analyzer
+import main as summary
+import pipeline
+from conftest import EXPORT_FILE
+
+SCRIPTS = {
+    'SUMMARY_FILE': summary,
+    'CARD_SORT_FILE': card_sort_parser,
+    'GROUPINGS_FILE': groupings_analyzer
+}
+
+def test_pipeline_reports_match_the_scripts(tmp_path, monkeypatch):
+    for name, script in SCRIPTS.items():
+        monkeypatch.setattr(pipeline, name, tmp_path / f"pipeline_{name}.txt")
+        monkeypatch.setattr(script, 'EXCEL_FILE', EXPORT_FILE)
+        monkeypatch.setattr(script, 'OUTPUT_FILE', tmp_path / f"script_{name}.txt")
+
+    outputs = pipeline.run_pipeline(['summary', 'cardsort', 'groupings'], EXPORT_FILE)
+    assert set(outputs) == {'summary', 'cardsort', 'groupings'}
+    for name, script in SCRIPTS.items():
+        script.main([])
+        expected = (tmp_path / f"script_{name}.txt").read_text(encoding='utf-8')
+        assert (tmp_path / f"pipeline_{name}.txt").read_text(encoding='utf-8') == expected, name
+
+def test_stages_run_in_order_and_only_when_selected(tmp_path, monkeypatch, export_participants):
+    monkeypatch.setattr(pipeline, 'CARD_SORT_FILE', tmp_path / "CardSort.txt")
+    outputs = pipeline.run_pipeline(['cardsort'], EXPORT_FILE)
+    assert list(outputs) == ['cardsort']
+    assert outputs['cardsort'].to_participants() == export_participants
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import main as summary
+import profiling
+from conftest import EXPORT_FILE
+from profiling import add_counts, profile_session, profiled, resolve_profile_files
+from survey_schema import column_index, schema_from_frame
+
+@pytest.fixture(autouse=True)
+def no_profile_environment(monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_ENV, raising=False)
+    monkeypatch.delenv(profiling.CPROFILE_ENV, raising=False)
+
+@profiled
+def outer(values):
+    add_counts(values=len(values))
+    return [inner(value) for value in values]
+
+@profiled(memory=False)
+def inner(value):
+    add_counts(items=1)
+    return value * 2
+
+def test_nested_stages_and_counters(tmp_path):
+    trace_file = tmp_path / 'trace.json'
+    with profile_session(trace_file, command='test') as session:
+        assert session is not None
+        outer([1, 2, 3])
+        outer([4])
+
+    trace = json.loads(trace_file.read_text(encoding='utf-8'))
+    assert trace['command'] == 'test'
+    stages = {record['stage']: record for record in trace['stages']}
+    assert list(stages) == ['run', 'run/outer', 'run/outer/inner']
+    assert stages['run/outer']['calls'] == 2
+    assert stages['run/outer']['counters'] == {'values': 4}
+    assert stages['run/outer']['peak_bytes'] is not None
+    inner_record = stages['run/outer/inner']
+    assert (inner_record['calls'], inner_record['depth']) == (4, 2)
+    assert inner_record['counters'] == {'items': 4}
+    # Per-row stages are timed without memory tracing
+    assert inner_record['peak_bytes'] is None
+
+def test_profiling_off_is_a_pass_through(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with profile_session() as session:
+        assert session is None
+        assert outer([1, 2]) == [2, 4]
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.parametrize('value, expected', [
+    ('', None), ('0', None), ('off', None), ('1', profiling.TRACE_FILE), ('trace.json', 'trace.json')
+])
+def test_profile_environment_variable(monkeypatch, value, expected):
+    monkeypatch.setenv(profiling.PROFILE_ENV, value)
+    trace_file, _ = resolve_profile_files()
+    assert trace_file == (None if expected is None else profiling.Path(expected))
+
+def test_cprofile_implies_a_trace(tmp_path):
+    assert resolve_profile_files(None, tmp_path / 'run.prof') == (profiling.TRACE_FILE, tmp_path / 'run.prof')
+
+def test_summary_script_trace(tmp_path, monkeypatch, export_frame):
+    monkeypatch.setattr(summary, 'EXCEL_FILE', EXPORT_FILE)
+    monkeypatch.setattr(summary, 'OUTPUT_FILE', tmp_path / 'Summary.txt')
+    trace_file = tmp_path / 'trace.json'
+    summary.main(['--profile', str(trace_file), '--cprofile', str(tmp_path / 'run.prof')])
+
+    trace = json.loads(trace_file.read_text(encoding='utf-8'))
+    assert (tmp_path / 'run.prof').exists()
+    stages = {record['stage']: record for record in trace['stages']}
+    # Only the free-text columns are loaded, from the cache or the workbook
+    counters = stages['run/read_survey']['counters']
+    assert counters['rows'] == len(export_frame)
+    assert counters['columns'] == len(summary.COLUMNS_TO_ANALYZE)
+    assert counters.get('cache_hits', 0) + counters.get('cache_misses', 0) == 1
+    schema = schema_from_frame(export_frame)
+    columns = [column_index(schema, column) for column, _ in summary.COLUMNS_TO_ANALYZE]
+    responses = int(export_frame.iloc[:, columns].notna().sum().sum())
+    assert stages['run/analyze_columns']['calls'] == 1
+    assert stages['run/analyze_columns']['counters']['responses'] == responses
+    assert stages['run/write_summary']['calls'] == 1
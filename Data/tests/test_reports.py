@@ -0,0 +1,63 @@
+import csv
+import json
+
+import pandas as pd
+import pytest
+
+from card_sort_parser import card_sort_tables, extract_card_model, get_group_columns
+from cooccurrence import build_cooccurrence
+from groupings_analyzer import analyze_group_names, analyze_groupings, groupings_tables
+from main import COLUMNS_TO_ANALYZE, analyze_columns, summary_tables
+from reports import write_tables, write_text
+
+@pytest.fixture(scope='module')
+def tables(export_frame):
+    model = extract_card_model(export_frame, *get_group_columns())
+    groupings = analyze_groupings(analyze_group_names(model), build_cooccurrence(model), name_cache=None)
+    return {
+        **summary_tables(analyze_columns(export_frame, COLUMNS_TO_ANALYZE)),
+        **groupings_tables(groupings),
+        **card_sort_tables(model)
+    }
+
+def as_text(value):
+    """How csv.writer writes a cell."""
+    return '' if value is None else str(value)
+
+def test_tables_have_rows_in_their_columns(tables):
+    assert set(tables) >= {'summary_items', 'groupings_names', 'groupings_pairs',
+                           'groupings_elements', 'groupings_relationships'}
+    for name, (columns, rows) in tables.items():
+        assert rows, name
+        assert all(list(row) == columns for row in rows), name
+
+def test_jsonl_round_trip(tmp_path, tables):
+    write_tables(tables, ['jsonl'], tmp_path)
+    for name, (_, rows) in tables.items():
+        lines = (tmp_path / f"{name}.jsonl").read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line) for line in lines] == rows, name
+
+def test_csv_round_trip(tmp_path, tables):
+    write_tables(tables, ['csv'], tmp_path, prefix='wave_')
+    for name, (columns, rows) in tables.items():
+        with open(tmp_path / f"wave_{name}.csv", encoding='utf-8', newline='') as f:
+            read_back = list(csv.DictReader(f))
+        assert read_back == [{column: as_text(row[column]) for column in columns} for row in rows], name
+
+def test_parquet_round_trip(tmp_path, tables):
+    pytest.importorskip('pyarrow')
+    write_tables(tables, ['parquet'], tmp_path)
+    for name, (columns, rows) in tables.items():
+        df = pd.read_parquet(tmp_path / f"{name}.parquet")
+        assert list(df.columns) == columns
+        assert df.astype(object).where(df.notna(), None).to_dict('records') == rows, name
+
+def test_text_is_not_a_table_format(tmp_path, tables):
+    assert write_tables(tables, ['text'], tmp_path) == []
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.parametrize('num_lines', [0, 1, 4096, 4097, 10000])
+def test_chunked_text_writes_every_line(tmp_path, num_lines):
+    lines = [f"line {number}\n" for number in range(num_lines)]
+    assert write_text(iter(lines), tmp_path / 'out.txt') == num_lines
+    assert (tmp_path / 'out.txt').read_text(encoding='utf-8') == ''.join(lines)
@@ -0,0 +1,65 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from main import COLUMNS_TO_ANALYZE, analyze_columns, count_items, parse_response_series, parse_responses
+from survey_schema import column_index, schema_from_frame
+
+EDGE_CASES = [
+    "Grades, and Housing",
+    "and Parking & ",
+    "& Dining and",
+    "Registration and\nAdvising & Holds",
+    "AND Transcripts;; and",
+    "a, b, ok, x,y",
+    "\n\n  Grades  \n\nHousing\n",
+    "   ",
+    "",
+    "Brandy and Sand",
+    "and",
+    "& &",
+    "Tuition;Billing,\r\nFinancial aid",
+    42,
+    3.5,
+    True,
+    None,
+    np.nan,
+    "Grades, Grades,grades"
+]
+
+def parse_one_by_one(responses):
+    """The per-response path: parse_responses over every non-missing response."""
+    return [item for response in responses.dropna() for item in parse_responses(response)]
+
+def test_series_parse_matches_parse_responses():
+    responses = pd.Series(EDGE_CASES, dtype=object)
+    assert parse_response_series(responses).tolist() == parse_one_by_one(responses)
+
+@pytest.mark.parametrize('response', [case for case in EDGE_CASES if not pd.isna(case)])
+def test_each_edge_case(response):
+    assert parse_response_series(pd.Series([response], dtype=object)).tolist() == parse_responses(response)
+
+def test_series_keeps_the_response_index():
+    responses = pd.Series(["Grades, Housing", None, "x", "Parking"], index=[10, 11, 12, 13], dtype=object)
+    assert parse_response_series(responses).index.tolist() == [10, 10, 13]
+
+def test_count_items_ties_match_most_common():
+    items = ['b', 'a', 'c', 'a', 'b', 'd', 'c', 'e', 'd', 'b']
+    assert count_items(pd.Series(items, dtype=object)) == Counter(items).most_common()
+    assert count_items(pd.Series(items, dtype=object), 3) == Counter(items).most_common(3)
+    assert count_items(pd.Series([], dtype=object)) == []
+
+def test_export_columns_match_the_per_response_parse(export_frame):
+    results = analyze_columns(export_frame, COLUMNS_TO_ANALYZE)
+    schema = schema_from_frame(export_frame)
+    for column, question_text in COLUMNS_TO_ANALYZE:
+        expected = parse_one_by_one(export_frame.iloc[:, column_index(schema, column)])
+        assert results[question_text]['all_items'] == expected
+        assert results[question_text]['top_10'] == Counter(expected).most_common(10)
+
+def test_missing_column_gives_empty_results(export_frame):
+    results = analyze_columns(export_frame.iloc[:, :20], [('T', 'q1'), ('AA', 'q2')])
+    assert results['q2'] == {'all_items': [], 'top_10': [], 'column': 'AA'}
+    assert results['q1']['all_items']
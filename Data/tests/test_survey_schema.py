@@ -0,0 +1,93 @@
+import pandas as pd
+import pytest
+
+from card_sort_parser import extract_participants, get_group_columns
+from main import COLUMNS_TO_ANALYZE, analyze_columns
+from survey_schema import (
+    SchemaError,
+    card_sort_columns,
+    column_index,
+    column_letter,
+    column_letter_to_index,
+    index_to_column_letter,
+    load_schema,
+    schema_from_frame
+)
+
+def shifted(df, position, name='Extra'):
+    """Insert an empty column at a position, moving everything after it right."""
+    df = df.copy()
+    df.insert(position, name, None)
+    return df
+
+@pytest.mark.parametrize('letters, index', [('A', 0), ('Z', 25), ('AA', 26), ('AL', 37), ('YQ', 666)])
+def test_column_letters(letters, index):
+    assert column_letter_to_index(letters) == index
+    assert index_to_column_letter(index) == letters
+
+def test_column_letter_to_index_is_still_in_card_sort_parser():
+    import card_sort_parser
+    assert card_sort_parser.column_letter_to_index is column_letter_to_index
+
+def test_free_text_questions_are_in_t_w_z(export_frame):
+    schema = schema_from_frame(export_frame)
+    assert [column_letter(schema, column_index(schema, question)) for question in ('Q8', 'Q12', 'Q14')] == \
+           ['T', 'W', 'Z']
+    # Older configurations by letter still resolve to the same columns
+    assert [column_index(schema, letter) for letter in 'TWZ'] == \
+           [column_index(schema, question) for question in ('Q8', 'Q12', 'Q14')]
+
+def test_card_sort_ranges_on_the_real_header(export_frame):
+    schema = schema_from_frame(export_frame)
+    group_start, group_end, name_start, name_end = card_sort_columns(schema)
+    assert group_end - group_start == name_end - name_start == 14
+    assert [index_to_column_letter(index) for index in (group_start, group_end, name_start, name_end)] == \
+           ['AL', 'AZ', 'YC', 'YQ']
+    assert schema['card_sort']['groups_question'] == 'Q30'
+    assert schema['card_sort']['names_question'] == 'Q31'
+    assert export_frame.columns[group_start] == 'Q30_0_GROUP'
+    assert export_frame.columns[name_end] == 'Q31_15'
+
+def test_unequal_ranges_raise(export_frame):
+    schema = schema_from_frame(export_frame.drop(columns=['Q31_15']))
+    with pytest.raises(SchemaError, match='15 group columns but Q31 has 14'):
+        card_sort_columns(schema)
+
+def test_non_contiguous_names_raise(export_frame):
+    columns = [column for column in export_frame.columns if column != 'Q31_5']
+    columns.insert(columns.index('Q31_1'), 'Q31_5')
+    with pytest.raises(SchemaError, match='not contiguous'):
+        card_sort_columns(schema_from_frame(export_frame[columns]))
+
+def test_missing_card_sort_and_columns_raise(export_frame):
+    schema = schema_from_frame(export_frame.iloc[:, :30])
+    with pytest.raises(SchemaError):
+        card_sort_columns(schema)
+    with pytest.raises(SchemaError):
+        column_index(schema, 'Q99')
+
+def test_shifted_export_gives_the_same_results(export_frame, export_participants):
+    schema = schema_from_frame(export_frame)
+    # One extra column before the free text and one before the group names
+    df = shifted(shifted(export_frame, 10), card_sort_columns(schema)[2] + 1, 'Extra2')
+    shifted_schema = schema_from_frame(df)
+    assert card_sort_columns(shifted_schema) == tuple(
+        index + shift for index, shift in zip(card_sort_columns(schema), (1, 1, 2, 2))
+    )
+    assert extract_participants(df, *get_group_columns(shifted_schema)) == export_participants
+
+    results = analyze_columns(df, COLUMNS_TO_ANALYZE)
+    expected = analyze_columns(export_frame, COLUMNS_TO_ANALYZE)
+    assert [result['column'] for result in results.values()] == ['U', 'X', 'AA']
+    for question_text, result in results.items():
+        assert result['all_items'] == expected[question_text]['all_items']
+        assert result['top_10'] == expected[question_text]['top_10']
+
+def test_schema_cache_follows_the_workbook(tmp_path, export_frame):
+    export_file = tmp_path / 'export.xlsx'
+    export_frame.to_excel(export_file, index=False)
+    assert card_sort_columns(load_schema(export_file, cache_dir=tmp_path))[0] == 37
+    assert load_schema(export_file, cache_dir=tmp_path) == load_schema(export_file, cache_dir=tmp_path, refresh=True)
+
+    shifted(export_frame, 10).to_excel(export_file, index=False)
+    assert card_sort_columns(load_schema(export_file, cache_dir=tmp_path))[0] == 38
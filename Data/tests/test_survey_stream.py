@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+import card_sort_parser
+import groupings_analyzer
+import main as summary
+from card_sort_parser import get_group_columns
+from conftest import EXPORT_FILE
+from cooccurrence import build_cooccurrence
+from survey_stream import iter_participants, stream_groupings
+
+@pytest.mark.parametrize('script', [summary, card_sort_parser, groupings_analyzer],
+                         ids=['summary', 'card_sort', 'groupings'])
+def test_streamed_report_matches_in_memory(script, tmp_path, monkeypatch):
+    monkeypatch.setattr(script, 'EXCEL_FILE', EXPORT_FILE)
+    reports = []
+    for argv in ([], ['--stream']):
+        output_file = tmp_path / f"report{len(reports)}.txt"
+        monkeypatch.setattr(script, 'OUTPUT_FILE', output_file)
+        script.main(argv)
+        reports.append(output_file.read_text(encoding='utf-8'))
+    assert reports[0]
+    assert reports[1] == reports[0]
+
+def test_streamed_participants_match_extracted(export_participants):
+    assert list(iter_participants(EXPORT_FILE, *get_group_columns())) == export_participants
+
+def test_streamed_cooccurrence_matches_engine(export_participants):
+    num_participants, _, streamed = stream_groupings(EXPORT_FILE, *get_group_columns())
+    engine = build_cooccurrence(export_participants)
+    assert num_participants == len(export_participants)
+    assert streamed['elements'] == engine['elements']
+    np.testing.assert_array_equal(streamed['frequency'], engine['frequency'])
+    np.testing.assert_array_equal(streamed['cooccurrence'].toarray(), engine['cooccurrence'].toarray())
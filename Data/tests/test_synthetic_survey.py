@@ -0,0 +1,46 @@
+import random
+
+import pandas as pd
+import pytest
+
+from card_sort_parser import KNOWN_CARDS, extract_participants, get_group_columns, parse_group_elements
+from main import COLUMNS_TO_ANALYZE, analyze_columns
+from survey_stream import iter_participants
+from synthetic_survey import card_sort_answer, card_vocabulary, generate_rows, write_survey
+
+@pytest.mark.parametrize('num_cards', [10, len(KNOWN_CARDS), 120])
+def test_vocabulary_size_and_uniqueness(num_cards):
+    cards = card_vocabulary(num_cards)
+    assert len(cards) == len(set(cards)) == num_cards
+    assert cards[:min(num_cards, len(KNOWN_CARDS))] == KNOWN_CARDS[:num_cards]
+
+def test_generated_cells_parse_back_to_their_cards():
+    cards = card_vocabulary(120)
+    group_cells, _ = card_sort_answer(random.Random(3), cards, 8)
+    parsed = [card for cell in group_cells if cell for card in parse_group_elements(cell)]
+    assert sorted(parsed) == sorted(cards)
+
+def test_rows_are_reproducible():
+    first = list(generate_rows(5, num_cards=30, seed=7))
+    assert first == list(generate_rows(5, num_cards=30, seed=7))
+    assert len(first) == 1 + 2 + 5
+
+def test_synthetic_export_has_the_real_layout(synthetic_export, export_frame):
+    df = pd.read_excel(synthetic_export, header=0)
+    assert list(df.columns) == list(export_frame.columns)
+    assert len(df) == 1 + 2 + 60
+
+    participants = extract_participants(df, *get_group_columns())
+    assert len(participants) == 60
+    for participant in participants:
+        cards = [card for group in participant['groups'] for card in group['elements']]
+        assert sorted(cards) == sorted(KNOWN_CARDS)
+
+    results = analyze_columns(df, COLUMNS_TO_ANALYZE)
+    assert all(result['all_items'] for result in results.values())
+
+def test_csv_export_streams_like_the_workbook(tmp_path, synthetic_export):
+    csv_export = write_survey(tmp_path / 'synthetic.csv', 60, seed=1)
+    df = pd.read_excel(synthetic_export, header=0)
+    columns = get_group_columns()
+    assert list(iter_participants(csv_export, *columns)) == extract_participants(df, *columns)
@@ -0,0 +1,81 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from card_sort_parser import get_group_columns
+from conftest import EXPORT_FILE
+from cooccurrence import build_cooccurrence, count_pairs, element_neighbors, pair_counts_from_matrix
+from survey_stream import stream_groupings
+from topk import SpaceSaving, top_items, top_k_indices
+
+@pytest.mark.parametrize('k', [0, 1, 3, 4, 7, 20, None])
+def test_top_k_indices_is_a_prefix_of_the_full_sort(k):
+    counts = np.array([5, 3, 5, 1, 3, 5, 0, 3, 2, 5])
+    tiebreak = np.array([9, 0, 2, 0, 1, 2, 0, 0, 0, 1])
+    full = np.lexsort((tiebreak, -counts))
+    assert top_k_indices(counts, k, tiebreak).tolist() == full[:k].tolist()
+
+def test_ties_fall_back_to_position():
+    assert top_k_indices(np.array([1, 2, 2, 1, 2]), 2).tolist() == [1, 2]
+
+def test_two_tiebreak_arrays():
+    counts = np.array([4, 4, 4, 4])
+    first = np.array([1, 0, 1, 0])
+    second = np.array([0, 5, 3, 2])
+    assert top_k_indices(counts, 3, first, second).tolist() == [3, 1, 0]
+
+@pytest.mark.parametrize('k', [1, 2, 5, None])
+def test_top_items_matches_most_common(k):
+    counts = Counter({'a': 2, 'b': 5, 'c': 2, 'd': 5, 'e': 1})
+    assert top_items(counts, k) == counts.most_common(k)
+
+def test_space_saving_is_exact_under_capacity():
+    sketch = SpaceSaving(10)
+    sketch.update('abracadabra')
+    assert sketch.max_error() == 0
+    assert [(item, count) for item, count, _ in sketch.top()] == Counter('abracadabra').most_common()
+
+def test_space_saving_bounds():
+    rng = random.Random(0)
+    stream = [rng.choice('aaaaaaaabbbbbcccdefghijklmnop') for _ in range(5000)]
+    exact = Counter(stream)
+    sketch = SpaceSaving(6)
+    sketch.update(stream)
+    assert len(sketch) <= 6
+    assert sketch.total == len(stream)
+    for item, count, error in sketch.top():
+        # Counts overestimate by at most their error
+        assert exact[item] <= count <= exact[item] + error
+    # Every item above total / capacity is tracked
+    tracked = {item for item, _, _ in sketch.top()}
+    assert {item for item, count in exact.items() if count > len(stream) / 6} <= tracked
+    assert [item for item, _, _ in sketch.top(2)] == ['a', 'b']
+
+def test_space_saving_capacity():
+    with pytest.raises(ValueError):
+        SpaceSaving(0)
+
+def test_limited_sections_are_prefixes(export_participants):
+    engine = build_cooccurrence(export_participants)
+    full_pairs = list(pair_counts_from_matrix(engine).items())
+    assert list(pair_counts_from_matrix(engine, limit=30).items()) == full_pairs[:30]
+    full_neighbors = element_neighbors(engine, top_n=len(engine['elements']))
+    for element, top in element_neighbors(engine, top_n=5).items():
+        assert top == full_neighbors[element][:5]
+
+def test_pair_sketch_with_room_for_every_pair_is_exact(export_participants):
+    exact = build_cooccurrence(export_participants)
+    _, _, streamed = stream_groupings(EXPORT_FILE, *get_group_columns(), pair_capacity=count_pairs(exact))
+    assert streamed['pair_sketch']['max_error'] == 0
+    assert pair_counts_from_matrix(streamed) == pair_counts_from_matrix(exact)
+
+def test_small_pair_sketch_overestimates_within_its_error(export_participants):
+    exact = pair_counts_from_matrix(build_cooccurrence(export_participants))
+    _, _, streamed = stream_groupings(EXPORT_FILE, *get_group_columns(), pair_capacity=100)
+    error = streamed['pair_sketch']['max_error']
+    approximate = pair_counts_from_matrix(streamed)
+    assert len(approximate) <= 100
+    for pair, count in approximate.items():
+        assert exact[pair] <= count <= exact[pair] + error
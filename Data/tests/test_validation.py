@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import groupings_analyzer
+from card_model import UNNAMED_GROUP, CardSortModel
+from card_sort_parser import KNOWN_CARDS
+from conftest import EXPORT_FILE
+from survey_schema import read_survey_columns
+from validation import (
+    FIRST_DATA_ROW,
+    RESPONSE_ID_COLUMN,
+    STATUS_COLUMN,
+    degenerate_reason,
+    find_duplicates,
+    jaccard,
+    keep_mask,
+    minhash_signatures,
+    select_participants,
+    sort_tokens,
+    validate_responses
+)
+
+CARDS = KNOWN_CARDS[:10]
+
+def participant(number, groups):
+    """One participant dict from a list of (name, elements) groups."""
+    return {
+        'participant_number': number,
+        'groups': [{'number': i, 'name': name, 'elements': elements} for i, (name, elements) in enumerate(groups, 1)]
+    }
+
+@pytest.fixture(scope='module')
+def export_columns():
+    """The export read with the columns validation needs, and its schema."""
+    return read_survey_columns(EXPORT_FILE, card_sort=True, extra=[STATUS_COLUMN, RESPONSE_ID_COLUMN])
+
+def test_sort_tokens_ignore_group_order_and_names():
+    model = CardSortModel.from_participants([
+        participant(2, [('A', CARDS[:4]), ('B', CARDS[4:])]),
+        participant(3, [('Other', CARDS[4:][::-1]), ('Stuff', CARDS[:4])]),
+        participant(4, [('A', CARDS[:5]), ('B', CARDS[5:])])
+    ])
+    assert np.array_equal(sort_tokens(model, 0), sort_tokens(model, 1))
+    assert not np.array_equal(sort_tokens(model, 0), sort_tokens(model, 2))
+
+def test_exact_and_near_duplicates():
+    rng = np.random.default_rng(0)
+    base = np.unique(rng.choice(10 ** 6, 400, replace=False))
+    near = np.unique(np.concatenate([base[10:], rng.choice(10 ** 6, 10) + 10 ** 6]))
+    other = np.unique(rng.choice(10 ** 6, 400, replace=False))
+    assert jaccard(base, near) >= 0.9
+    duplicates = find_duplicates([base, other, base.copy(), near])
+    assert duplicates == {2: ('duplicate', 0), 3: ('near_duplicate', 0)}
+
+def test_minhash_is_seeded():
+    sets = [np.arange(5, dtype=np.int64), np.arange(3, 40, dtype=np.int64)]
+    assert np.array_equal(minhash_signatures(sets), minhash_signatures(sets))
+    assert not np.array_equal(minhash_signatures(sets), minhash_signatures(sets, seed=1))
+
+def test_degenerate_sorts():
+    model = CardSortModel.from_participants([
+        participant(2, [('Everything', CARDS)]),
+        participant(3, [(f"G{i}", [card]) for i, card in enumerate(CARDS)]),
+        participant(4, [('none', CARDS[:5]), ('N/A', CARDS[5:]), (UNNAMED_GROUP, [KNOWN_CARDS[10]])]),
+        participant(5, [('Group', CARDS[:2]), ('Money', CARDS[2:])]),
+        participant(6, [('x', CARDS[:2])])
+    ])
+    reasons = [degenerate_reason(model, position) for position in range(len(model))]
+    assert reasons == ['single_group', 'all_singletons', 'junk_names', None, 'junk_names']
+
+@pytest.mark.parametrize('names', [['.', 'x'], ['idk', '12'], ['Group', 'none']])
+def test_placeholder_names_are_junk(names):
+    model = CardSortModel.from_participants([participant(2, [(names[0], CARDS[:5]), (names[1], CARDS[5:])])])
+    assert degenerate_reason(model, 0) == 'junk_names'
+
+def test_keep_mask_and_selection():
+    validation = {'num_rows': 8, 'flags': [{'row': 3, 'reason': 'duplicate'}, {'row': 6, 'reason': 'preview'}]}
+    keep = keep_mask(validation)
+    assert not keep[:FIRST_DATA_ROW].any()
+    assert keep.tolist() == [False, True, True, False, True, True, False, True]
+    # Participant numbers are 1-based export rows
+    model = CardSortModel.from_participants([
+        participant(number, [('Group', CARDS[:5]), ('Money', CARDS[5:])]) for number in range(2, 8)
+    ])
+    selected = select_participants(model, keep)
+    assert selected.participant_numbers.tolist() == [2, 3, 5, 6]
+    assert select_participants(model, None) is model
+
+def test_export_flags_only_the_previews(export_columns):
+    df, schema = export_columns
+    validation = validate_responses(df, schema)
+    previews = df.index[df[STATUS_COLUMN] == 'Survey Preview'].tolist()
+    assert previews
+    assert validation['num_rows'] == len(df)
+    assert [(flag['row'], flag['reason']) for flag in validation['flags']] == [(row, 'preview') for row in previews]
+
+def test_repeated_export_response_is_a_duplicate(export_columns):
+    df, schema = export_columns
+    # The first real response, repeated after the last row
+    first = df.index[df[STATUS_COLUMN] == 'IP Address'][0]
+    repeated = pd.concat([df, df.loc[[first]]], ignore_index=True)
+    repeated.loc[len(df), RESPONSE_ID_COLUMN] = 'R_repeat'
+    flags = validate_responses(repeated, schema)['flags']
+    assert flags[-1] == {
+        'row': len(df), 'participant_number': len(df) + 1, 'response_id': 'R_repeat',
+        'reason': 'duplicate', 'matches': first + 1
+    }
+    assert [flag['reason'] for flag in flags[:-1]] == ['preview', 'preview']
+
+def test_validated_report_matches_default(tmp_path, monkeypatch):
+    # The export's only flagged rows are the previews the parsers already skip
+    monkeypatch.setattr(groupings_analyzer, 'EXCEL_FILE', EXPORT_FILE)
+    reports = []
+    for argv in ([], ['--validate']):
+        output_file = tmp_path / f"report{len(reports)}.txt"
+        monkeypatch.setattr(groupings_analyzer, 'OUTPUT_FILE', output_file)
+        groupings_analyzer.main(argv)
+        reports.append(output_file.read_text(encoding='utf-8'))
+    assert reports[0]
+    assert reports[1] == reports[0]
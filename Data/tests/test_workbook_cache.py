@@ -0,0 +1,75 @@
+import os
+import shutil
+from datetime import date, datetime, time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import workbook_cache
+from conftest import EXPORT_FILE
+from workbook_cache import cache_paths, load_dataframe, read_survey, save_dataframe, workbook_key
+
+def assert_same_frame(df, expected):
+    """Frames must match in values, dtypes and the Python type of every object cell."""
+    pd.testing.assert_frame_equal(df, expected)
+    for position in range(expected.shape[1]):
+        if expected.dtypes.iloc[position] == object:
+            assert [type(value) for value in df.iloc[:, position]] == \
+                   [type(value) for value in expected.iloc[:, position]], expected.columns[position]
+
+def test_cached_read_matches_read_excel(tmp_path, export_frame, capsys):
+    assert_same_frame(read_survey(EXPORT_FILE, cache_dir=tmp_path), export_frame)
+    assert all(path.exists() for path in cache_paths(EXPORT_FILE, tmp_path))
+    assert_same_frame(read_survey(EXPORT_FILE, cache_dir=tmp_path), export_frame)
+    assert "Using cached workbook" in capsys.readouterr().out
+
+def test_changed_workbook_rebuilds_the_cache(tmp_path, capsys):
+    export_file = tmp_path / EXPORT_FILE.name
+    shutil.copyfile(EXPORT_FILE, export_file)
+    read_survey(export_file, cache_dir=tmp_path)
+    key = workbook_key(export_file)
+    stat = export_file.stat()
+    os.utime(export_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert workbook_key(export_file) != key
+    capsys.readouterr()
+    read_survey(export_file, cache_dir=tmp_path)
+    assert "Workbook changed since last run" in capsys.readouterr().out
+
+def test_refresh_skips_the_cache(tmp_path, capsys):
+    read_survey(EXPORT_FILE, cache_dir=tmp_path)
+    capsys.readouterr()
+    read_survey(EXPORT_FILE, cache_dir=tmp_path, refresh=True)
+    assert "Using cached workbook" not in capsys.readouterr().out
+
+def test_cache_loads_without_pickle(tmp_path):
+    read_survey(EXPORT_FILE, cache_dir=tmp_path)
+    data_path, _ = cache_paths(EXPORT_FILE, tmp_path)
+    with np.load(data_path, allow_pickle=False) as data:
+        assert all(data[name].dtype != object for name in data.files)
+
+def test_mixed_object_column_round_trips(tmp_path):
+    values = ['text', 'ünïcödé – dash', '', 42, 3.5, 0.1 + 0.2, True, None, np.nan,
+              datetime(2025, 12, 1, 15, 46), date(2025, 12, 1), time(15, 46, 30)]
+    df = pd.DataFrame({'Q1': pd.Series(values, dtype=object), 7: np.arange(len(values))})
+    dtypes = save_dataframe(df, tmp_path / 'mixed.npz')
+    assert_same_frame(load_dataframe(tmp_path / 'mixed.npz', dtypes), df)
+
+def test_unsupported_values_are_not_cached(tmp_path):
+    df = pd.DataFrame({'Q1': pd.Series([{'not': 'text'}], dtype=object)})
+    with pytest.raises(TypeError):
+        save_dataframe(df, tmp_path / 'mixed.npz')
+
+def test_workbook_is_hashed_once_until_it_changes(tmp_path, monkeypatch):
+    export_file = tmp_path / EXPORT_FILE.name
+    shutil.copyfile(EXPORT_FILE, export_file)
+    hashed = []
+    file_sha256 = workbook_cache.file_sha256
+    monkeypatch.setattr(workbook_cache, 'file_sha256', lambda path: hashed.append(path) or file_sha256(path))
+    key = workbook_key(export_file)
+    assert workbook_key(export_file) == key
+    assert len(hashed) == 1
+    stat = export_file.stat()
+    os.utime(export_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert workbook_key(export_file)['sha256'] == key['sha256']
+    assert len(hashed) == 2
@@ -0,0 +1,123 @@
+"""
+Top-K Selection
+Picks the K largest counts without sorting everything: numpy.partition
+for count arrays (pairs, element frequencies, neighbor rows) and heapq for
+Counters. Ties are broken exactly as the full sorts did, so a limited report
+is a prefix of the unlimited one. For streams whose key space is too large
+to count exactly (e.g. card pairs over a huge deck), SpaceSaving keeps
+approximate top-K counts in a fixed number of counters.
+"""
+
+import heapq
+from collections import Counter
+from itertools import count as sequence
+from operator import itemgetter
+
+from lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+# Heap entries allowed per counter before SpaceSaving drops the stale ones
+HEAP_SLACK = 4
+
+def top_k_indices(counts, k=None, *tiebreak):
+    """
+    Find the positions of the k largest counts, largest first. Ties are
+    ordered by the tiebreak arrays (first array first) and then by position,
+    like np.lexsort((*reversed(tiebreak), -counts)) on the whole array.
+    Only the candidates at or above the k-th largest count are sorted.
+    Returns an int array of at most k positions (all of them if k is None).
+    """
+    counts = np.asarray(counts)
+    positions = np.arange(len(counts))
+    if k is not None and k < len(counts):
+        if k <= 0:
+            return positions[:0]
+        kth = np.partition(counts, len(counts) - k)[len(counts) - k]
+        positions = np.flatnonzero(counts >= kth)
+    keys = [positions] + [np.asarray(array)[positions] for array in reversed(tiebreak)] + [-counts[positions]]
+    return positions[np.lexsort(keys)][:k]
+
+def top_items(counts, k=None):
+    """
+    Get the k most common items of a Counter (or any item -> count dict)
+    with heapq, ties in insertion order like Counter.most_common.
+    Returns a list of (item, count) tuples (every item if k is None).
+    """
+    if k is None:
+        return sorted(counts.items(), key=itemgetter(1), reverse=True)
+    return heapq.nlargest(k, counts.items(), key=itemgetter(1))
+
+def top_counter(counts, k=None):
+    """The top_items of counts as a Counter that iterates most common first."""
+    return Counter(dict(top_items(counts, k)))
+
+class SpaceSaving:
+    """
+    Space-saving sketch (Metwally, Agrawal and El Abbadi) over a stream of
+    items, holding at most `capacity` counters. An untracked item replaces
+    the smallest counter and inherits its count as its error, so each
+    reported count overestimates the true count by at most its error, and
+    every item occurring more than total / capacity times is tracked.
+    """
+
+    def __init__(self, capacity):
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+        # Min-heap of (count, seq, item); entries go stale as counts change
+        self._heap = []
+        self._sequence = sequence()
+
+    def __len__(self):
+        return len(self.counts)
+
+    def _push(self, item):
+        heapq.heappush(self._heap, (self.counts[item], next(self._sequence), item))
+        if len(self._heap) > HEAP_SLACK * self.capacity:
+            self._heap = [(count, next(self._sequence), item) for item, count in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        """Remove the smallest live counter. Returns tuple of (item, count)."""
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                del self.counts[item], self.errors[item]
+                return item, count
+
+    def add(self, item, count=1):
+        """Count `count` more occurrences of item."""
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            _, floor = self._pop_min()
+            self.counts[item] = floor + count
+            self.errors[item] = floor
+        self._push(item)
+
+    def update(self, items):
+        """Count every item of an iterable once."""
+        for item in items:
+            self.add(item)
+
+    def max_error(self):
+        """The largest overcount of any tracked item."""
+        return max(self.errors.values(), default=0)
+
+    def top(self, k=None):
+        """
+        Get the k largest tracked counts, ties by smaller error first.
+        Returns a list of (item, count, error) tuples.
+        """
+        entries = ((item, count, self.errors[item]) for item, count in self.counts.items())
+        if k is None:
+            return sorted(entries, key=lambda entry: (-entry[1], entry[2]))
+        return heapq.nsmallest(k, entries, key=lambda entry: (-entry[1], entry[2]))
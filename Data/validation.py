@@ -0,0 +1,383 @@
+"""
+Response Validation
+Flags card sort responses that shouldn't feed the counts: survey previews
+(Status is 'Survey Preview'), degenerate sorts and duplicate submissions.
+A sort is degenerate when every card is in one group, every card is in a
+group of its own, or every group name is a placeholder ("." / "x" / "none",
+see group_names). Duplicates are found without comparing every pair
+of participants: each sort is reduced to its set of co-grouped card pairs,
+identical sets are matched by hash, and near-identical ones by MinHash
+signatures bucketed with locality-sensitive hashing (LSH), checking the
+exact Jaccard similarity of candidates only.
+The result is a mask of the export rows to keep, cached until the export
+changes; analyses run with --validate leave the flagged rows out before
+parsing and pair counting.
+"""
+
+import argparse
+import json
+from collections import Counter
+from pathlib import Path
+
+from card_model import UNNAMED_GROUP
+from card_sort_parser import FIRST_RESPONSE_ROW, extract_card_model, fit_group_columns, get_group_columns
+from group_names import is_placeholder, normalize_label
+from lazy_imports import lazy_module
+from profiling import add_counts, add_profile_arguments, profile_session, profiled
+from reports import TEXT_FORMAT, add_format_arguments, print_written, write_tables, write_text
+from survey_schema import read_survey_columns
+from workbook_cache import CACHE_DIR, workbook_key
+
+np = lazy_module('numpy')
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+EXCEL_FILE = SCRIPT_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
+OUTPUT_FILE = SCRIPT_DIR / "Validation.txt"
+
+# Bump when the rules change so cached validation results are rebuilt
+VALIDATION_VERSION = 2
+
+# First row after the question text; with validation, previews are found by Status
+# instead of skipping everything before FIRST_RESPONSE_ROW
+FIRST_DATA_ROW = 1
+STATUS_COLUMN = 'Status'
+RESPONSE_ID_COLUMN = 'ResponseId'
+PREVIEW_STATUS = 'Survey Preview'
+
+# Sorts with fewer cards are too small to call degenerate or duplicated
+MIN_SORT_CARDS = 5
+
+# MinHash signature length, split into LSH_BANDS bands of equal width. With
+# 16 bands of 8 hashes, sorts with Jaccard similarity 0.9 share a bucket with
+# probability > 0.9999 and sorts at 0.5 with about 0.06.
+NUM_PERMUTATIONS = 128
+LSH_BANDS = 16
+NEAR_DUPLICATE_SIMILARITY = 0.9
+MINHASH_SEED = 409
+# Mersenne prime modulus of the hash functions (products stay within int64)
+HASH_PRIME = (1 << 31) - 1
+# Tokens hashed per batch (times NUM_PERMUTATIONS int64 values in memory)
+HASH_CHUNK_TOKENS = 1 << 15
+
+# Flag reasons, in the order they are checked
+REASONS = {
+    'preview': "Survey preview, not a real response",
+    'single_group': "Every card placed in one group",
+    'all_singletons': "Every card placed in a group of its own",
+    'junk_names': "Only placeholder group names",
+    'duplicate': "Same sort as an earlier participant",
+    'near_duplicate': "Nearly the same sort as an earlier participant"
+}
+
+def sort_tokens(model, position):
+    """
+    Reduce a participant's sort to its set of co-grouped card pairs (each
+    card paired with itself too, so every sorted card counts), encoded as
+    integers. Two sorts have the same tokens exactly when they group the
+    same cards the same way, whatever the group order or names.
+    Returns a sorted array of unique tokens.
+    """
+    num_cards = len(model.cards)
+    tokens = []
+    for group in range(model.participant_offsets[position], model.participant_offsets[position + 1]):
+        ids = np.unique(model.card_ids[model.group_offsets[group]:model.group_offsets[group + 1]]).astype(np.int64)
+        rows, columns = np.triu_indices(len(ids))
+        tokens.append(ids[columns] * num_cards + ids[rows])
+    return np.unique(np.concatenate(tokens)) if tokens else np.zeros(0, dtype=np.int64)
+
+def num_sorted_cards(model, position):
+    """Number of cards (with repeats) a participant placed in groups."""
+    groups = model.participant_offsets[position:position + 2]
+    return int(model.group_offsets[groups[1]] - model.group_offsets[groups[0]])
+
+def degenerate_reason(model, position):
+    """
+    Check one participant's sort for the degenerate patterns.
+    Returns the flag reason, or None if the sort looks genuine.
+    """
+    groups = range(model.participant_offsets[position], model.participant_offsets[position + 1])
+    sizes = np.array([model.group_offsets[group + 1] - model.group_offsets[group] for group in groups])
+    names = [model.names[model.group_name_ids[group]] for group in groups]
+    typed = [name for name in names if name != UNNAMED_GROUP]
+    if num_sorted_cards(model, position) >= MIN_SORT_CARDS:
+        if (sizes > 0).sum() == 1:
+            return 'single_group'
+        if sizes.max() == 1:
+            return 'all_singletons'
+    if typed and all(is_placeholder(normalize_label(name)) for name in typed):
+        return 'junk_names'
+    return None
+
+@profiled
+def minhash_signatures(token_sets, num_permutations=NUM_PERMUTATIONS, seed=MINHASH_SEED):
+    """
+    Compute the MinHash signature of each token set, with universal hash
+    functions (a * x + b) mod HASH_PRIME, hashing HASH_CHUNK_TOKENS tokens
+    at a time. Every set must be non-empty.
+    Returns an int64 array of shape (len(token_sets), num_permutations).
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, HASH_PRIME, num_permutations, dtype=np.int64)[:, None]
+    b = rng.integers(0, HASH_PRIME, num_permutations, dtype=np.int64)[:, None]
+    signatures = np.empty((len(token_sets), num_permutations), dtype=np.int64)
+    start = 0
+    while start < len(token_sets):
+        end, num_tokens = start, 0
+        while end < len(token_sets) and (end == start or num_tokens + len(token_sets[end]) <= HASH_CHUNK_TOKENS):
+            num_tokens += len(token_sets[end])
+            end += 1
+        chunk = token_sets[start:end]
+        starts = np.cumsum([0] + [len(tokens) for tokens in chunk[:-1]])
+        tokens = np.concatenate(chunk) % HASH_PRIME
+        signatures[start:end] = np.minimum.reduceat((a * tokens + b) % HASH_PRIME, starts, axis=1).T
+        start = end
+    return signatures
+
+def jaccard(first, second):
+    """Jaccard similarity of two sorted unique token arrays."""
+    shared = len(np.intersect1d(first, second, assume_unique=True))
+    return shared / (len(first) + len(second) - shared)
+
+@profiled
+def find_duplicates(token_sets, similarity=NEAR_DUPLICATE_SIMILARITY, bands=LSH_BANDS):
+    """
+    Find sorts that repeat an earlier one, exactly (same token set) or
+    nearly (Jaccard similarity of at least `similarity`). Candidates for
+    near duplicates come from sharing a bucket in any LSH band; only the
+    earliest of each set of duplicates is kept and matched against.
+    Returns a dict of position -> (reason, matched position).
+    """
+    duplicates = {}
+    if not token_sets:
+        return duplicates
+    signatures = minhash_signatures(token_sets)
+    width = signatures.shape[1] // bands
+    exact = {}
+    buckets = [{} for _ in range(bands)]
+    num_candidates = 0
+    for position, tokens in enumerate(token_sets):
+        key = tokens.tobytes()
+        if key in exact:
+            duplicates[position] = ('duplicate', exact[key])
+            continue
+        band_keys = [signatures[position, band * width:(band + 1) * width].tobytes() for band in range(bands)]
+        candidates = sorted({earlier for band, band_key in enumerate(band_keys)
+                             for earlier in buckets[band].get(band_key, ())})
+        num_candidates += len(candidates)
+        match = next((earlier for earlier in candidates
+                      if jaccard(tokens, token_sets[earlier]) >= similarity), None)
+        if match is not None:
+            duplicates[position] = ('near_duplicate', match)
+            continue
+        exact[key] = position
+        for band, band_key in enumerate(band_keys):
+            buckets[band].setdefault(band_key, []).append(position)
+    add_counts(sorts=len(token_sets), candidates=num_candidates)
+    return duplicates
+
+def preview_rows(df):
+    """
+    Find the survey preview rows from the Status column.
+    Without a Status column, the rows before FIRST_RESPONSE_ROW are treated
+    as previews, as the parsers did before validation.
+    Returns a bool array over the rows of df.
+    """
+    if STATUS_COLUMN not in df.columns:
+        print(f"Warning: No {STATUS_COLUMN} column, treating rows before {FIRST_RESPONSE_ROW} as previews")
+        previews = np.zeros(len(df), dtype=bool)
+        previews[FIRST_DATA_ROW:FIRST_RESPONSE_ROW] = True
+        return previews
+    previews = (df[STATUS_COLUMN].astype(str).str.strip() == PREVIEW_STATUS).to_numpy(copy=True)
+    previews[:FIRST_DATA_ROW] = False
+    return previews
+
+@profiled
+def validate_responses(df, schema):
+    """
+    Flag the preview, degenerate and duplicate responses of an export read
+    with the Status, ResponseId and card sort columns.
+    Returns a dict with 'num_rows' and 'flags', a list of dicts (row,
+    participant_number, response_id, reason, matches) in row order; matches
+    is the participant number a duplicate repeats.
+    """
+    previews = preview_rows(df)
+    response_ids = (df[RESPONSE_ID_COLUMN].tolist() if RESPONSE_ID_COLUMN in df.columns
+                    else [None] * len(df))
+    flagged = {int(row): ('preview', None) for row in np.flatnonzero(previews)}
+
+    model = extract_card_model(df, *fit_group_columns(df, *get_group_columns(schema)), first_row=FIRST_DATA_ROW)
+    rows = (model.participant_numbers - 1).tolist()
+    candidates, token_sets = [], []
+    for position, row in enumerate(rows):
+        if row in flagged:
+            continue
+        reason = degenerate_reason(model, position)
+        if reason is not None:
+            flagged[row] = (reason, None)
+            continue
+        if num_sorted_cards(model, position) >= MIN_SORT_CARDS:
+            candidates.append(row)
+            token_sets.append(sort_tokens(model, position))
+    for position, (reason, match) in find_duplicates(token_sets).items():
+        flagged[candidates[position]] = (reason, candidates[match] + 1)
+
+    flags = [{
+        'row': row,
+        'participant_number': row + 1,
+        'response_id': response_ids[row],
+        'reason': reason,
+        'matches': match
+    } for row, (reason, match) in sorted(flagged.items())]
+    add_counts(rows=len(df), participants=len(model), flagged=len(flags))
+    return {'num_rows': len(df), 'flags': flags}
+
+def validation_path(excel_file, cache_dir=CACHE_DIR):
+    """Get the cache file location of a workbook's validation results."""
+    return Path(cache_dir) / f"{Path(excel_file).stem}.validation.json"
+
+def load_validation(excel_file=EXCEL_FILE, cache_dir=CACHE_DIR, refresh=False):
+    """
+    Validate the responses of an export, reusing the cached results until
+    the export changes.
+    Returns the validate_responses dict.
+    """
+    excel_file = Path(excel_file)
+    cache_file = validation_path(excel_file, cache_dir)
+    key = workbook_key(excel_file)
+    if not refresh and cache_file.exists():
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get('key') == key and cached.get('version') == VALIDATION_VERSION:
+                return cached['validation']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Could not read validation cache ({e}), validating again...")
+
+    df, schema = read_survey_columns(excel_file, card_sort=True, extra=[STATUS_COLUMN, RESPONSE_ID_COLUMN],
+                                     refresh=refresh)
+    validation = validate_responses(df, schema)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'version': VALIDATION_VERSION, 'validation': validation}, f)
+    except OSError as e:
+        print(f"Warning: Could not write validation cache ({e})")
+    return validation
+
+def keep_mask(validation):
+    """
+    Build the filter mask of a validation: one flag per export row, False
+    for the question text row and every flagged response.
+    Returns a bool array.
+    """
+    keep = np.ones(validation['num_rows'], dtype=bool)
+    keep[:FIRST_DATA_ROW] = False
+    keep[[flag['row'] for flag in validation['flags']]] = False
+    return keep
+
+def load_keep_mask(excel_file=EXCEL_FILE):
+    """Validate an export (through the cache) and print what is left out. Returns its keep_mask."""
+    validation = load_validation(excel_file)
+    reasons = Counter(flag['reason'] for flag in validation['flags'])
+    details = ', '.join(f"{count} {reason}" for reason, count in reasons.items())
+    print(f"Validation: leaving out {len(validation['flags'])} flagged response(s)"
+          + (f" ({details})" if details else ""))
+    return keep_mask(validation)
+
+def first_row(keep):
+    """First data row to parse the card sort from: previews are masked out when keep is given."""
+    return FIRST_RESPONSE_ROW if keep is None else FIRST_DATA_ROW
+
+def select_participants(model, keep):
+    """Keep only the participants of a CardSortModel whose rows pass the mask (all of them if keep is None)."""
+    if keep is None:
+        return model
+    return model.select(keep[model.participant_numbers - 1])
+
+def select_rows(df, keep):
+    """Keep only the rows of df that pass the mask (all of them if keep is None)."""
+    if keep is None:
+        return df
+    return df[keep[:len(df)]]
+
+def add_validation_arguments(parser):
+    """Add the --validate option shared by the analysis scripts."""
+    parser.add_argument('--validate', action='store_true',
+                        help="Leave out survey previews, duplicate submissions and degenerate sorts "
+                             f"(see {Path(__file__).name})")
+
+def validation_lines(validation):
+    """Yield the lines of the validation text report."""
+    yield "=" * 80 + "\n"
+    yield "RESPONSE VALIDATION\n"
+    yield "=" * 80 + "\n\n"
+    yield f"Rows checked: {validation['num_rows'] - FIRST_DATA_ROW}\n"
+    yield f"Responses flagged: {len(validation['flags'])}\n\n"
+
+    reasons = Counter(flag['reason'] for flag in validation['flags'])
+    yield "FLAGS BY REASON:\n"
+    yield "-" * 80 + "\n"
+    for reason, description in REASONS.items():
+        yield f"  {description}: {reasons[reason]}\n"
+    yield "\n"
+
+    yield "FLAGGED RESPONSES:\n"
+    yield "-" * 80 + "\n"
+    if not validation['flags']:
+        yield "  (No responses flagged)\n"
+    for flag in validation['flags']:
+        line = f"  Participant {flag['participant_number']}"
+        if flag['response_id']:
+            line += f" ({flag['response_id']})"
+        line += f": {REASONS[flag['reason']]}"
+        if flag['matches'] is not None:
+            line += f" (participant {flag['matches']})"
+        yield line + "\n"
+
+def validation_tables(validation):
+    """
+    Build the structured version of the validation report: one row per flagged response.
+    Returns a dict of table name -> (columns, rows) for reports.write_tables.
+    """
+    columns = ['participant_number', 'response_id', 'reason', 'matches']
+    rows = [{column: flag[column] for column in columns} for flag in validation['flags']]
+    return {'validation_flags': (columns, rows)}
+
+def parse_args(argv=None):
+    """Parse command line options for the validation report."""
+    parser = argparse.ArgumentParser(description="Flag preview, duplicate and degenerate card sort responses.")
+    parser.add_argument('--excel-file', type=Path, default=EXCEL_FILE,
+                        help="Survey export to validate")
+    parser.add_argument('--refresh', action='store_true',
+                        help="Validate again even if the cached results are up to date")
+    add_format_arguments(parser)
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Main function to validate the responses and write the report."""
+    args = parse_args(argv)
+    with profile_session(args.profile, args.cprofile):
+        print(f"Reading Excel file: {args.excel_file}")
+
+        try:
+            validation = load_validation(args.excel_file, refresh=args.refresh)
+            if TEXT_FORMAT in args.formats:
+                write_text(validation_lines(validation), OUTPUT_FILE)
+                print(f"Validation report written to: {OUTPUT_FILE}")
+            print_written(write_tables(validation_tables(validation), args.formats, args.report_dir))
+
+            reasons = Counter(flag['reason'] for flag in validation['flags'])
+            print(f"\nFlagged {len(validation['flags'])} of {validation['num_rows'] - FIRST_DATA_ROW} responses")
+            for reason, count in reasons.items():
+                print(f"  {REASONS[reason]}: {count}")
+        except FileNotFoundError:
+            print(f"Error: Excel file not found at {args.excel_file}")
+        except Exception as e:
+            print(f"Error processing file: {e}")
+            import traceback
+            traceback.print_exc()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Workbook Cache
+Converts the Qualtrics Excel export into a cached columnar .npz file so the
+analysis scripts only pay the openpyxl parsing cost once per export. Mixed
+and text columns are stored as type codes plus UTF-8 text, so the cache is
+loaded without unpickling anything.
+"""
+
+import hashlib
+import json
+from datetime import date, datetime, time
+from pathlib import Path
+
+from lazy_imports import lazy_module
+from profiling import add_counts, profiled
+
+np = lazy_module('numpy')
+pd = lazy_module('pandas')
+
+# Get the directory where this script is located
+SCRIPT_DIR = Path(__file__).parent
+EXCEL_FILE = SCRIPT_DIR / "PSYC 409 Website Development Study_December 1, 2025_15.46.xlsx"
+CACHE_DIR = SCRIPT_DIR / ".cache"
+
+# Bump when the on-disk layout changes so stale caches are rebuilt
+CACHE_VERSION = 2
+# DataFrame.attrs key holding the sheet position of each column of a partial read
+SHEET_POSITIONS = 'sheet_positions'
+
+# Type codes of the values in a stored object column, with how each is read back
+# (the missing value codes are read back without their text)
+MISSING_NAN, MISSING_NONE = 0, 1
+VALUE_TYPES = (
+    (bool, lambda text: text == 'True'),
+    (int, int),
+    (float, float),
+    (str, str),
+    (datetime, datetime.fromisoformat),
+    (date, date.fromisoformat),
+    (time, time.fromisoformat)
+)
+FIRST_VALUE_CODE = 2
+
+# SHA-256 of each workbook already hashed by this process, by (path, size, mtime_ns)
+_workbook_hashes = {}
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the SHA-256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def workbook_key(excel_file):
+    """
+    Build the cache key for a workbook. The file is only hashed the first
+    time this process sees it at its current size and mtime, since several
+    stages (schema, validation, pair store) key their caches on it.
+    Returns a dict with the file's mtime, size and SHA-256 hash.
+    """
+    path = Path(excel_file).resolve()
+    stat = path.stat()
+    memo_key = (str(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _workbook_hashes:
+        _workbook_hashes[memo_key] = file_sha256(path)
+    return {
+        'version': CACHE_VERSION,
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': _workbook_hashes[memo_key],
+    }
+
+def cache_paths(excel_file, cache_dir=CACHE_DIR):
+    """
+    Get the cache file locations for a workbook.
+    Returns tuple of (data_path, meta_path)
+    """
+    stem = Path(excel_file).stem
+    return Path(cache_dir) / f"{stem}.npz", Path(cache_dir) / f"{stem}.json"
+
+def _is_native_dtype(dtype):
+    """Check whether a column dtype can be stored in .npz as a plain array."""
+    return dtype.kind in 'biufcmM' and not isinstance(dtype, pd.api.extensions.ExtensionDtype)
+
+def value_code(value):
+    """
+    Get the type code of one object column value (see VALUE_TYPES).
+    Raises TypeError for values that can't be stored as text.
+    """
+    if value is None:
+        return MISSING_NONE
+    if isinstance(value, float) and value != value:
+        return MISSING_NAN
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is pd.NaT:
+        raise TypeError("Can't cache a NaT value")
+    # pd.Timestamp is a datetime, and is stored and read back as one
+    for code, (value_type, _) in enumerate(VALUE_TYPES, FIRST_VALUE_CODE):
+        if isinstance(value, value_type):
+            return code
+    raise TypeError(f"Can't cache a {type(value).__name__} value")
+
+def value_text(value, code):
+    """Get the text a value of the given type code is stored as."""
+    if code < FIRST_VALUE_CODE:
+        return ''
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    # repr keeps every digit of a float, so it reads back to the same value
+    return repr(value) if isinstance(value, float) else str(value)
+
+def encode_objects(values):
+    """
+    Encode object values as arrays that load without pickling.
+    Returns tuple of (codes, text, offsets): one type code per value, the
+    UTF-8 bytes of every value's text back to back, and each value's
+    character range in the decoded text (CSR-style, len(values) + 1 long).
+    """
+    codes = np.array([value_code(value) for value in values], dtype=np.int8)
+    texts = [value_text(value, code) for value, code in zip(values, codes.tolist())]
+    offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+    np.cumsum([len(text) for text in texts], out=offsets[1:])
+    return codes, np.frombuffer(''.join(texts).encode('utf-8'), dtype=np.uint8), offsets
+
+def decode_objects(codes, text, offsets):
+    """Rebuild the list of values encoded by encode_objects."""
+    text = text.tobytes().decode('utf-8')
+    offsets = offsets.tolist()
+    values = []
+    for i, code in enumerate(codes.tolist()):
+        if code == MISSING_NAN:
+            values.append(np.nan)
+        elif code == MISSING_NONE:
+            values.append(None)
+        else:
+            values.append(VALUE_TYPES[code - FIRST_VALUE_CODE][1](text[offsets[i]:offsets[i + 1]]))
+    return values
+
+def save_dataframe(df, data_path):
+    """
+    Write a DataFrame to an .npz file, one array per column.
+    Numeric, boolean and datetime columns are stored natively; everything else
+    (and the column names) is stored with encode_objects.
+    Returns the list of column dtype names, in column order.
+    Raises TypeError if a column holds values that can't be encoded.
+    """
+    arrays = {}
+    dtypes = []
+    for i, column in enumerate(df.columns):
+        series = df.iloc[:, i]
+        if _is_native_dtype(series.dtype):
+            arrays[f"c{i}"] = series.to_numpy()
+        else:
+            arrays[f"c{i}_codes"], arrays[f"c{i}_text"], arrays[f"c{i}_offsets"] = encode_objects(
+                series.to_numpy(dtype=object).tolist()
+            )
+        dtypes.append(str(series.dtype))
+    arrays['columns_codes'], arrays['columns_text'], arrays['columns_offsets'] = encode_objects(list(df.columns))
+
+    data_path.parent.mkdir(parents=True, exist_ok=True)
+    # Write to a temporary file first so an interrupted run never leaves a
+    # half-written cache behind
+    tmp_path = data_path.with_name(data_path.name + '.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **arrays)
+    tmp_path.replace(data_path)
+    return dtypes
+
+def load_dataframe(data_path, dtypes, positions=None):
+    """
+    Read a DataFrame previously written by save_dataframe.
+    If positions is given, only those columns are loaded (.npz arrays are
+    read lazily, so the other columns are never decompressed).
+    """
+    with np.load(data_path, allow_pickle=False) as data:
+        columns = decode_objects(data['columns_codes'], data['columns_text'], data['columns_offsets'])
+        if positions is not None:
+            columns = [columns[i] for i in positions]
+        series = {}
+        for i in (range(len(dtypes)) if positions is None else positions):
+            dtype = dtypes[i]
+            if f"c{i}" in data:
+                values = data[f"c{i}"]
+            else:
+                values = decode_objects(data[f"c{i}_codes"], data[f"c{i}_text"], data[f"c{i}_offsets"])
+            try:
+                series[i] = pd.Series(values, dtype=dtype)
+            except (TypeError, ValueError):
+                series[i] = pd.Series(values, dtype=object)
+    df = pd.concat(series, axis=1) if series else pd.DataFrame()
+    df.columns = columns
+    if positions is not None:
+        df.attrs[SHEET_POSITIONS] = list(positions)
+    return df
+
+@profiled
+def read_survey(excel_file=EXCEL_FILE, cache_dir=CACHE_DIR, refresh=False, columns=None):
+    """
+    Read the survey workbook, going through the columnar cache.
+    The cache is keyed by the workbook's mtime, size and SHA-256 hash and is
+    rebuilt whenever any of them change (or when refresh=True).
+    columns optionally lists the sheet positions to load (see
+    survey_schema.read_survey_columns); their positions are kept in
+    df.attrs[SHEET_POSITIONS].
+    Returns the same DataFrame as pd.read_excel(excel_file, header=0)
+    (restricted to columns if given).
+    """
+    excel_file = Path(excel_file)
+    data_path, meta_path = cache_paths(excel_file, cache_dir)
+    key = workbook_key(excel_file)
+
+    if not refresh and data_path.exists() and meta_path.exists():
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('key') == key:
+                print(f"Using cached workbook: {data_path}")
+                df = load_dataframe(data_path, meta['dtypes'], columns)
+                add_counts(rows=len(df), columns=len(df.columns), cache_hits=1)
+                return df
+            print("Workbook changed since last run, rebuilding cache...")
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Could not read workbook cache ({e}), rebuilding...")
+
+    df = pd.read_excel(excel_file, header=0)
+    add_counts(rows=len(df), columns=len(df.columns), cache_misses=1)
+    try:
+        dtypes = save_dataframe(df, data_path)
+        with open(meta_path, 'w', encoding='utf-8') as f:
+            json.dump({'key': key, 'dtypes': dtypes}, f, indent=2)
+        print(f"Cached workbook to: {data_path}")
+    except (OSError, TypeError) as e:
+        print(f"Warning: Could not write workbook cache ({e})")
+    if columns is not None:
+        df = df.iloc[:, list(columns)].copy()
+        df.attrs[SHEET_POSITIONS] = list(columns)
+    return df
+
+if __name__ == "__main__":
+    import sys
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else EXCEL_FILE
+    frame = read_survey(path, refresh=True)
+    print(f"Loaded {len(frame)} rows and {len(frame.columns)} columns")